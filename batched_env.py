@@ -0,0 +1,180 @@
+# batched_env.py
+import numpy as np
+from gymnasium.utils import seeding
+from stable_baselines3.common.vec_env import VecEnv
+
+from env_simple import SimplifiedTradingEnv
+from ledger import BUY, SELL
+
+# VecEnv que corre N episodios de SimplifiedTradingEnv a la vez: el estado de
+# cada episodio (cash, inventario, puntero de step...) vive en arrays de NumPy y
+# la lógica de compra/venta/hold + recompensa se aplica a los N con máscaras.
+# Con los mismos seeds da los mismos resultados que N copias de SimplifiedTradingEnv
+# en un DummyVecEnv. Uso:
+#   vec_env = BatchedTradingVecEnv(CSV_PATH, n_envs=8, reward_config=cfg)
+#   model = PPO("MlpPolicy", vec_env)
+# (envolver en VecMonitor para que PPO loguee ep_rew_mean)
+
+
+class BatchedTradingVecEnv(VecEnv):
+    def __init__(self, csv_path, n_envs, reward_config=None, max_steps=500, **env_kwargs):
+        # Un env "plantilla" resuelve datos, features cacheadas y config por defecto
+        env_kwargs["precompute_features"] = True
+        self.env = SimplifiedTradingEnv(csv_path, reward_config=reward_config, max_steps=max_steps, **env_kwargs)
+        self.reward_config = self.env.reward_config
+        self.fee_rate = self.env.fee_rate
+        self.max_steps = max_steps
+        self.render_mode = None
+
+        self.bid = self.env.bid
+        self.ask = self.env.ask
+        self.spread = self.env.spread
+        self.volatility = self.env.volatility
+        self.hurst_track = self.env.hurst_track
+        self.lyap_track = self.env.lyap_track
+        self.book = self.env.book  # con book, las órdenes de los N episodios recorren los niveles juntas
+        self.profiler = None  # el step vectorizado no se perfila por fase (ProfilingCallback lo saltea)
+
+        self.start_step = np.zeros(n_envs, dtype=np.int64)
+        self.current_step = np.zeros(n_envs, dtype=np.int64)
+        self.cash = np.full(n_envs, 1000.0)
+        self.inventory = np.zeros(n_envs)
+        self.prev_inventory = np.zeros(n_envs)
+        self.inventory_value = np.zeros(n_envs)
+        self.last_equity = np.full(n_envs, 1000.0)
+        self.noise = np.zeros((n_envs, max_steps))
+        self.rngs = [None] * n_envs
+        self.actions = np.zeros(n_envs, dtype=np.int64)
+
+        super().__init__(n_envs, self.env.observation_space, self.env.action_space)
+
+    def _reset_env(self, idx, seed=None):
+        # Mismo orden de sorteos que SimplifiedTradingEnv.reset
+        if seed is not None or self.rngs[idx] is None:
+            self.rngs[idx], _ = seeding.np_random(seed)
+        rng = self.rngs[idx]
+        self.start_step[idx], _ = self.env.sample_start(rng)
+        self.current_step[idx] = self.start_step[idx]
+        self.noise[idx] = rng.normal(0, 0.01, size=self.max_steps)
+        self.cash[idx] = 1000.0
+        self.inventory[idx] = 0
+        self.prev_inventory[idx] = 0
+        self.inventory_value[idx] = 0.0
+        self.last_equity[idx] = 1000.0
+
+    def _get_observations(self):
+        i = self.current_step
+        return np.stack([
+            self.bid[i],
+            self.ask[i],
+            self.spread[i],
+            self.inventory,
+            self.cash
+        ], axis=1).astype(np.float32)
+
+    def reset(self):
+        for idx in range(self.num_envs):
+            self._reset_env(idx, self._seeds[idx])
+        self._reset_seeds()
+        self._reset_options()
+        return self._get_observations()
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        cfg = self.reward_config
+        action = self.actions
+        i = self.current_step
+        bid = self.bid[i].astype(np.float64)
+        ask = self.ask[i].astype(np.float64)
+        hurst = self.hurst_track[i]
+        lyap = self.lyap_track[i]
+        reward = np.zeros(self.num_envs)
+
+        # Compra si hay cash
+        buy = (action == 1) & (self.cash >= ask)
+        if self.book is not None:
+            ask[buy] = self.book.fill(BUY, i[buy], 1.0)[0]
+        self.inventory[buy] += 1
+        self.cash[buy] -= ask[buy] * self.fee_rate
+        self.inventory_value[buy] += ask[buy]
+        reward[buy] += cfg["reward_trade"]
+        reward[buy] -= 0.06 * (self.inventory[buy] ** cfg["reward_inventory"])
+
+        # Venta: todo el inventario si hay ganancia, penalización si no
+        sell = (action == 2) & (self.inventory > 0)
+        price = bid
+        if self.book is not None:
+            price = bid.copy()
+            price[sell] = self.book.fill(SELL, i[sell], self.inventory[sell])[0]
+        avg_price = self.inventory_value[sell] / (self.inventory[sell] + 1e-8)
+        self.inventory_value[sell] -= avg_price
+        diff = np.zeros(self.num_envs)
+        diff[sell] = price[sell] - avg_price
+        profit = sell & (diff > 0)
+        loss = sell & ~(diff > 0)
+
+        base_gain = price[profit] * self.inventory[profit]
+        reward[profit] += cfg["reward_profit"] * base_gain
+        reward[profit & (hurst < 0.45)] += 1.0
+        self.cash[profit] += base_gain
+        self.cash[profit] -= base_gain * self.fee_rate
+        self.inventory[profit] = 0
+        reward[loss] += cfg["reward_loss"] * np.abs(diff[loss])
+        reward[sell & ((self.cash + self.inventory * bid) > 1000)] += 2.5
+
+        # Hold
+        hold = action == 0
+        reward[hold] += cfg["reward_idle"]
+        reward[hold & (hurst > 0.55)] += cfg["reward_hold_hurst_positive"]
+        reward[hold & (hurst < 0.45)] += cfg["reward_hold_hurst_negative"]
+        reward[hold & (lyap < 0.2)] += cfg["reward_hold_lyap_negative"]
+        reward[hold & (lyap > 0.5)] += cfg["reward_hold_lyap_positive"]
+
+        # Premio por reducir inventario
+        reduced = self.inventory < self.prev_inventory
+        reward[reduced] += cfg["reward_reduce_trade"] * 0.1 * (self.prev_inventory[reduced] - self.inventory[reduced])
+        self.prev_inventory[:] = self.inventory
+
+        # Recompensa por equity
+        equity = self.cash + self.inventory * bid
+        reward += (equity - self.last_equity) * 0.1
+        self.last_equity[:] = equity
+
+        # Volatilidad local para escalar + exploración
+        reward *= 1 + (self.volatility[i] * 2)
+        reward += self.noise[np.arange(self.num_envs), i - self.start_step]
+
+        done = self.inventory >= 10
+        self.current_step += 1
+        finished = self.current_step - self.start_step >= self.max_steps
+        reward[finished & (equity > 1000)] += 5
+        done |= finished
+
+        obs = self._get_observations()
+        infos = [{"TimeLimit.truncated": False} for _ in range(self.num_envs)]
+        for idx in np.flatnonzero(done):
+            infos[idx]["terminal_observation"] = obs[idx]
+            infos[idx]["final_equity"] = float(equity[idx])
+            self._reset_env(idx)
+        if done.any():
+            obs = self._get_observations()
+
+        return obs, reward.astype(np.float32), done, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self.env, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
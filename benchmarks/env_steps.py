@@ -0,0 +1,37 @@
+# benchmarks/env_steps.py
+# Mide steps/s de SimplifiedTradingEnv (acciones aleatorias) sobre los CSV de data/
+# Uso: python benchmarks/env_steps.py [n_steps]
+import glob
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+warnings.filterwarnings("ignore")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from env_simple import SimplifiedTradingEnv
+
+DATA_GLOB = "data/*.csv"
+
+
+def steps_per_second(csv_path, n_steps, seed=0):
+    env = SimplifiedTradingEnv(csv_path)
+    rng = np.random.RandomState(seed)
+    np.random.seed(seed)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        _, _, done, _, _ = env.step(rng.randint(3))
+        if done:
+            env.reset()
+    return n_steps / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    n_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for csv_path in sorted(glob.glob(DATA_GLOB)):
+        sps = steps_per_second(csv_path, n_steps)
+        print(f"{os.path.basename(csv_path):50s} {sps:10.0f} steps/s")
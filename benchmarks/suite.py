@@ -0,0 +1,335 @@
+# benchmarks/suite.py
+# Suite de benchmarks de los caminos calientes, con salida JSON y comparación
+# contra un baseline guardado.
+#
+#   python benchmarks/suite.py run --out bench.json [--only env,ppo,bot,predict,startup] [--quick]
+#   python benchmarks/suite.py compare baseline.json bench.json [--threshold 0.10]
+#
+# Cada métrica se mide `repeats` veces y se guarda la mejor (menos ruido de
+# otros procesos). compare sale con código 1 si alguna métrica empeora más
+# que el umbral; solo tiene sentido entre corridas de la misma máquina.
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+warnings.filterwarnings("ignore")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATA_GLOB = os.path.join(ROOT, "data", "*.csv")
+MODEL_PATH = os.path.join(ROOT, "models", "model_equity_1007_8.zip")
+THRESHOLD = 0.10  # 10% peor que el baseline = regresión
+SEED = 0
+
+# Tamaños de cada medición: (normal, --quick)
+SIZES = {
+    "env_steps": (20_000, 5_000),
+    "env_live_steps": (1_000, 200),
+    "env_resets": (2_000, 500),
+    "ppo_timesteps": (4_096, 2_048),
+    "predict_calls": (2_000, 500),
+}
+# Librerías pesadas que se anotan por subcomando en el benchmark de arranque
+HEAVY_MODULES = ("torch", "stable_baselines3", "optuna", "matplotlib", "hurst", "nolds", "pandas")
+REPEATS = (3, 1)
+
+
+def result(value, unit, higher_is_better=True, **extra):
+    return {"value": float(value), "unit": unit, "higher_is_better": higher_is_better, **extra}
+
+
+def best_of(repeats, fn):
+    # fn() -> segundos; devuelve el mejor tiempo
+    return min(fn() for _ in range(repeats))
+
+
+def bench_env(csv_paths, sizes, repeats):
+    from env_simple import SimplifiedTradingEnv
+
+    results = {}
+    csv_path = csv_paths[0]
+    for name, precompute, n_steps in [("env_step", True, sizes["env_steps"]),
+                                      ("env_step_live_features", False, sizes["env_live_steps"])]:
+        env = SimplifiedTradingEnv(csv_path, precompute_features=precompute)
+
+        def run():
+            rng = np.random.default_rng(SEED)
+            actions = rng.integers(0, 3, size=n_steps)
+            env.reset(seed=SEED)
+            start = time.perf_counter()
+            for action in actions:
+                _, _, done, _, _ = env.step(int(action))
+                if done:
+                    env.reset()
+            return time.perf_counter() - start
+
+        results[name] = result(n_steps / best_of(repeats, run), "steps/s", csv=os.path.basename(csv_path))
+
+    env = SimplifiedTradingEnv(csv_path)
+    n_resets = sizes["env_resets"]
+
+    def run_resets():
+        start = time.perf_counter()
+        for i in range(n_resets):
+            env.reset(seed=i)
+        return time.perf_counter() - start
+
+    results["env_reset"] = result(n_resets / best_of(repeats, run_resets), "resets/s")
+
+    # Construcción con store y features ya cacheados (lo que paga cada trial / worker)
+    def run_init():
+        start = time.perf_counter()
+        for path in csv_paths:
+            SimplifiedTradingEnv(path)
+        return (time.perf_counter() - start) / len(csv_paths)
+
+    results["env_init_ms"] = result(best_of(repeats, run_init) * 1e3, "ms", higher_is_better=False)
+    return results
+
+
+def bench_ppo(csv_paths, sizes, repeats):
+    import torch
+    from stable_baselines3 import PPO
+    from env_simple import SimplifiedTradingEnv
+
+    torch.set_num_threads(1)  # fps comparables entre máquinas con distinta cantidad de cores
+    timesteps = sizes["ppo_timesteps"]
+
+    def run():
+        env = SimplifiedTradingEnv(csv_paths[0])
+        model = PPO("MlpPolicy", env, verbose=0, seed=SEED, n_steps=min(2048, timesteps), device="cpu")
+        start = time.perf_counter()
+        model.learn(total_timesteps=timesteps)
+        return time.perf_counter() - start
+
+    return {"ppo_learn": result(timesteps / best_of(repeats, run), "fps", timesteps=timesteps, torch_threads=1)}
+
+
+def export_npz(model_path, out_dir):
+    from numpy_policy import export_policy
+    return export_policy(model_path, os.path.join(out_dir, "policy.npz"))
+
+
+def bench_bot(csv_paths, sizes, repeats, model_path, work_dir):
+    from paper_trading_mocked import MockedBinance, PaperTradingBot
+
+    npz_path = export_npz(model_path, work_dir)
+    ticks = 0
+    results = {}
+    for name, path in [("bot_replay_npz", npz_path), ("bot_replay_ppo", model_path)]:
+        def run():
+            nonlocal ticks
+            bot = PaperTradingBot(path)
+            bot.logger.setLevel(logging.WARNING)  # medir el loop, no el I/O del log por tick
+            ticks = 0
+            start = time.perf_counter()
+            for csv_path in csv_paths:
+                exchange = MockedBinance(csv_path)
+                bot.run(exchange)
+                ticks += exchange.index
+            return time.perf_counter() - start
+
+        elapsed = best_of(repeats, run)
+        results[name] = result(ticks / elapsed, "ticks/s", ticks=ticks)
+    return results
+
+
+def remove_bot_logs(root_handlers):
+    # El bot configura un FileHandler paper_trading_<fecha>.log en el logger raíz
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if handler not in root_handlers and isinstance(handler, logging.FileHandler):
+            handler.close()
+            root.removeHandler(handler)
+            if os.path.exists(handler.baseFilename):
+                os.remove(handler.baseFilename)
+
+
+def bench_predict(csv_paths, sizes, repeats, model_path, work_dir):
+    from numpy_policy import load_policy, sample_observations
+
+    npz_path = export_npz(model_path, work_dir)
+    n = sizes["predict_calls"]
+    obs = sample_observations(n, seed=SEED)
+
+    results = {}
+    for name, path in [("predict_npz", npz_path), ("predict_ppo", model_path)]:
+        policy = load_policy(path)
+        best = None
+        for _ in range(repeats):
+            latencies = np.empty(n)
+            for i, o in enumerate(obs):
+                start = time.perf_counter()
+                policy.predict(o, deterministic=True)
+                latencies[i] = time.perf_counter() - start
+            if best is None or np.median(latencies) < np.median(best):
+                best = latencies
+        results[f"{name}_p50_us"] = result(np.percentile(best, 50) * 1e6, "us", higher_is_better=False)
+        results[f"{name}_p99_us"] = result(np.percentile(best, 99) * 1e6, "us", higher_is_better=False)
+    return results
+
+
+def cold_start(code, repeats):
+    # Mejor tiempo de un intérprete nuevo corriendo `code` (incluye arrancar Python)
+    # -> (segundos, librerías pesadas cargadas)
+    code += f"; import sys; print('heavy:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    best, loaded = None, ""
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        loaded = out.rsplit("heavy:", 1)[1].strip()
+    return best, loaded
+
+
+def bench_startup(csv_paths, sizes, repeats):
+    # Arranque en frío de cada subcomando de cli.py: importar lo que carga antes de trabajar
+    from cli import COMMAND_MODULES
+
+    results = {}
+    base, _ = cold_start("pass", repeats)  # piso: arrancar el intérprete
+    results["startup_python_ms"] = result(base * 1e3, "ms", higher_is_better=False)
+    for command, modules in COMMAND_MODULES.items():
+        elapsed, loaded = cold_start("; ".join(f"import {m}" for m in modules), repeats)
+        name = "startup_" + command.replace(" --", "_") + "_ms"
+        results[name] = result(elapsed * 1e3, "ms", higher_is_better=False, modules=list(modules),
+                               heavy=loaded.split(",") if loaded else [])
+    # El chequeo en seco de un spec, de punta a punta
+    spec = os.path.join(ROOT, "search_specs", "final.json")
+    elapsed, loaded = cold_start(f"import cli; cli.main(['optimize', {spec!r}, '--check'])", repeats)
+    results["startup_optimize_check_run_ms"] = result(elapsed * 1e3, "ms", higher_is_better=False,
+                                                      heavy=loaded.split(",") if loaded else [])
+    return results
+
+
+BENCHES = {
+    "env": bench_env,
+    "ppo": bench_ppo,
+    "bot": bench_bot,
+    "predict": bench_predict,
+    "startup": bench_startup,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(only=None, quick=False, model_path=MODEL_PATH):
+    sizes = {name: size[int(quick)] for name, size in SIZES.items()}
+    repeats = REPEATS[int(quick)]
+    csv_paths = sorted(glob.glob(DATA_GLOB))
+    results = {}
+    # Desde la raíz del repo: así se usan los caches de cache/ (datasets y features)
+    cwd = os.getcwd()
+    root_handlers = list(logging.getLogger().handlers)
+    os.chdir(ROOT)
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-") as work_dir:
+            for name in only or BENCHES:
+                print(f"⏱️  {name}...", flush=True)
+                if name in ("bot", "predict"):
+                    results.update(BENCHES[name](csv_paths, sizes, repeats, model_path, work_dir))
+                else:
+                    results.update(BENCHES[name](csv_paths, sizes, repeats))
+    finally:
+        remove_bot_logs(root_handlers)
+        os.chdir(cwd)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    # Devuelve filas (métrica, baseline, actual, cambio relativo, regresión?)
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"] if base["value"] else 0.0
+        worse = -change if cur["higher_is_better"] else change
+        rows.append((name, base["value"], cur["value"], change, worse > threshold))
+    return rows
+
+
+def print_results(report):
+    for name, r in report["results"].items():
+        print(f"{name:28s} {r['value']:14.2f} {r['unit']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de env, entrenamiento y paper trading")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run")
+    run_p.add_argument("--out", help="JSON de salida")
+    run_p.add_argument("--only", help=f"subconjunto separado por comas de {','.join(BENCHES)}")
+    run_p.add_argument("--quick", action="store_true", help="tamaños chicos y una sola repetición")
+    run_p.add_argument("--model", default=MODEL_PATH)
+    cmp_p = sub.add_parser("compare")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        only = args.only.split(",") if args.only else None
+        unknown = set(only or []) - set(BENCHES)
+        if unknown:
+            parser.error(f"benchmarks desconocidos: {sorted(unknown)}")
+        report = run_suite(only, args.quick, os.path.abspath(args.model))
+        print_results(report)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"💾 {args.out}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    for key in ("machine", "cpu_count", "quick"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"⚠️  {key} distinto entre corridas: {baseline['meta'].get(key)} vs {current['meta'].get(key)}")
+    rows = compare(baseline, current, args.threshold)
+    for name, base, cur, change, regression in rows:
+        flag = "❌ REGRESIÓN" if regression else ""
+        print(f"{name:28s} {base:14.2f} -> {cur:14.2f} ({change:+7.1%}) {flag}")
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"\n{len(regressions)} regresión(es) por encima de {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nSin regresiones por encima de {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# callbacks.py
+import csv
+import os
+import time
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+from instrumentation import StepProfiler
+
+EVAL_FREQ = 10_000  # timesteps entre evaluaciones intermedias
+N_EVAL_EPISODES = 3
+
+
+def evaluate_equity(model, env, n_episodes=N_EVAL_EPISODES, seed=0):
+    # Equity final media de episodios deterministas (seeds fijos: mismos episodios en cada evaluación)
+    equities = []
+    for ep in range(n_episodes):
+        obs, _ = env.reset(seed=seed + ep)
+        done = False
+        while not done:
+            action, _ = model.predict(obs, deterministic=True)
+            obs, _, done, _, _ = env.step(action)
+        equities.append(env.last_equity)
+    return float(np.mean(equities))
+
+
+class TrialEvalCallback(BaseCallback):
+    # Evalúa el modelo cada `eval_freq` timesteps sobre `eval_env`, reporta la
+    # equity a Optuna y corta el entrenamiento si el pruner descarta el trial.
+    # Guarda en el trial los timesteps realmente usados ("timesteps_used"), el tiempo de
+    # entrenamiento ("train_seconds") y la curva [timesteps, equity, segundos] ("learning_curve").
+    def __init__(self, trial, eval_env, eval_freq=EVAL_FREQ, n_eval_episodes=N_EVAL_EPISODES, prune=True, verbose=0):
+        super().__init__(verbose)
+        self.trial = trial
+        self.prune = prune
+        self.eval_env = eval_env
+        self.eval_freq = eval_freq
+        self.n_eval_episodes = n_eval_episodes
+        self.next_eval = eval_freq
+        self.is_pruned = False
+        self.last_value = None
+        self.curve = []
+        self.start_time = None
+
+    def _on_training_start(self):
+        self.start_time = time.perf_counter()
+
+    def _on_step(self):
+        if self.num_timesteps < self.next_eval:
+            return True
+        self.next_eval += self.eval_freq
+
+        self.last_value = evaluate_equity(self.model, self.eval_env, self.n_eval_episodes)
+        self.curve.append([int(self.num_timesteps), self.last_value, time.perf_counter() - self.start_time])
+        self.trial.report(self.last_value, step=self.num_timesteps)
+        if self.verbose:
+            print(f"Trial {self.trial.number} | {self.num_timesteps} timesteps | equity eval: {self.last_value:.2f}")
+        if self.prune and self.trial.should_prune():
+            self.is_pruned = True
+            return False
+        return True
+
+    def _on_training_end(self):
+        self.trial.set_user_attr("timesteps_used", int(self.num_timesteps))
+        self.trial.set_user_attr("pruned", self.is_pruned)
+        self.trial.set_user_attr("train_seconds", time.perf_counter() - self.start_time)
+        self.trial.set_user_attr("learning_curve", self.curve)
+
+
+class ProfilingCallback(BaseCallback):
+    # Activa el perfilado por fase de los SimplifiedTradingEnv de entrenamiento y, al
+    # final de cada rollout, registra el resumen en el logger de SB3 (sale en la
+    # misma tabla que time/fps). Opcional: una fila por rollout en un CSV y un archivo
+    # de texto de Prometheus reescrito en cada rollout. Los profilers de los envs se vacían
+    # después de cada rollout, así cada fila mide solo ese rollout.
+    def __init__(self, csv_path=None, prom_path=None, verbose=0):
+        super().__init__(verbose)
+        self.csv_path = csv_path
+        self.prom_path = prom_path
+
+    def _on_training_start(self):
+        self.training_env.env_method("enable_profiling")
+
+    def collect(self):
+        # Suma los profilers de todos los envs (con SubprocVecEnv llegan copias); los envs
+        # sin perfilado por fase (ej. BatchedTradingVecEnv) devuelven None
+        merged = StepProfiler()
+        for profiler in self.training_env.get_attr("profiler"):
+            if profiler is not None:
+                merged.merge(profiler)
+        return merged
+
+    def _on_step(self):
+        return True
+
+    def _on_rollout_end(self):
+        profiler = self.collect()
+        self.training_env.env_method("reset_profiler")
+        summary = profiler.summary()
+        for key, value in summary.items():
+            self.logger.record(f"profile/{key}", value)
+
+        if self.csv_path:
+            new_file = not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0
+            with open(self.csv_path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=["timesteps", *summary])
+                if new_file:
+                    writer.writeheader()
+                writer.writerow({"timesteps": self.num_timesteps, **summary})
+        if self.prom_path:
+            profiler.write_prometheus(self.prom_path)
+
+
+def print_budget_summary(study, full_timesteps):
+    # Compute ahorrado por el pruning: timesteps usados vs. entrenar todos los trials completos
+    trials = [t for t in study.trials if "timesteps_used" in t.user_attrs]
+    if not trials:
+        return
+    used = sum(t.user_attrs["timesteps_used"] for t in trials)
+    full = full_timesteps * len(trials)
+    pruned = sum(1 for t in trials if t.user_attrs.get("pruned"))
+    print(f"⏱️ Timesteps usados: {used:,} de {full:,} ({used / full:.0%}) | trials podados: {pruned}/{len(trials)}")
+
+
+def print_warm_start_summary(study):
+    # Warm start vs. desde cero: timesteps, tiempo y equity por grupo, y cuánto tardan los
+    # trials warm en llegar a la equity mediana de los cold
+    trials = [t for t in study.trials if "train_seconds" in t.user_attrs and "final_equity" in t.user_attrs]
+    warm = [t for t in trials if t.user_attrs.get("warm_start_parent")]
+    cold = [t for t in trials if not t.user_attrs.get("warm_start_parent")]
+    if not warm:
+        return
+    for name, group in (("warm", warm), ("cold", cold)):
+        if group:
+            print(f"🔥 {name}: {len(group)} trials | "
+                  f"{np.mean([t.user_attrs['timesteps_used'] for t in group]):,.0f} timesteps | "
+                  f"{np.mean([t.user_attrs['train_seconds'] for t in group]):.0f}s | "
+                  f"equity media {np.mean([t.user_attrs['final_equity'] for t in group]):.2f}")
+    if not cold:
+        return
+    # Misma medida que la curva: equity de evaluación (la última de cada trial cold)
+    cold_final = [t.user_attrs["learning_curve"][-1][1] for t in cold if t.user_attrs.get("learning_curve")]
+    if not cold_final:
+        return
+    target = float(np.median(cold_final))
+    reached = [next((seconds for _, equity, seconds in t.user_attrs.get("learning_curve", []) if equity >= target), None)
+               for t in warm]
+    reached = [seconds for seconds in reached if seconds is not None]
+    cold_seconds = np.mean([t.user_attrs["train_seconds"] for t in cold])
+    if reached:
+        print(f"   warm llega a la equity de evaluación mediana cold ({target:.2f}) en {np.mean(reached):.0f}s "
+              f"({len(reached)}/{len(warm)} trials) vs {cold_seconds:.0f}s de un trial cold")
+    else:
+        print(f"   ningún trial warm llegó a la equity de evaluación mediana cold ({target:.2f})")
@@ -0,0 +1,170 @@
+# cli.py
+# Punto de entrada único del proyecto:
+#
+#   python cli.py train    [--csv data/X.csv] [--timesteps 150000] [--out ppo_trading_simplificado]
+#   python cli.py optimize search_specs/final.json [--workers 4] [--n-trials 30] [--check]
+#   python cli.py evaluate models/config_1006_8.json ... --csv data/X.csv [--seeds 3] [--timesteps 50000]
+#   python cli.py walk-forward models/config_1006_8.json data/X.csv [--folds 4] [--workers 4]
+#   python cli.py paper    models/model_equity_1007_8.npz [--symbol USDTBRL] [--interval 1.0] [--metrics-port 9464]
+#   python cli.py replay   models/model_equity_1007_8.npz data/X.csv ... [--depth] [--features]
+#
+# Este archivo solo importa argparse: cada subcomando importa sus módulos recién
+# al correr, así que `--help` u `optimize --check` no cargan torch, stable-baselines3,
+# optuna, matplotlib, hurst ni nolds. COMMAND_MODULES lista lo que carga cada uno
+# antes de empezar a trabajar (lo mide benchmarks/suite.py run --only startup).
+import argparse
+import sys
+
+COMMAND_MODULES = {
+    "train": ("train_simple_ppo", "stable_baselines3"),
+    "optimize": ("search", "optuna", "stable_baselines3", "callbacks", "env_simple", "evaluation"),
+    "optimize --check": ("search",),
+    "evaluate": ("evaluation",),
+    "walk-forward": ("walk_forward", "stable_baselines3"),
+    "paper": ("paper_trading",),
+    "replay": ("paper_trading_mocked",),
+}
+
+
+def cmd_train(args):
+    from train_simple_ppo import train
+
+    train(args.csv, args.timesteps, args.out)
+    print(f"💾 {args.out}.zip")
+    return 0
+
+
+def cmd_optimize(args):
+    from search import main
+
+    return main(args.args)
+
+
+def cmd_evaluate(args):
+    import json
+    import os
+
+    from evaluation import run_evaluation, summarize
+
+    configs = {}
+    for path in args.configs:
+        with open(path) as f:
+            configs[os.path.basename(path)] = json.load(f)
+    runs = run_evaluation(configs, seeds=range(args.seeds), csv_path=args.csv, timesteps=args.timesteps,
+                          runs_csv=args.runs_csv, workers=args.workers, torch_threads=args.torch_threads,
+                          parent=args.parent)
+    df = summarize(runs, configs)
+    print(df[["config", "n_runs", "mean_equity", "std_equity", "mean_max_drawdown", "median_profit_factor"]])
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(f"💾 {args.out}")
+    return 0
+
+
+def cmd_walk_forward(args):
+    from walk_forward import main
+
+    return main(args.args)
+
+
+def cmd_paper(args):
+    from paper_trading import PaperTradingBot
+
+    # Solo se pasan las opciones dadas: los defaults siguen siendo los de PaperTradingBot
+    options = {name: value for name, value in [("symbol", args.symbol), ("base_url", args.base_url),
+                                               ("record_dir", args.record_dir)] if value is not None}
+    if args.no_record:
+        options["record_dir"] = None
+    bot = PaperTradingBot(args.model, metrics_path=args.metrics_path, metrics_port=args.metrics_port,
+                          async_logging=args.async_logging, **options)
+    try:
+        if args.sync:
+            bot.run(interval=args.interval)
+        else:
+            bot.run_async(interval=args.interval, max_ticks=args.max_ticks)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_replay(args):
+    from paper_trading_mocked import MockedBinance, PaperTradingBot
+
+    bot = PaperTradingBot(args.model, history_dir=args.history_dir, features=args.features)
+    exchange = MockedBinance(args.paths, depth=args.depth)
+    bot.run(exchange)
+    last = bot.equity_history.last()
+    equity = f"{last['equity']:.2f}" if last is not None else "-"
+    print(f"🏁 {exchange.index} snapshots | Cash: {bot.cash:.2f}, Inv: {bot.inventory:.2f}, Eq: {equity}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Entrenamiento, búsqueda, evaluación y paper trading")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_p = sub.add_parser("train", help="entrena un PPO sobre un CSV")
+    train_p.add_argument("--csv", default="data/BITSO-XRP_MXN-1000_depth-1748377579235.csv")
+    train_p.add_argument("--timesteps", type=int, default=150_000)
+    train_p.add_argument("--out", default="ppo_trading_simplificado", help="path del modelo (sin .zip)")
+    train_p.set_defaults(run=cmd_train)
+
+    optimize_p = sub.add_parser("optimize", help="búsqueda con Optuna (argumentos de search.py)",
+                                add_help=False)
+    optimize_p.add_argument("args", nargs="*")
+    optimize_p.set_defaults(run=cmd_optimize)
+
+    evaluate_p = sub.add_parser("evaluate", help="entrena cada config con N seeds en paralelo")
+    evaluate_p.add_argument("configs", nargs="+", help="reward configs JSON")
+    evaluate_p.add_argument("--csv", required=True)
+    evaluate_p.add_argument("--seeds", type=int, default=3)
+    evaluate_p.add_argument("--timesteps", type=int, default=50_000)
+    evaluate_p.add_argument("--workers", type=int)
+    evaluate_p.add_argument("--torch-threads", type=int, default=1)
+    evaluate_p.add_argument("--runs-csv", default="evaluation_runs.csv", help="una fila por (config, seed)")
+    evaluate_p.add_argument("--parent", help="checkpoint para warm start")
+    evaluate_p.add_argument("--out", help="CSV con el resumen por config")
+    evaluate_p.set_defaults(run=cmd_evaluate)
+
+    walk_p = sub.add_parser("walk-forward", help="validación walk-forward de una config (argumentos de walk_forward.py)",
+                            add_help=False)
+    walk_p.add_argument("args", nargs="*")
+    walk_p.set_defaults(run=cmd_walk_forward)
+
+    paper_p = sub.add_parser("paper", help="paper trading en vivo contra Binance")
+    paper_p.add_argument("model", help=".npz (sin torch) o .zip")
+    paper_p.add_argument("--symbol")
+    paper_p.add_argument("--base-url")
+    paper_p.add_argument("--interval", type=float, default=1.0)
+    paper_p.add_argument("--max-ticks", type=int)
+    paper_p.add_argument("--sync", action="store_true", help="loop síncrono (bot.run) en vez de asyncio")
+    paper_p.add_argument("--record-dir")
+    paper_p.add_argument("--no-record", action="store_true", help="no grabar los ticks")
+    paper_p.add_argument("--metrics-path")
+    paper_p.add_argument("--metrics-port", type=int)
+    paper_p.add_argument("--async-logging", action="store_true")
+    paper_p.set_defaults(run=cmd_paper)
+
+    replay_p = sub.add_parser("replay", help="paper trading sobre datos históricos (CSV o store)")
+    replay_p.add_argument("model", help=".npz (sin torch) o .zip")
+    replay_p.add_argument("paths", nargs="+")
+    replay_p.add_argument("--depth", action="store_true", help="recorrer el book L2")
+    replay_p.add_argument("--features", action="store_true", help="calcular Hurst/Lyapunov/volatilidad online")
+    replay_p.add_argument("--history-dir")
+    replay_p.set_defaults(run=cmd_replay)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command in ("optimize", "walk-forward"):
+        # Sus opciones son las de search.py / walk_forward.py (--workers, --check, --help, ...)
+        args.args += extra
+    elif extra:
+        parser.error(f"argumentos desconocidos: {' '.join(extra)}")
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,390 @@
+# dataset_store.py
+# Cache binario columnar de los CSV de snapshots (data/*-depth-*.csv).
+#
+# Cada CSV se convierte una sola vez en un directorio con una columna por
+# archivo (binario crudo little-endian) + meta.json:
+#   cache/datasets/<nombre_csv>/
+#       meta.json          par, filas, dtypes, origen (tamaño, mtime, sha256)
+#       timestamp.bin      int64, epoch en ns
+#       id.bin             int64
+#       bid.bin, ask.bin, spread_percentage.bin   float32
+#       bid_px.bin, bid_qty.bin, ask_px.bin, ask_qty.bin   (filas, niveles) float32,
+#                          solo si el CSV trae profundidad L2 (ver order_book.py)
+# Las filas quedan en orden cronológico (los CSV vienen del más nuevo al más
+# viejo). Las columnas se abren con np.memmap, así que abrir un dataset no lee
+# los datos y varios procesos comparten las páginas vía el page cache del SO.
+# La ingesta lee el CSV por tramos: sirve para archivos más grandes que la RAM.
+#
+# Varios datasets se pueden concatenar en un solo store (concat_datasets):
+#   cache/datasets/concat-<hash>/   mismas columnas + "segments" en meta.json
+# con los límites [start, stop) de cada archivo, su par y su source_key. El hash
+# sale del contenido de los miembros; al crear uno se borran los de los mismos
+# miembros con contenido viejo ("members" en meta.json).
+#
+# Los stores que graba tick_recorder.py en vivo tienen "live": true en meta.json:
+# se pueden abrir mientras se escriben y sus filas son las que están completas en
+# todas las columnas al momento de abrirlos (committed_rows). Quien lea los .bin
+# de un store live tiene que usar ese conteo, no el tamaño de cada archivo.
+#
+# Uso: python dataset_store.py data/*.csv
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from feature_cache import file_hash
+from order_book import BOOK_COLUMNS, book_dtype, book_from_frame, csv_depth
+
+STORE_DIR = "cache/datasets"
+STORE_VERSION = 1
+INGEST_CHUNK_ROWS = 1_000_000
+COPY_CHUNK_BYTES = 16 * 1024 * 1024
+META_FILE = "meta.json"
+CONCAT_PREFIX = "concat-"
+COLUMNS = {
+    "timestamp": "<i8",
+    "id": "<i8",
+    "bid": "<f4",
+    "ask": "<f4",
+    "spread_percentage": "<f4",
+}
+
+
+def store_path(csv_path, store_dir=STORE_DIR):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(store_dir, name)
+
+
+def read_meta(path):
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(csv_path, path):
+    meta = read_meta(path)
+    if meta is None or meta.get("version") != STORE_VERSION:
+        return False
+    stat = os.stat(csv_path)
+    return meta["source_size"] == stat.st_size and meta["source_mtime_ns"] == stat.st_mtime_ns
+
+
+def staging_dir(path):
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(dir=parent, prefix=".ingest-")
+
+
+def commit_dir(tmp, path, meta):
+    # Las columnas se escriben en un directorio temporal que después se renombra:
+    # nunca queda un store a medias
+    with open(os.path.join(tmp, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    if os.path.exists(path):
+        shutil.rmtree(path, ignore_errors=True)  # versión vieja; los memmaps abiertos siguen válidos
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)  # otro proceso lo escribió primero
+    return path
+
+
+def base_dtype(dtype):
+    # "(10,)<f4" (columna 2-D del book) -> float32 de cada valor; las columnas 1-D quedan igual
+    return np.dtype(dtype).base
+
+
+def write_columns(path, columns, meta):
+    tmp = staging_dir(path)
+    for name, values in columns.items():
+        np.ascontiguousarray(values, dtype=COLUMNS[name]).tofile(os.path.join(tmp, f"{name}.bin"))
+    return commit_dir(tmp, path, meta)
+
+
+def reverse_column(path, dtype, rows, chunk_rows=INGEST_CHUNK_ROWS):
+    # Invierte una columna por bloques (del final al principio) sin cargarla entera
+    dtype = np.dtype(dtype)
+    with open(path, "rb") as src, open(path + ".rev", "wb") as dst:
+        stop = rows
+        while stop > 0:
+            start = max(0, stop - chunk_rows)
+            src.seek(start * dtype.itemsize)
+            np.fromfile(src, dtype=dtype, count=stop - start)[::-1].tofile(dst)
+            stop = start
+    os.replace(path + ".rev", path)
+
+
+def sort_columns(tmp, rows, chunk_rows=INGEST_CHUNK_ROWS, columns=COLUMNS):
+    # Caso general (CSV sin orden): argsort estable del timestamp y reordenamiento por tramos
+    order = np.argsort(open_column(tmp, "timestamp", COLUMNS["timestamp"], rows), kind="stable")
+    for name, dtype in columns.items():
+        path = os.path.join(tmp, f"{name}.bin")
+        src = open_column(tmp, name, dtype, rows)
+        with open(path + ".sorted", "wb") as dst:
+            for i in range(0, rows, chunk_rows):
+                np.ascontiguousarray(src[order[i:i + chunk_rows]]).tofile(dst)
+        del src
+        os.replace(path + ".sorted", path)
+
+
+def parse_timestamp(values):
+    return pd.to_datetime(values, utc=True, format='ISO8601').values.astype('datetime64[ns]').astype(np.int64)
+
+
+def ingest_csv(csv_path, store_dir=STORE_DIR, chunk_rows=INGEST_CHUNK_ROWS):
+    # Lee el CSV por tramos y los agrega a las columnas: la memoria no depende del
+    # tamaño del archivo. Los CSV vienen del más nuevo al más viejo, así que al
+    # final se invierten las columnas; si no hay orden, se ordenan por timestamp.
+    stat = os.stat(csv_path)
+    target = store_path(csv_path, store_dir)
+    # Con profundidad L2 se agregan las columnas del book
+    depth = csv_depth(pd.read_csv(csv_path, nrows=0).columns)
+    columns = {**COLUMNS, **{name: book_dtype(depth) for name in BOOK_COLUMNS}} if depth else COLUMNS
+    tmp = staging_dir(target)
+    files = {name: open(os.path.join(tmp, f"{name}.bin"), "wb") for name in columns}
+    pairs = set()
+    rows = 0
+    last_ts = None
+    ascending = descending = True
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            pairs.update(chunk['pair'].unique())
+            if len(pairs) != 1:
+                raise ValueError(f"{csv_path}: se esperaba un solo par y hay {sorted(pairs)}")
+
+            timestamp = parse_timestamp(chunk['timestamp'])
+            steps = np.diff(timestamp if last_ts is None else np.concatenate([[last_ts], timestamp]))
+            ascending = ascending and bool((steps >= 0).all())
+            descending = descending and bool((steps < 0).all())  # estricto: invertir no cambia empates
+            last_ts = timestamp[-1]
+
+            values = {"timestamp": timestamp, "id": chunk['id'].values, "bid": chunk['bid'].values,
+                      "ask": chunk['ask'].values, "spread_percentage": chunk['spread_percentage'].values}
+            if depth:
+                values.update(book_from_frame(chunk, depth))
+            for name, f in files.items():
+                np.ascontiguousarray(values[name], dtype=base_dtype(columns[name])).tofile(f)
+            rows += len(chunk)
+        if not pairs:
+            raise ValueError(f"{csv_path}: se esperaba un solo par y el CSV está vacío")
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    finally:
+        for f in files.values():
+            f.close()
+
+    if not ascending:
+        if descending:
+            for name, dtype in columns.items():
+                reverse_column(os.path.join(tmp, f"{name}.bin"), dtype, rows, chunk_rows)
+        else:
+            sort_columns(tmp, rows, chunk_rows, columns)
+
+    meta = {
+        "version": STORE_VERSION,
+        "pair": str(pairs.pop()),
+        "rows": rows,
+        "columns": columns,
+        "source": os.path.basename(csv_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_hash": file_hash(csv_path),
+    }
+    return commit_dir(tmp, target, meta)
+
+
+def committed_rows(path, columns):
+    # Filas completas en todas las columnas (en un store live alguna puede ir adelantada)
+    sizes = []
+    for name, dtype in columns.items():
+        column = os.path.join(path, f"{name}.bin")
+        sizes.append(os.path.getsize(column) // np.dtype(dtype).itemsize if os.path.exists(column) else 0)
+    return min(sizes)
+
+
+def open_column(path, name, dtype, rows):
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,))
+
+
+class Dataset:
+    # Con un store live, las filas se fijan al abrirlo (committed_rows) y las columnas se
+    # mapean con ese largo: lo que se agrega después no se ve hasta reabrirlo. Los
+    # archivos .bin pueden tener bytes de más (un flush a medias); solo valen las
+    # primeras len(ds) filas, nunca el tamaño del archivo
+    def __init__(self, path):
+        self.path = path
+        self.meta = read_meta(path)
+        if self.meta is None:
+            raise FileNotFoundError(f"No hay dataset en {path}")
+        self.pair = self.meta["pair"]
+        self.rows = self.meta["rows"]
+        source = self.meta.get('source_hash', path)
+        if self.meta.get("live"):
+            # Se sigue escribiendo: filas al abrir, y la clave cambia con ellas
+            self.rows = committed_rows(path, self.meta["columns"])
+            source = f"{source}:{self.rows}"
+        # Clave estable del contenido (para caches derivados, ej. features)
+        self.source_key = hashlib.sha256(f"{source}:store-v{self.meta['version']}".encode()).hexdigest()
+        # Límites de cada archivo original: [(start, stop, par, source_key)]
+        self.segments = [(seg["start"], seg["stop"], seg["pair"], seg["source_key"])
+                         for seg in self.meta.get("segments", [])]
+        if not self.segments:
+            self.segments = [(0, self.rows, self.pair, self.source_key)]
+        self._columns = {}
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        if name not in self._columns:
+            self._columns[name] = open_column(self.path, name, self.meta["columns"][name], self.rows)
+        return self._columns[name]
+
+    @property
+    def timestamp(self):
+        return self.column("timestamp")
+
+    @property
+    def bid(self):
+        return self.column("bid")
+
+    @property
+    def ask(self):
+        return self.column("ask")
+
+    @property
+    def spread(self):
+        return self.column("spread_percentage")
+
+    def derived(self, name, compute):
+        # Columna derivada (ej. volatilidad) cacheada junto al dataset
+        path = os.path.join(self.path, "derived", f"{name}_n{self.rows}.npy")
+        if os.path.exists(path):
+            return np.load(path, mmap_mode="r")
+        values = compute()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, values)
+        os.replace(tmp_path, path)
+        if self.meta.get("live"):
+            # Store que crece: las versiones con menos filas ya no se van a leer
+            for old in glob.glob(os.path.join(self.path, "derived", f"{name}_n*.npy")):
+                if old != path and ".tmp." not in old:
+                    remove_file(old)
+        return values
+
+
+def remove_file(path):
+    # Los memmaps ya abiertos siguen válidos; si otro proceso lo borró primero, nada
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def copy_bytes(src_path, dst, size):
+    # Copia los primeros `size` bytes (en un store live la columna puede ir adelantada)
+    with open(src_path, "rb") as src:
+        while size:
+            chunk = src.read(min(size, COPY_CHUNK_BYTES))
+            if not chunk:
+                raise ValueError(f"{src_path} tiene menos filas que las del dataset")
+            dst.write(chunk)
+            size -= len(chunk)
+
+
+def remove_superseded_concats(store_dir, target, members):
+    # Otros stores concatenados de los mismos miembros: quedaron viejos porque algún
+    # miembro cambió (ej. un store live que siguió creciendo). Los memmaps abiertos
+    # siguen válidos
+    for path in glob.glob(os.path.join(store_dir, f"{CONCAT_PREFIX}*")):
+        if os.path.abspath(path) == os.path.abspath(target):
+            continue
+        meta = read_meta(path)
+        if meta is not None and meta.get("members") == members:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def open_dataset(path, store_dir=STORE_DIR):
+    # Acepta un CSV (lo ingesta si hace falta) o un directorio de store ya creado
+    if os.path.isdir(path):
+        return Dataset(path)
+    target = store_path(path, store_dir)
+    if not is_fresh(path, target):
+        ingest_csv(path, store_dir)
+    return Dataset(target)
+
+
+def concat_datasets(paths, store_dir=STORE_DIR):
+    # Un store con las filas de todos los datasets una detrás de otra (en el orden de
+    # `paths`). El nombre sale del contenido de los miembros: si alguno cambia, es otro store
+    datasets = [open_dataset(path, store_dir) for path in paths]
+    members = [os.path.abspath(ds.path) for ds in datasets]
+    key = hashlib.sha256("|".join(ds.source_key for ds in datasets).encode()).hexdigest()
+    target = os.path.join(store_dir, f"{CONCAT_PREFIX}{key[:16]}")
+    meta = read_meta(target)
+    if meta is not None and meta.get("version") == STORE_VERSION:
+        return Dataset(target)
+
+    # Las columnas del book solo si todos los miembros las tienen con la misma profundidad
+    columns = {name: dtype for name, dtype in datasets[0].meta["columns"].items()
+               if all(ds.meta["columns"].get(name) == dtype for ds in datasets)}
+    tmp = staging_dir(target)
+    try:
+        # Las columnas de cada miembro ya están en disco con el mismo dtype: se copian tal
+        # cual, solo las filas del dataset
+        for name, dtype in columns.items():
+            with open(os.path.join(tmp, f"{name}.bin"), "wb") as dst:
+                for ds in datasets:
+                    if len(ds):
+                        copy_bytes(os.path.join(ds.path, f"{name}.bin"), dst, len(ds) * np.dtype(dtype).itemsize)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    segments = []
+    start = 0
+    for ds in datasets:
+        segments.append({"source": ds.meta["source"], "pair": ds.pair, "start": start,
+                         "stop": start + len(ds), "source_key": ds.source_key})
+        start += len(ds)
+    meta = {
+        "version": STORE_VERSION,
+        "pair": ",".join(sorted({ds.pair for ds in datasets})),
+        "rows": start,
+        "columns": columns,
+        "source": "+".join(ds.meta["source"] for ds in datasets),
+        "source_hash": key,
+        "segments": segments,
+        "members": members,
+    }
+    commit_dir(tmp, target, meta)
+    remove_superseded_concats(store_dir, target, members)
+    return Dataset(target)
+
+
+def open_datasets(paths, store_dir=STORE_DIR):
+    # Un path (o lista de uno) -> open_dataset; varios -> store concatenado
+    if isinstance(paths, (str, os.PathLike)):
+        return open_dataset(paths, store_dir)
+    paths = list(paths)
+    if len(paths) == 1:
+        return open_dataset(paths[0], store_dir)
+    return concat_datasets(paths, store_dir)
+
+
+if __name__ == "__main__":
+    for csv_path in sys.argv[1:]:
+        ds = open_dataset(csv_path)
+        print(f"{csv_path} -> {ds.path} ({ds.pair}, {len(ds)} filas)")
@@ -3,33 +3,105 @@ import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from hurst import compute_Hc
-import nolds
+from time import perf_counter_ns
+from market_data import MarketData, VOLATILITY_WINDOW
+from dataset_store import STORE_DIR, open_datasets
+from feature_cache import (FEATURE_WINDOW, FEATURE_MIN_WINDOW, FEATURE_VERSION, CACHE_DIR,
+                           hurst_lyap_with_failures, load_feature_track)
+from instrumentation import StepProfiler
+from ledger import BUY, SELL, PositionLedger
+from online_features import OnlineFeatures
+from order_book import OrderBook
+
+DEFAULT_REWARD_CONFIG = {
+    "reward_trade": 1.0,
+    "reward_hold": -1.0,
+    "reward_profit": 1.0,
+    "reward_loss": -2.0,
+    "reward_idle": -0.1,
+    "reward_inventory": 2,
+    "reward_reduce_trade": 2,
+    "reward_hold_hurst_positive": 1,
+    "reward_hold_hurst_negative": 1,
+    "reward_hold_lyap_positive": 1,
+    "reward_hold_lyap_negative": 1,
+}
 
 class SimplifiedTradingEnv(gym.Env):
-    def __init__(self, csv_path, reward_config=None, max_steps=500):
+    def __init__(self, csv_path, reward_config=None, max_steps=500, precompute_features=True,
+                 feature_window=FEATURE_WINDOW, feature_cache_dir=CACHE_DIR, store_dir=STORE_DIR, profile=False,
+                 feature_engine="batch", pair_weights=None, record_path=None, book=None, span=None):
         super().__init__()
 
-        self.reward_config = reward_config or {
-            "reward_trade": 1.0,
-            "reward_hold": -1.0,
-            "reward_profit": 1.0,
-            "reward_loss": -2.0,
-            "reward_idle": -0.1,
-            "reward_inventory": 2,
-            "reward_reduce_trade": 2,
-            "reward_hold_hurst_positive": 1,
-            "reward_hold_hurst_negative": 1,
-            "reward_hold_lyap_positive": 1,
-            "reward_hold_lyap_negative": 1,
-        }
-        self.df = pd.read_csv(csv_path)
+        # Las configs parciales (ej. solo las 5 recompensas base) completan con los defaults
+        self.reward_config = {**DEFAULT_REWARD_CONFIG, **(reward_config or {})}
         self.max_steps = max_steps
 
+        # Columnas memory-mapped del store binario (orden cronológico) + volatilidad
+        # precalculada: step solo hace lecturas indexadas. Con una lista de CSVs se
+        # concatenan en un solo store compartido y los episodios nunca cruzan archivos
+        self.dataset = open_datasets(csv_path, store_dir)
+        self.market = MarketData.from_dataset(self.dataset, volatility_window=VOLATILITY_WINDOW)
+        self._df = None
+        self.bid = self.market.bid
+        self.ask = self.market.ask
+        self.spread = self.market.spread
+        self.volatility = self.market.volatility
+
+        # Profundidad para ejecutar las órdenes (order_book.py): None = todo al mejor bid/ask;
+        # "dataset" = el book L2 del store; o un OrderBook por fila (ej. OrderBook.synthetic)
+        if isinstance(book, str):
+            book = OrderBook.from_dataset(self.dataset)
+            if book is None:
+                raise ValueError(f"{csv_path} no tiene profundidad L2 (solo top-of-book)")
+        if book is not None and len(book) != len(self.bid):
+            raise ValueError(f"El book tiene {len(book)} filas y el dataset {len(self.bid)}")
+        self.book = book
+
+        # Hurst/Lyapunov por step: se calculan una vez por CSV y se cachean en disco.
+        # feature_engine="online" usa online_features (el mismo motor que el bot en vivo);
+        # sin precompute, ese motor se actualiza tick a tick durante el episodio
+        self.feature_window = feature_window
+        self.feature_engine = feature_engine
+        self.online_features = None
+        self.hurst_track = None
+        self.lyap_track = None
+        self.feature_failures_track = None
+        if precompute_features:
+            self.hurst_track, self.lyap_track, self.feature_failures_track = self._load_feature_tracks(
+                feature_cache_dir)
+
+        # Inicios de episodio válidos por archivo y probabilidad de cada archivo.
+        # span=(desde, hasta): los episodios quedan dentro de ese tramo cronológico de cada
+        # archivo, en fracciones de su largo (walk_forward.py); las features siguen mirando
+        # las filas previas al tramo, como en vivo
+        self.segment_bounds = np.array(self.market.segments, dtype=np.int64).reshape(-1, 2)
+        self.segment_pairs = [pair for _, _, pair, _ in self.dataset.segments]
+        self.span = span
+        self.episode_bounds = self.segment_bounds
+        if span is not None:
+            lengths = self.segment_bounds[:, 1] - self.segment_bounds[:, 0]
+            self.episode_bounds = self.segment_bounds[:, :1] + np.stack(
+                [(lengths * span[0]).astype(np.int64), (lengths * span[1]).astype(np.int64)], axis=1)
+        self.valid_starts = np.maximum(self.episode_bounds[:, 1] - self.episode_bounds[:, 0] - max_steps, 0)
+        if not self.valid_starts.any():
+            raise ValueError(f"Ningún dataset tiene más de max_steps={max_steps} filas"
+                             + (f" en el tramo {span}" if span is not None else ""))
+        self.segment_probs = None if pair_weights is None else self._segment_probs(pair_weights)
+        self.segment = 0
+
         self.observation_space = spaces.Box(low=0, high=np.inf, shape=(5,), dtype=np.float32)
         self.action_space = spaces.Discrete(3)
 
+        # Perfilado por fase del step (instrumentation.py); None = deshabilitado
+        self.profiler = StepProfiler() if profile else None
+
+        # Grabación de trayectorias para re-puntuar reward configs (trajectories.py); None = no graba
+        self.recorder = None
+        if record_path:
+            from trajectories import TrajectoryRecorder
+            self.recorder = TrajectoryRecorder(record_path, self.reward_config)
+
         self.current_step = 0
         self.start_step = 0
         self.cash = 1000.0
@@ -38,87 +110,207 @@ class SimplifiedTradingEnv(gym.Env):
         self.fee_rate = self.reward_config.get("fee_rate", 0.001)
         self.last_equity = self.cash
         self.total_reward = 0
-        self.trades = []
+        # Fills y PnL realizado en O(1) por trade; la recompensa sigue usando inventory_value
+        self.ledger = PositionLedger()
+        # Equity del episodio en un buffer fijo de max_steps (se reutiliza en cada reset)
+        self._equity = np.zeros(max_steps)
+        self._equity_len = 0
+
+    def _load_feature_tracks(self, cache_dir):
+        if len(self.dataset.segments) == 1:
+            return load_feature_track(self.market.source_key, self.bid, window=self.feature_window,
+                                      min_window=FEATURE_MIN_WINDOW, cache_dir=cache_dir, engine=self.feature_engine)
+
+        # Varios archivos: track de cada uno (reusa su cache) concatenado en un .npy del
+        # store, abierto con mmap -> los workers comparten las páginas
+        def compute():
+            parts = [load_feature_track(key, self.bid[start:stop], window=self.feature_window,
+                                        min_window=FEATURE_MIN_WINDOW, cache_dir=cache_dir, engine=self.feature_engine)
+                     for start, stop, _, key in self.dataset.segments]
+            return np.stack([np.concatenate([part[k] for part in parts]).astype(np.float64) for k in range(3)])
+
+        tracks = self.dataset.derived(
+            f"features_{self.feature_engine}_w{self.feature_window}_m{FEATURE_MIN_WINDOW}_v{FEATURE_VERSION}", compute)
+        return tracks[0], tracks[1], tracks[2]
+
+    def _segment_probs(self, pair_weights):
+        # Peso por par (los no listados pesan 1); dentro de un par, proporcional a los inicios válidos
+        unknown = set(pair_weights) - set(self.segment_pairs)
+        if unknown:
+            raise ValueError(f"pair_weights con pares que no están en los datasets: {sorted(unknown)}")
+        probs = np.zeros(len(self.segment_pairs))
+        for pair in set(self.segment_pairs):
+            mask = np.array([p == pair for p in self.segment_pairs])
+            valid = self.valid_starts[mask]
+            if valid.sum():
+                probs[mask] = pair_weights.get(pair, 1.0) * valid / valid.sum()
+        if probs.sum() <= 0:
+            raise ValueError("pair_weights deja todos los datasets con peso 0")
+        return probs / probs.sum()
+
+    def sample_start(self, rng):
+        # (step inicial, archivo) de un episodio que entra completo en su archivo. Sin pesos,
+        # uniforme sobre todos los inicios válidos (con un archivo: el mismo sorteo de siempre)
+        if self.segment_probs is None:
+            k = int(rng.integers(0, self.valid_starts.sum()))
+            offsets = np.cumsum(self.valid_starts)
+            segment = int(np.searchsorted(offsets, k, side="right"))
+            k -= int(offsets[segment] - self.valid_starts[segment])
+        else:
+            segment = int(rng.choice(len(self.segment_probs), p=self.segment_probs))
+            k = int(rng.integers(0, self.valid_starts[segment]))
+        return int(self.episode_bounds[segment, 0]) + k, segment
+
+    def enable_profiling(self):
+        # Para activarlo desde un VecEnv: vec_env.env_method("enable_profiling")
+        if self.profiler is None:
+            self.profiler = StepProfiler()
+        return self.profiler
+
+    def reset_profiler(self):
+        # Vacía el histograma y los contadores (ProfilingCallback lo llama después de cada rollout)
+        if self.profiler is not None:
+            self.profiler.reset()
+
+    @property
+    def segment_start(self):
+        return int(self.segment_bounds[self.segment, 0])
+
+    @property
+    def pair(self):
+        # Par del episodio actual
+        return self.segment_pairs[self.segment]
+
+    @property
+    def equity_history(self):
+        return self._equity[:self._equity_len]
+
+    @property
+    def trades(self):
+        # Vista de compatibilidad: (step, "BUY", ask) / (step, "SELL", bid, bid * inventario)
+        return [
+            (int(f["ts"]), "BUY", float(f["price"])) if f["side"] == BUY
+            else (int(f["ts"]), "SELL", float(f["price"]), float(f["price"] * f["qty"]))
+            for f in self.ledger.fills.view()
+        ]
+
+    @property
+    def df(self):
+        # DataFrame bajo demanda, solo para scripts que lo leen directamente
+        if self._df is None:
+            self._df = self.market.to_frame()
+        return self._df
 
     def reset(self, seed=None, options=None):
-        self.start_step = np.random.randint(0, len(self.df) - self.max_steps)
+        # RNG propio del env (gymnasium): con el mismo seed, los mismos episodios
+        super().reset(seed=seed)
+        if options and "start" in options:
+            # Episodio desde una fila fija (evaluación que recorre un tramo entero)
+            self.start_step = int(options["start"])
+            self.segment = int(np.searchsorted(self.segment_bounds[:, 0], self.start_step, side="right")) - 1
+            if self.start_step + self.max_steps >= self.segment_bounds[self.segment, 1]:
+                raise ValueError(f"El episodio desde la fila {self.start_step} no entra en su archivo")
+        else:
+            self.start_step, self.segment = self.sample_start(self.np_random)
         self.current_step = self.start_step
+        # Ruido de exploración del episodio, sorteado de una vez
+        self.noise = self.np_random.normal(0, 0.01, size=self.max_steps)
         self.cash = 1000.0
         self.inventory = 0
         self.inventory_value = 0.0
         self.last_equity = 1000.0
         self.total_reward = 0
-        self.trades = []
+        self.ledger.reset()
         self.cash_history = []
         self.inventory_history = []
         self.reward_history = []
         self.prev_inventory = 0
-        self.equity_history = []
+        self._equity_len = 0
+        if self.recorder is not None:
+            self.recorder.new_episode()
+        if self.feature_engine == "online" and self.hurst_track is None:
+            # Precalienta el motor con la ventana previa al inicio del episodio
+            self.online_features = OnlineFeatures(self.feature_window)
+            first = max(self.segment_start, self.start_step - self.feature_window)
+            for bid in self.bid[first:self.start_step]:
+                self.online_features.update(bid)
         return self._get_observation(), {}
 
     def _get_observation(self):
-        row = self.df.iloc[self.current_step]
+        i = self.current_step
         return np.array([
-            row['bid'],
-            row['ask'],
-            row['spread_percentage'],
+            self.bid[i],
+            self.ask[i],
+            self.spread[i],
             self.inventory,
             self.cash
         ], dtype=np.float32)
 
     def _compute_hurst_lyap(self):
-        start = max(0, self.current_step - 50)
+        # (hurst, lyap, fallos del cálculo)
+        i = self.current_step
+        if self.hurst_track is not None:
+            return self.hurst_track[i], self.lyap_track[i], self.feature_failures_track[i]
+
+        engine = self.online_features
+        if engine is not None:
+            hurst, lyap, _ = engine.values()
+            failures = engine.window_failures
+            engine.update(self.bid[i])  # queda listo para el step siguiente
+            return hurst, lyap, failures
+
+        start = max(self.segment_start, self.current_step - self.feature_window)
         end = self.current_step
-        window = self.df['bid'].iloc[start:end].values
-
-        if len(window) < 20:
-            return 0.5, 0.1  # valores neutros
-
-        try:
-            H, _, _ = compute_Hc(window, kind='price')
-        except:
-            H = 0.5
-
-        try:
-            lyap = nolds.lyap_r(window)
-        except:
-            lyap = 0.1
-
-        return H, lyap
+        window = self.bid[start:end]
+        return hurst_lyap_with_failures(window, FEATURE_MIN_WINDOW)
 
     def step(self, action):
-        row = self.df.iloc[self.current_step]
-        bid = float(row['bid'])
-        ask = float(row['ask'])
+        bid = float(self.bid[self.current_step])
+        ask = float(self.ask[self.current_step])
+
+        prof = self.profiler
+        if prof is not None:
+            t0 = perf_counter_ns()
+            fills_before = len(self.ledger.fills)
+        rec = self.recorder
+        if rec is not None:
+            before = (self.inventory, self.inventory_value, self.cash, self.last_equity)
 
         done = False
         reward = 0
-        hurst, lyap = self._compute_hurst_lyap()
+        hurst, lyap, feature_failures = self._compute_hurst_lyap()
+        if prof is not None:
+            t1 = perf_counter_ns()
+            prof.record("features", t1 - t0)
 
         # Compra si hay cash
         if action == 1 and self.cash >= ask:
+            if self.book is not None:
+                ask = self.book.price(BUY, self.current_step, 1)
             self.inventory += 1
             fee = ask * self.fee_rate
             self.cash -= fee
             self.inventory_value += ask
             reward += self.reward_config["reward_trade"]  # premio por comprar
             reward -= 0.06 * (self.inventory ** self.reward_config["reward_inventory"])
-            self.trades.append((self.current_step, "BUY", ask))
+            self.ledger.buy(1, ask, fee=fee, ts=self.current_step)
 
         elif action == 2 and self.inventory > 0:
+            # Precio de vender todo el inventario (con book: promedio recorriendo los bids)
+            price = bid if self.book is None else self.book.price(SELL, self.current_step, self.inventory)
             avg_price = self.inventory_value / (self.inventory + 1e-8)
             self.inventory_value -= avg_price
-            diff = bid - avg_price
+            diff = price - avg_price
 
             if diff > 0:
-                base_gain = bid * self.inventory
+                base_gain = price * self.inventory
                 reward += self.reward_config["reward_profit"] * base_gain
                 if hurst < 0.45:
                     reward += 1.0  # bonus específico
-                self.trades.append((self.current_step, "SELL", bid, base_gain))
-                self.cash += bid * self.inventory
-                fee = bid * self.inventory * self.fee_rate
+                self.cash += price * self.inventory
+                fee = price * self.inventory * self.fee_rate
                 self.cash -= fee
+                self.ledger.sell(self.inventory, price, fee=fee, ts=self.current_step)
                 self.inventory = 0
             else:
                 reward += self.reward_config["reward_loss"] * abs(diff)
@@ -146,19 +338,26 @@ class SimplifiedTradingEnv(gym.Env):
         equity = self.cash + self.inventory * bid
         reward += (equity - self.last_equity) * 0.1
         self.last_equity = equity
-        self.equity_history.append(equity)
+        self._equity[self._equity_len] = equity
+        self._equity_len += 1
+        if prof is not None:
+            t2 = perf_counter_ns()
+            prof.record("reward", t2 - t1)
 
         # Volatilidad local para escalar
-        window = self.df['bid'].iloc[max(0, self.current_step - 10):self.current_step]
-        if len(window) > 1:
-            volatility = np.std(window)
-            reward *= 1 + (volatility * 2)
+        # (0.0 en las primeras barras, donde la ventana tiene menos de 2 valores)
+        volatility = self.volatility[self.current_step]
+        reward *= 1 + (volatility * 2)
+        if prof is not None:
+            t3 = perf_counter_ns()
+            prof.record("volatility", t3 - t2)
 
         # Exploración
-        reward += np.random.normal(0, 0.01)
+        reward += self.noise[self.current_step - self.start_step]
 
 
-        if self.inventory >= 10:
+        forced = self.inventory >= 10
+        if forced:
             done = True  # o bloquear compras
         # Finalizar episodio
         self.current_step += 1
@@ -166,9 +365,29 @@ class SimplifiedTradingEnv(gym.Env):
             if (self.cash + self.inventory * bid) > 1000:
                 reward += 5
             done = True
-
-        return self._get_observation(), reward, done, False, {}
-
+        if rec is not None:
+            rec.record(self, self.current_step - 1, action, hurst, lyap, before, reward, done)
+
+        if prof is None:
+            return self._get_observation(), reward, done, False, {}
+
+        t4 = perf_counter_ns()
+        obs = self._get_observation()
+        prof.record("observation", perf_counter_ns() - t4)
+        counters = prof.counters
+        counters["steps"] += 1
+        counters["episodes"] += done
+        counters["forced_terminations"] += forced
+        counters["feature_failures"] += int(feature_failures)
+        # El ledger se limpia en cada reset, así que los fills nuevos del step son los últimos
+        for fill in self.ledger.fills.view()[fills_before:]:
+            counters["buys" if fill["side"] == BUY else "sells"] += 1
+        return obs, reward, done, False, {}
+
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
 
     def render(self):
         print(f"Step: {self.current_step} | Cash: {self.cash:.2f} | Inventory: {self.inventory} | Total Reward: {self.total_reward:.4f}")
@@ -179,13 +398,15 @@ class SimplifiedTradingEnv(gym.Env):
             print(trade)
         print(f"\nFinal Cash: {self.cash:.2f}")
         print(f"Final Inventory: {self.inventory}")
-        self.final_equity = self.cash + self.inventory * self.df.iloc[self.current_step]['bid']
+        self.final_equity = self.cash + self.inventory * self.bid[self.current_step]
         print(f"Final Equity: {self.final_equity:.2f}")
     
     def get_final_equity(self):
         return self.final_equity  # o la lógica que uses para calcularla
 
     def plot_metrics(self):
+        import matplotlib.pyplot as plt
+
         steps = list(range(len(self.cash_history)))
 
         fig, axs = plt.subplots(3, 1, figsize=(10, 8), sharex=True)
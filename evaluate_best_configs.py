@@ -1,48 +1,44 @@
 import json
 import os
-import pandas as pd
-from stable_baselines3 import PPO
-from env_simple import SimplifiedTradingEnv
-import numpy as np
+from evaluation import run_evaluation, summarize
 
 # Rutas
 CSV_PATH = "data/BITSO-XRP_MXN-1000_depth-1748377579235.csv"
 CONFIG_DIR = "models"  # Carpeta con config_XXXX.json
-N_RUNS = 3  # Cuántas veces entrenar cada config
-
-results = []
-
-# Buscar archivos JSON de configuración
-config_files = [f for f in os.listdir(CONFIG_DIR) if f.startswith("config_") and f.endswith(".json")]
-config_files.sort()  # Opcional: orden alfabético
-
-for cfg_file in config_files:
-    with open(os.path.join(CONFIG_DIR, cfg_file)) as f:
-        reward_config = json.load(f)
-
-    print(f"📊 Evaluando configuración: {cfg_file}")
-    equities = []
-
-    for i in range(N_RUNS):
-        env = SimplifiedTradingEnv(CSV_PATH, reward_config=reward_config)
-        model = PPO("MlpPolicy", env, verbose=0)
-        model.learn(total_timesteps=50_000)
-
-        bid = env.df.iloc[env.current_step - 1]["bid"]
-        equity = env.cash + env.inventory * bid
-        equities.append(equity)
-
-    mean_eq = np.mean(equities)
-    std_eq = np.std(equities)
-
-    results.append({
-        "config_file": cfg_file,
-        "mean_equity": mean_eq,
-        "std_equity": std_eq,
-        **reward_config  # Despliega cada parámetro como columna
-    })
-
-# Guardar a CSV
-df = pd.DataFrame(results)
-df.to_csv("best_config_evaluation.csv", index=False)
-print("\nEvaluación completa. Resultados guardados en best_config_evaluation.csv")
+N_RUNS = 3  # Cuántas veces entrenar cada config (seeds 0..N_RUNS-1)
+TIMESTEPS = 50_000
+WORKERS = None  # None = todos los cores / TORCH_THREADS
+TORCH_THREADS = 1  # threads de torch por proceso
+RUNS_CSV = "best_config_runs.csv"  # una fila por (config, seed), se escribe a medida que terminan
+# Warm start: cada run arranca de este checkpoint (ej. "models/model_equity_1007_8.zip") y
+# entrena WARM_TIMESTEPS en vez de TIMESTEPS (corridas en WARM_RUNS_CSV). None = desde cero
+PARENT = None
+WARM_TIMESTEPS = 15_000
+WARM_RUNS_CSV = "best_config_runs_warm.csv"
+
+
+def load_configs():
+    # Buscar archivos JSON de configuración
+    config_files = [f for f in os.listdir(CONFIG_DIR) if f.startswith("config_") and f.endswith(".json")]
+    config_files.sort()  # Opcional: orden alfabético
+    configs = {}
+    for cfg_file in config_files:
+        with open(os.path.join(CONFIG_DIR, cfg_file)) as f:
+            configs[cfg_file] = json.load(f)
+    return configs
+
+
+if __name__ == "__main__":
+    configs = load_configs()
+    print(f"📊 Evaluando {len(configs)} configuraciones x {N_RUNS} seeds")
+
+    runs = run_evaluation(configs, seeds=range(N_RUNS), csv_path=CSV_PATH,
+                          timesteps=WARM_TIMESTEPS if PARENT else TIMESTEPS,
+                          runs_csv=WARM_RUNS_CSV if PARENT else RUNS_CSV,
+                          workers=WORKERS, torch_threads=TORCH_THREADS, parent=PARENT)
+
+    # Guardar a CSV
+    df = summarize(runs, configs)
+    df.to_csv("best_config_evaluation.csv", index=False)
+    print(df[["config", "n_runs", "mean_equity", "std_equity", "mean_max_drawdown", "median_profit_factor"]])
+    print("\nEvaluación completa. Resultados guardados en best_config_evaluation.csv")
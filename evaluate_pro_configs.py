@@ -1,8 +1,4 @@
-import json
-import pandas as pd
-import numpy as np
-from stable_baselines3 import PPO
-from env_simple import SimplifiedTradingEnv
+from evaluation import run_evaluation, summarize
 
 
 # === CONFIGURACIÓN ===
@@ -23,51 +19,21 @@ BEST_CONFIG = {
 }
 N_RUNS = 5
 TIMESTEPS = 150_000
-results = []
+WORKERS = None  # None = todos los cores / TORCH_THREADS
+TORCH_THREADS = 1
 
-def calculate_max_drawdown(equity_curve):
-    peak = np.maximum.accumulate(equity_curve)
-    drawdown = (equity_curve - peak) / peak
-    return drawdown.min()
 
-def calculate_profit_factor(trades):
-    profits = [t[3] for t in trades if t[1] == "SELL" and len(t) > 3 and t[3] > 0]
-    losses = [-t[3] for t in trades if t[1] == "SELL" and len(t) > 3 and t[3] < 0]
-    total_profit = sum(profits)
-    total_loss = sum(losses)
-    if total_loss == 0:
-        return float('inf') if total_profit > 0 else 0
-    return total_profit / total_loss
+if __name__ == "__main__":
+    # Guardar y mostrar resultados (una fila por run, se escribe a medida que terminan)
+    results_df = run_evaluation({"best_pro": BEST_CONFIG}, seeds=range(N_RUNS), csv_path=CSV_PATH,
+                                timesteps=TIMESTEPS, runs_csv="best_pro_evaluation.csv",
+                                workers=WORKERS, torch_threads=TORCH_THREADS)
+    summary = summarize(results_df).iloc[0]
 
-for run in range(N_RUNS):
-    env = SimplifiedTradingEnv(CSV_PATH, reward_config=BEST_CONFIG)
-    model = PPO("MlpPolicy", env, verbose=0)
-    model.learn(total_timesteps=TIMESTEPS)
+    print(f"📉 Max Drawdown medio: {summary['mean_max_drawdown']:.2%} (peor: {summary['worst_max_drawdown']:.2%})")
+    print(f"📈 Profit Factor mediano: {summary['median_profit_factor']:.2f}")
 
-    bid = env.df.iloc[env.current_step - 1]["bid"]
-    final_equity = env.cash + env.inventory * bid
-
-    results.append({
-        "run": run + 1,
-        "final_cash": env.cash,
-        "final_inventory": env.inventory,
-        "final_equity": final_equity,
-        "num_trades": len(env.trades),
-        "num_sell_trades": len([t for t in env.trades if t[1] == "SELL"])
-    })
-
-# Guardar y mostrar resultados
-results_df = pd.DataFrame(results)
-results_df.to_csv("best_pro_evaluation.csv", index=False)
-
-equity_curve = env.equity_history if hasattr(env, "equity_history") else []
-max_drawdown = calculate_max_drawdown(equity_curve) if equity_curve else 0
-profit_factor = calculate_profit_factor(env.trades)
-
-print(f"📉 Max Drawdown: {max_drawdown:.2%}")
-print(f"📈 Profit Factor: {profit_factor:.2f}")
-
-print("\n✅ Evaluación completada:")
-print(results_df)
-print("\n📊 Media equity:", results_df["final_equity"].mean())
-print("📉 Desvío estándar equity:", results_df["final_equity"].std())
+    print("\n✅ Evaluación completada:")
+    print(results_df)
+    print("\n📊 Media equity:", summary["mean_equity"])
+    print("📉 Desvío estándar equity:", summary["std_equity"])
@@ -1,13 +1,17 @@
-from stable_baselines3 import PPO
 from env_simple import SimplifiedTradingEnv
+from registry import ModelRegistry
 
 #csv_path = "data/BITSO-XRP_MXN-1000_depth-1748377579235.csv"
 csv_path = "data/BITSO-USD_BRL-1000_depth-1748377578952.csv"
 
-model_path = "model_equity_2125"
+# id del registro (python registry.py top) o path; None = el de mejor equity en este dataset
+model_id = "model_equity_2125"
 
 env = SimplifiedTradingEnv(csv_path, max_steps=500)
-model = PPO.load(model_path)
+registry = ModelRegistry()
+if model_id is None:
+    model_id = registry.top(1, dataset=csv_path)[0]["id"]
+model = registry.load(model_id)
 
 obs, _ = env.reset()
 done = False
@@ -0,0 +1,144 @@
+# evaluation.py
+# Evaluación multi-seed en paralelo: cada job (config, seed) entrena un PPO
+# completo en un proceso del pool, con seed explícito y N threads de torch por
+# worker. Cada resultado se agrega al CSV de corridas apenas termina, así que
+# una corrida parcial sirve igual (y al relanzar se saltean los jobs ya hechos).
+import csv
+import multiprocessing
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from ledger import SELL
+
+RUN_FIELDS = [
+    "config", "seed", "final_cash", "final_inventory", "final_equity",
+    "max_drawdown", "profit_factor", "num_trades", "num_sell_trades",
+    "timesteps", "train_seconds", "parent",
+]
+
+
+def calculate_max_drawdown(equity_curve):
+    equity_curve = np.asarray(equity_curve, dtype=np.float64)
+    if len(equity_curve) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(equity_curve)
+    drawdown = (equity_curve - peak) / peak
+    return float(drawdown.min())
+
+
+def calculate_profit_factor(fills):
+    # fills: FillLog del ledger; usa el PnL realizado (neto de fees) de cada venta
+    fills = fills.view()
+    pnl = fills["pnl"][fills["side"] == SELL]
+    total_profit = float(pnl[pnl > 0].sum())
+    total_loss = float(-pnl[pnl < 0].sum())
+    if total_loss == 0:
+        return float('inf') if total_profit > 0 else 0
+    return total_profit / total_loss
+
+
+def _init_worker(torch_threads):
+    warnings.filterwarnings("ignore", category=UserWarning)
+    import torch
+    torch.set_num_threads(torch_threads)
+
+
+def run_job(job):
+    from stable_baselines3 import PPO
+    from env_simple import SimplifiedTradingEnv
+
+    env = SimplifiedTradingEnv(job["csv_path"], reward_config=job["reward_config"])
+    model = PPO("MlpPolicy", env, verbose=0, seed=job["seed"])
+    if job.get("parent"):
+        # Warm start: arranca de los pesos del checkpoint padre
+        model.set_parameters(job["parent"], exact_match=True)
+    start = time.perf_counter()
+    model.learn(total_timesteps=job["timesteps"])
+    train_seconds = time.perf_counter() - start
+
+    bid = env.bid[env.current_step - 1]
+    return {
+        "config": job["config"],
+        "seed": job["seed"],
+        "final_cash": float(env.cash),
+        "final_inventory": float(env.inventory),
+        "final_equity": float(env.cash + env.inventory * bid),
+        "max_drawdown": calculate_max_drawdown(env.equity_history),
+        "profit_factor": calculate_profit_factor(env.ledger.fills),
+        "num_trades": len(env.ledger.fills),
+        "num_sell_trades": env.ledger.fills.count(SELL),
+        "timesteps": job["timesteps"],
+        "train_seconds": train_seconds,
+        "parent": job.get("parent") or "",
+    }
+
+
+def load_done(runs_csv):
+    if not os.path.exists(runs_csv) or os.path.getsize(runs_csv) == 0:
+        return set()
+    runs = pd.read_csv(runs_csv)
+    return set(zip(runs["config"].astype(str), runs["seed"].astype(int)))
+
+
+def run_evaluation(configs, seeds, csv_path, timesteps, runs_csv, workers=None, torch_threads=1, parent=None):
+    # configs: {nombre: reward_config}; un job por cada (config, seed).
+    # parent: checkpoint del que arranca cada job (warm start); None = desde cero
+    done = load_done(runs_csv)
+    jobs = [
+        {"config": name, "reward_config": cfg, "seed": int(seed), "csv_path": csv_path, "timesteps": timesteps,
+         "parent": parent}
+        for name, cfg in configs.items()
+        for seed in seeds
+        if (name, int(seed)) not in done
+    ]
+    workers = workers or max(1, (os.cpu_count() or 1) // torch_threads)
+    print(f"📊 {len(jobs)} jobs pendientes ({len(done)} ya hechos) en {workers} procesos x {torch_threads} thread(s)")
+
+    new_file = not os.path.exists(runs_csv) or os.path.getsize(runs_csv) == 0
+    fields = RUN_FIELDS
+    if not new_file:
+        # CSV de una versión anterior: se sigue escribiendo con sus columnas
+        with open(runs_csv, newline="") as f:
+            fields = next(csv.reader(f))
+    with open(runs_csv, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        if new_file:
+            writer.writeheader()
+        if jobs:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                     initializer=_init_worker, initargs=(torch_threads,)) as pool:
+                futures = [pool.submit(run_job, job) for job in jobs]
+                for i, future in enumerate(as_completed(futures), 1):
+                    row = future.result()
+                    writer.writerow(row)
+                    f.flush()
+                    print(f"[{i}/{len(jobs)}] {row['config']} seed={row['seed']} equity={row['final_equity']:.2f}")
+
+    return pd.read_csv(runs_csv)
+
+
+def summarize(runs, configs=None):
+    summary = runs.groupby("config").agg(
+        n_runs=("final_equity", "size"),
+        mean_equity=("final_equity", "mean"),
+        std_equity=("final_equity", lambda x: np.std(x)),
+        mean_max_drawdown=("max_drawdown", "mean"),
+        worst_max_drawdown=("max_drawdown", "min"),
+        # Mediana: un run sin pérdidas tiene profit factor inf y arrastraría la media a inf
+        median_profit_factor=("profit_factor", "median"),
+    ).reset_index()
+    if "train_seconds" in runs:
+        # Costo de entrenamiento por config (para comparar warm start vs. desde cero)
+        summary = summary.merge(runs.groupby("config")["train_seconds"].mean().rename("mean_train_seconds"),
+                                on="config", how="left")
+    if configs:
+        # Despliega cada parámetro como columna
+        params = pd.DataFrame([{"config": name, **cfg} for name, cfg in configs.items()])
+        summary = summary.merge(params, on="config", how="left")
+    return summary
@@ -0,0 +1,134 @@
+# feature_cache.py
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CACHE_DIR = "cache/features"
+FEATURE_WINDOW = 50  # barras de bid hacia atrás para Hurst/Lyapunov
+FEATURE_MIN_WINDOW = 20  # por debajo de esto se devuelven valores neutros
+NEUTRAL_HURST = 0.5
+NEUTRAL_LYAP = 0.1
+# Subir este número si cambia la forma de calcular las features (invalida el cache)
+FEATURE_VERSION = 2  # v2: el cache guarda también la cantidad de fallos por step
+# "batch": hurst/nolds sobre cada ventana; "online": online_features, una pasada incremental
+FEATURE_ENGINES = ("batch", "online")
+
+
+def hurst_lyap_with_failures(window, min_window=FEATURE_MIN_WINDOW):
+    # (hurst, lyap, fallos): fallos = cuántos de los dos cálculos cayeron al valor neutro por error
+    if len(window) < min_window:
+        return NEUTRAL_HURST, NEUTRAL_LYAP, 0  # valores neutros (ventana corta, no es un fallo)
+
+    # hurst y nolds (y pandas, que trae hurst) se cargan recién acá: con las features
+    # cacheadas o el motor online, importar el env no los necesita
+    from hurst import compute_Hc
+    import nolds
+
+    failures = 0
+    try:
+        H, _, _ = compute_Hc(window, kind='price')
+    except Exception:
+        H = NEUTRAL_HURST
+        failures += 1
+
+    try:
+        lyap = nolds.lyap_r(window)
+    except Exception:
+        lyap = NEUTRAL_LYAP
+        failures += 1
+
+    return H, lyap, failures
+
+
+def compute_hurst_lyap(window, min_window=FEATURE_MIN_WINDOW):
+    H, lyap, _ = hurst_lyap_with_failures(window, min_window)
+    return H, lyap
+
+
+def _compute_chunk(bids, first, last, window, min_window):
+    # Calcula las features para los steps [first, last) usando la misma
+    # ventana [step - window, step) que usaba el env en cada step
+    hurst = np.empty(last - first, dtype=np.float64)
+    lyap = np.empty(last - first, dtype=np.float64)
+    failures = np.empty(last - first, dtype=np.int8)
+    for i, step in enumerate(range(first, last)):
+        start = max(0, step - window)
+        hurst[i], lyap[i], failures[i] = hurst_lyap_with_failures(bids[start:step], min_window)
+    return first, hurst, lyap, failures
+
+
+def compute_feature_track(bids, window=FEATURE_WINDOW, min_window=FEATURE_MIN_WINDOW, n_jobs=None):
+    bids = np.ascontiguousarray(bids, dtype=np.float64)
+    n = len(bids)
+    hurst = np.full(n, NEUTRAL_HURST, dtype=np.float64)
+    lyap = np.full(n, NEUTRAL_LYAP, dtype=np.float64)
+    failures = np.zeros(n, dtype=np.int8)
+    if n == 0:
+        return hurst, lyap, failures
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, n))
+
+    if n_jobs == 1:
+        _, hurst[:], lyap[:], failures[:] = _compute_chunk(bids, 0, n, window, min_window)
+        return hurst, lyap, failures
+
+    # Cada chunk lleva solo su tramo de bids + las `window` barras previas
+    bounds = np.linspace(0, n, n_jobs * 4 + 1, dtype=int)
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        futures = []
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            if first == last:
+                continue
+            offset = max(0, first - window)
+            futures.append((offset, pool.submit(
+                _compute_chunk, bids[offset:last], first - offset, last - offset, window, min_window)))
+        for offset, future in futures:
+            first, h, l, f = future.result()
+            hurst[offset + first:offset + first + len(h)] = h
+            lyap[offset + first:offset + first + len(l)] = l
+            failures[offset + first:offset + first + len(f)] = f
+    return hurst, lyap, failures
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def feature_cache_path(source_key, window=FEATURE_WINDOW, min_window=FEATURE_MIN_WINDOW, cache_dir=CACHE_DIR,
+                       engine="batch"):
+    prefix = "hl" if engine == "batch" else "hlo"
+    name = f"{prefix}_{source_key[:16]}_w{window}_m{min_window}_v{FEATURE_VERSION}.npz"
+    return os.path.join(cache_dir, name)
+
+
+def load_feature_track(source_key, bids, window=FEATURE_WINDOW, min_window=FEATURE_MIN_WINDOW,
+                       cache_dir=CACHE_DIR, n_jobs=None, engine="batch"):
+    # Devuelve (hurst, lyap, fallos) por step; los calcula una sola vez por serie, ventana y motor.
+    # source_key identifica el contenido de `bids` (ej. file_hash del CSV)
+    if engine not in FEATURE_ENGINES:
+        raise ValueError(f"engine desconocido: {engine!r} (opciones: {FEATURE_ENGINES})")
+    path = feature_cache_path(source_key, window, min_window, cache_dir, engine)
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            hurst, lyap, failures = cached["hurst"], cached["lyap"], cached["failures"]
+        if len(hurst) == len(bids):
+            return hurst, lyap, failures
+
+    if engine == "online":
+        from online_features import online_feature_track  # importa este módulo
+        hurst, lyap, failures = online_feature_track(bids, window)
+    else:
+        hurst, lyap, failures = compute_feature_track(bids, window, min_window, n_jobs)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, hurst=hurst, lyap=lyap, failures=failures)
+    os.replace(tmp_path, path)  # escritura atómica: varios procesos pueden compartir el cache
+    return hurst, lyap, failures
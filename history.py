@@ -0,0 +1,108 @@
+# history.py
+# Historial de memoria acotada para los bots de larga duración.
+#
+# RingHistory guarda las últimas `capacity` filas en un ring buffer de NumPy
+# (array estructurado, tamaño fijo) y, si tiene `spill_path`, las va agregando
+# por lotes a un archivo binario append-only:
+#   <spill_path>         registros crudos little-endian, uno detrás de otro
+#   <spill_path>.json    dtype de los registros
+# La memoria no crece con el tiempo de corrida; el historial completo queda en
+# disco y se lee con open_history() (np.memmap, sin cargarlo entero).
+import json
+import os
+
+import numpy as np
+
+HISTORY_DIR = "history"
+HISTORY_CAPACITY = 10_000
+
+EQUITY_DTYPE = np.dtype([
+    ("ts", "<i8"),       # epoch en ns
+    ("equity", "<f8"),
+])
+
+
+class RingHistory:
+    def __init__(self, dtype, capacity=HISTORY_CAPACITY, spill_path=None, flush_every=None):
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=self.dtype)
+        self.total = 0      # filas agregadas desde el inicio (incluye las que ya estaban en disco)
+        self.flushed = 0    # filas ya escritas a disco
+        # El lote pendiente nunca puede superar al ring: si no, se pisarían filas sin escribir
+        self.flush_every = min(flush_every or max(1, capacity // 4), capacity)
+        self.spill_path = spill_path
+        self.spill = None
+        if spill_path:
+            self._open_spill(spill_path)
+        self.start = self.total  # primera fila presente en memoria
+
+    def _open_spill(self, spill_path):
+        meta_path = spill_path + ".json"
+        # Ida y vuelta por JSON: los campos con shape (ej. obs de 5) quedan como listas
+        meta = json.loads(json.dumps({"dtype": [list(field) for field in self.dtype.descr]}))
+        if os.path.exists(spill_path) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f) != meta:
+                    raise ValueError(f"{spill_path} tiene otro formato de registro")
+        os.makedirs(os.path.dirname(os.path.abspath(spill_path)), exist_ok=True)
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+        self.spill = open(spill_path, "ab")
+        # Se continúa el archivo existente; un registro final cortado (corte abrupto) se descarta
+        rows = os.path.getsize(spill_path) // self.dtype.itemsize
+        self.spill.truncate(rows * self.dtype.itemsize)
+        self.flushed = self.total = rows
+
+    def append(self, *row):
+        self.buffer[self.total % self.capacity] = row
+        self.total += 1
+        if self.spill is not None and self.total - self.flushed >= self.flush_every:
+            self.flush()
+
+    def _rows(self, start, stop):
+        # Filas [start, stop) en orden, resolviendo la vuelta del ring
+        if stop == start:
+            return self.buffer[:0]
+        i, j = start % self.capacity, stop % self.capacity
+        if i < j:
+            return self.buffer[i:j]
+        return np.concatenate([self.buffer[i:], self.buffer[:j]])
+
+    def flush(self):
+        if self.spill is None or self.total == self.flushed:
+            return
+        self.spill.write(self._rows(self.flushed, self.total).tobytes())
+        self.spill.flush()
+        self.flushed = self.total
+
+    def view(self):
+        # Copia de las filas en memoria, de la más vieja a la más nueva
+        return self._rows(max(self.start, self.total - self.capacity), self.total).copy()
+
+    def last(self):
+        return self.buffer[(self.total - 1) % self.capacity] if self.total > self.start else None
+
+    def clear(self):
+        # Vacía la memoria; lo ya escrito a disco queda
+        self.flush()
+        self.start = self.total
+
+    def close(self):
+        self.flush()
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+    def __len__(self):
+        return self.total
+
+
+def open_history(spill_path):
+    # Historial completo desde disco, memory-mapped (solo lectura)
+    with open(spill_path + ".json") as f:
+        dtype = np.dtype([tuple(field) for field in json.load(f)["dtype"]])
+    rows = os.path.getsize(spill_path) // dtype.itemsize  # ignora un registro final cortado
+    if rows == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(spill_path, dtype=dtype, mode="r", shape=(rows,))
@@ -0,0 +1,196 @@
+# instrumentation.py
+# Perfilado opcional de SimplifiedTradingEnv.step.
+#
+# StepProfiler acumula, por fase del step, un histograma log-lineal de duraciones
+# (estilo HDR): cada potencia de 2 de nanosegundos se parte en SUB_BUCKETS buckets
+# lineales, así un cuantil (interpolado dentro de su bucket) erra a lo sumo
+# 1/SUB_BUCKETS del valor en vez de hasta 2x. Además lleva contadores de trades, terminaciones forzadas por inventario y fallos de
+# Hurst/Lyapunov. Deshabilitado (env.profiler = None) el step solo paga unos
+# `if` sobre una variable local.
+#
+#   env = SimplifiedTradingEnv(CSV_PATH, profile=True)
+#   ...
+#   print(env.profiler.summary())
+#   env.profiler.write_prometheus("env_profile.prom")
+#
+# callbacks.ProfilingCallback lo loguea junto a las fps de PPO y exporta a CSV / Prometheus.
+#
+# TickProfiler es lo mismo para cada tick de PaperTradingBot (fetch, predict,
+# órdenes, logging...) con contadores de ticks, errores y overruns;
+# serve_metrics lo expone por HTTP en formato Prometheus y queue_logging saca
+# el I/O de logging del loop de decisión.
+import os
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import QueueHandler, QueueListener
+
+PHASES = ("features", "reward", "volatility", "observation")
+COUNTERS = ("steps", "episodes", "buys", "sells", "forced_terminations", "feature_failures")
+SUB_BITS = 3
+SUB_BUCKETS = 2 ** SUB_BITS  # buckets lineales por potencia de 2
+HIST_BUCKETS = (40 - SUB_BITS) * SUB_BUCKETS  # hasta 2^39 ns (~9 min); lo que pase cae en el último
+
+
+def bucket_index(ns):
+    # Exacto por debajo de 2*SUB_BUCKETS ns; arriba, SUB_BUCKETS buckets de igual ancho por octava
+    shift = ns.bit_length() - SUB_BITS - 1
+    if shift <= 0:
+        return ns
+    return min((shift + 1) * SUB_BUCKETS + (ns >> shift) - SUB_BUCKETS, HIST_BUCKETS - 1)
+
+
+def bucket_bounds(index):
+    # [inicio, fin) en ns del bucket index
+    if index < 2 * SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    lower = (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+    return lower, lower + (1 << shift)
+
+
+class StepProfiler:
+    phases = PHASES
+    counter_names = COUNTERS
+    quantiles = (0.5, 0.99)
+    prefix = "trading_env"
+    metric = "step_phase_seconds"
+    description = "Duración de cada fase de SimplifiedTradingEnv.step"
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.hist = {phase: [0] * HIST_BUCKETS for phase in self.phases}
+        self.total_ns = dict.fromkeys(self.phases, 0)
+        self.counters = dict.fromkeys(self.counter_names, 0)
+
+    def record(self, phase, ns):
+        self.hist[phase][bucket_index(ns)] += 1
+        self.total_ns[phase] += ns
+
+    def merge(self, other):
+        # Suma otro profiler (ej. uno por env de un VecEnv)
+        for phase in self.phases:
+            self.hist[phase] = [a + b for a, b in zip(self.hist[phase], other.hist[phase])]
+            self.total_ns[phase] += other.total_ns[phase]
+        for name in self.counter_names:
+            self.counters[name] += other.counters[name]
+        return self
+
+    def count(self, phase):
+        return sum(self.hist[phase])
+
+    def quantile_ns(self, phase, q):
+        # Interpola linealmente dentro del bucket que contiene el cuantil q
+        counts = self.hist[phase]
+        target = q * sum(counts)
+        seen = 0
+        for k, c in enumerate(counts):
+            if c and seen + c >= target:
+                lower, upper = bucket_bounds(k)
+                return lower + (upper - lower) * (target - seen) / c
+            seen += c
+        return 0
+
+    def summary(self):
+        # Dict plano: <fase>_mean_us, <fase>_p50_us, <fase>_p99_us, <fase>_share + contadores
+        out = {}
+        total = sum(self.total_ns.values()) or 1
+        for phase in self.phases:
+            n = self.count(phase)
+            out[f"{phase}_mean_us"] = self.total_ns[phase] / n / 1e3 if n else 0.0
+            for q in self.quantiles:
+                out[f"{phase}_p{round(q * 100)}_us"] = self.quantile_ns(phase, q) / 1e3
+            out[f"{phase}_share"] = self.total_ns[phase] / total
+        out.update(self.counters)
+        return out
+
+    def to_prometheus(self, prefix=None, labels=None):
+        # Formato de texto de Prometheus (histogramas en segundos + contadores). Solo se
+        # exportan los límites en potencias de 2 (le = 2^k ns) para no inflar las series
+        prefix = prefix or self.prefix
+        metric = f"{prefix}_{self.metric}"
+        label_str = ",".join(f'{k}="{v}"' for k, v in (labels or {}).items())
+        sep = "," if label_str else ""
+        lines = [f"# HELP {metric} {self.description}",
+                 f"# TYPE {metric} histogram"]
+        for phase in self.phases:
+            cumulative = 0
+            for k, c in enumerate(self.hist[phase]):
+                cumulative += c
+                upper = bucket_bounds(k)[1]
+                if upper & (upper - 1) == 0:
+                    lines.append(f'{metric}_bucket{{{label_str}{sep}phase="{phase}",'
+                                 f'le="{upper / 1e9:.9g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label_str}{sep}phase="{phase}",le="+Inf"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{label_str}{sep}phase="{phase}"}} {self.total_ns[phase] / 1e9:.9g}')
+            lines.append(f'{metric}_count{{{label_str}{sep}phase="{phase}"}} {cumulative}')
+        counter_labels = f"{{{label_str}}}" if label_str else ""
+        for name in self.counter_names:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total{counter_labels} {self.counters[name]}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, prefix=None, labels=None):
+        # Escritura atómica: node_exporter (textfile collector) nunca lee un archivo a medias
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus(prefix, labels))
+        os.replace(tmp_path, path)
+
+
+TICK_PHASES = ("fetch", "record", "features", "observation", "predict", "orders", "log", "tick")
+TICK_COUNTERS = ("ticks", "snapshots", "errors", "overruns", "stale", "buys", "sells")
+
+
+class TickProfiler(StepProfiler):
+    # Etapas de un tick del bot; "tick" es la decisión completa (todo menos fetch)
+    phases = TICK_PHASES
+    counter_names = TICK_COUNTERS
+    quantiles = (0.5, 0.95, 0.99)
+    prefix = "paper_trading"
+    metric = "tick_stage_seconds"
+    description = "Duración de cada etapa de un tick de PaperTradingBot"
+
+    def summary_line(self):
+        # Una línea para el log: p50/p95/p99 en ms por etapa + contadores
+        stages = " | ".join(
+            f"{phase} " + "/".join(f"{self.quantile_ns(phase, q) / 1e6:.3g}" for q in self.quantiles)
+            for phase in self.phases if self.count(phase))
+        counters = " ".join(f"{name}={value}" for name, value in self.counters.items())
+        return f"Latencias p50/p95/p99 ms | {stages} | {counters}"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.server.profiler.to_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(profiler, port, host="127.0.0.1"):
+    # Endpoint local (GET en cualquier path) con el formato de Prometheus; devuelve el
+    # servidor (server.shutdown() para cortarlo). Corre en un thread daemon
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.profiler = profiler
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
+
+
+def queue_logging(logger, handlers):
+    # Los records van a una cola en memoria y un thread aparte los escribe con `handlers`:
+    # el que loguea nunca espera al disco ni a la consola. Devuelve el listener (stop() al cerrar)
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
+    listener.start()
+    return listener
@@ -0,0 +1,122 @@
+# ledger.py
+# Libro de posición con costo incremental, compartido por los bots y el env.
+#
+# PositionLedger lleva cantidad, costo de la posición abierta, fees y PnL
+# realizado de forma incremental: cada fill es O(1) (FIFO: O(1) amortizado,
+# cada lote entra y sale una vez), sin recorrer el historial.
+#   method="average": costo promedio de la posición abierta
+#   method="fifo":    los lotes más viejos se cierran primero
+# Los fills se guardan en FillLog, un array estructurado de NumPy que crece
+# por duplicación (no una lista de tuplas). Los bots de larga duración le pasan
+# en cambio un history.RingHistory(FILL_DTYPE, ...) para acotar la memoria.
+from collections import deque
+
+import numpy as np
+
+BUY, SELL = 1, -1
+SIDE_NAMES = {BUY: "BUY", SELL: "SELL"}
+EPS = 1e-12
+
+FILL_DTYPE = np.dtype([
+    ("ts", np.int64),      # step del env o epoch ns
+    ("side", np.int8),     # BUY / SELL
+    ("qty", np.float64),
+    ("price", np.float64),
+    ("fee", np.float64),
+    ("pnl", np.float64),   # PnL realizado neto de fees (0 en compras)
+])
+
+
+class FillLog:
+    def __init__(self, capacity=256):
+        self.data = np.zeros(capacity, dtype=FILL_DTYPE)
+        self.size = 0
+
+    def append(self, ts, side, qty, price, fee, pnl):
+        if self.size == len(self.data):
+            self.data = np.concatenate([self.data, np.zeros(len(self.data), dtype=FILL_DTYPE)])
+        self.data[self.size] = (ts, side, qty, price, fee, pnl)
+        self.size += 1
+
+    def view(self):
+        return self.data[:self.size]
+
+    def last(self):
+        return self.data[self.size - 1] if self.size else None
+
+    def count(self, side):
+        return int(np.count_nonzero(self.view()["side"] == side))
+
+    def clear(self):
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+
+class PositionLedger:
+    def __init__(self, method="average", fills=None):
+        if method not in ("average", "fifo"):
+            raise ValueError(f"Método de costo desconocido: {method} (average | fifo)")
+        self.method = method
+        self.fills = fills if fills is not None else FillLog()
+        self.reset()
+
+    def reset(self):
+        self.quantity = 0.0
+        self.cost_basis = 0.0   # costo (sin fees) de la posición abierta
+        self.open_fees = 0.0    # fees de compra de la posición abierta, aún no realizados
+        self.realized_pnl = 0.0
+        self.total_fees = 0.0
+        self.lots = deque()     # FIFO: [qty, precio, fee por unidad]
+        self.fills.clear()
+
+    @property
+    def avg_price(self):
+        return self.cost_basis / self.quantity if self.quantity > EPS else 0.0
+
+    def buy(self, qty, price, fee=0.0, ts=0):
+        self.quantity += qty
+        self.cost_basis += qty * price
+        self.open_fees += fee
+        self.total_fees += fee
+        if self.method == "fifo":
+            self.lots.append([qty, price, fee / qty])
+        self.fills.append(ts, BUY, qty, price, fee, 0.0)
+
+    def sell(self, qty, price, fee=0.0, ts=0):
+        # Devuelve (PnL bruto, PnL neto de fees de compra y venta) de las unidades vendidas
+        if qty > self.quantity + EPS:
+            raise ValueError(f"Venta de {qty} con posición de {self.quantity}")
+
+        if self.method == "average":
+            fraction = qty / self.quantity
+            cost = self.cost_basis * fraction
+            buy_fees = self.open_fees * fraction
+        else:
+            cost = buy_fees = 0.0
+            remaining = qty
+            while remaining > EPS:
+                lot = self.lots[0]
+                take = min(lot[0], remaining)
+                cost += take * lot[1]
+                buy_fees += take * lot[2]
+                lot[0] -= take
+                remaining -= take
+                if lot[0] <= EPS:
+                    self.lots.popleft()
+
+        self.quantity -= qty
+        self.cost_basis -= cost
+        self.open_fees -= buy_fees
+        if self.quantity <= EPS:
+            # Posición cerrada: limpiar residuos de punto flotante
+            self.quantity = self.cost_basis = self.open_fees = 0.0
+            self.lots.clear()
+
+        gross = qty * price - cost
+        net = gross - fee - buy_fees
+        self.realized_pnl += net
+        self.total_fees += fee
+        self.fills.append(ts, SELL, qty, price, fee, net)
+        return gross, net
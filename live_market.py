@@ -0,0 +1,204 @@
+# live_market.py
+# Datos de mercado en vivo para PaperTradingBot con asyncio.
+#
+# - BookTickerClient: sesión HTTP con pool de conexiones keep-alive (requests +
+#   urllib3) y timeout por request; las llamadas corren en un pool de threads
+#   para no bloquear el event loop.
+# - LiveLoop: una corrutina trae snapshots en ticks fijos (sin drift: los ticks
+#   se calculan desde el inicio, no sumando sleeps) y otra decide/ejecuta con el
+#   último snapshot. Una respuesta lenta no frena la decisión: se corta por
+#   timeout y el tick se cuenta como error. La decisión (on_snapshot) corre en un
+#   thread propio, así que una decisión lenta tampoco frena los fetches.
+# - FakeBookTickerServer: servidor HTTP local que responde JSON con la forma de
+#   /api/v3/ticker/bookTicker, para probar sin salir a Binance.
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BINANCE_API = "https://api.binance.com"
+BOOK_TICKER_PATH = "/api/v3/ticker/bookTicker"
+
+
+class BookTickerClient:
+    def __init__(self, base_url=BINANCE_API, timeout=0.8, pool_size=2):
+        self.url = base_url.rstrip("/") + BOOK_TICKER_PATH
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="bookticker")
+
+    def fetch_sync(self, symbol):
+        # symbol: "USDTBRL" -> snapshot; lista de símbolos -> {símbolo: snapshot} en un solo request
+        if isinstance(symbol, str):
+            params = {"symbol": symbol}
+        else:
+            params = {"symbols": json.dumps(list(symbol), separators=(",", ":"))}
+        response = self.session.get(self.url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        ts = time.time_ns()  # momento de la respuesta (epoch ns), para tick_recorder
+        if isinstance(symbol, str):
+            return {'timestamp': ts, 'bid': float(data['bidPrice']), 'ask': float(data['askPrice'])}
+        return {d['symbol']: {'timestamp': ts, 'bid': float(d['bidPrice']), 'ask': float(d['askPrice'])}
+                for d in data}
+
+    async def fetch(self, symbol):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self.fetch_sync, symbol)
+        return await asyncio.wait_for(future, self.timeout)
+
+    def close(self):
+        self.session.close()
+        self.executor.shutdown(wait=False)
+
+
+class LiveLoop:
+    def __init__(self, client, symbol, on_snapshot, interval=1.0, logger=None, profiler=None):
+        self.client = client
+        self.profiler = profiler  # instrumentation.TickProfiler: duración de cada fetch (etapa "fetch")
+        self.symbol = symbol
+        self.on_snapshot = on_snapshot
+        self.interval = interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats = {"ticks": 0, "snapshots": 0, "decisions": 0, "errors": 0, "overruns": 0, "stale": 0}
+
+    async def _fetcher(self, queue, max_ticks):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while max_ticks is None or self.stats["ticks"] < max_ticks:
+            self.stats["ticks"] += 1
+            started = time.perf_counter_ns()
+            try:
+                snapshot = await self.client.fetch(self.symbol)
+            except (asyncio.TimeoutError, requests.RequestException, KeyError, ValueError) as e:
+                self.stats["errors"] += 1
+                self.logger.warning(f"Snapshot fallido ({type(e).__name__}): {e}")
+            else:
+                self.stats["snapshots"] += 1
+                if queue.full():
+                    queue.get_nowait()  # el decisor va atrasado: solo importa el último snapshot
+                    self.stats["stale"] += 1
+                queue.put_nowait(snapshot)
+            if self.profiler is not None:
+                self.profiler.record("fetch", time.perf_counter_ns() - started)
+
+            # Próximo tick calculado desde el inicio; si nos pasamos, se saltean los ticks perdidos
+            next_tick += self.interval
+            now = loop.time()
+            if now > next_tick:
+                missed = int((now - next_tick) // self.interval) + 1
+                self.stats["overruns"] += missed
+                next_tick += missed * self.interval
+            await asyncio.sleep(next_tick - now)
+        await queue.put(None)
+
+    async def _decider(self, queue):
+        # on_snapshot (predict, órdenes, logs) bloquea: corre fuera del event loop, en un
+        # solo thread para que las decisiones sigan siendo de a una y en orden
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="decider") as executor:
+            while True:
+                snapshot = await queue.get()
+                if snapshot is None:
+                    return
+                await loop.run_in_executor(executor, self.on_snapshot, snapshot)
+                self.stats["decisions"] += 1
+
+    async def run(self, max_ticks=None):
+        queue = asyncio.Queue(maxsize=1)
+        await asyncio.gather(self._fetcher(queue, max_ticks), self._decider(queue))
+        return self.stats
+
+
+class _BookTickerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como Binance
+
+    def do_GET(self):
+        server = self.server
+        if server.delay:
+            threading.Event().wait(server.delay)
+        query = parse_qs(urlparse(self.path).query)
+        bid, ask = next(server.prices)
+
+        def ticker(symbol):
+            return {"symbol": symbol, "bidPrice": f"{bid:.8f}", "bidQty": "100.00000000",
+                    "askPrice": f"{ask:.8f}", "askQty": "100.00000000"}
+
+        if "symbols" in query:
+            payload = [ticker(symbol) for symbol in json.loads(query["symbols"][0])]
+        else:
+            payload = ticker(query.get("symbol", ["USDTBRL"])[0])
+        body = json.dumps(payload).encode()
+        server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # el cliente cortó por timeout (BrokenPipe): es parte de la prueba
+
+
+class FakeBookTickerServer:
+    # Servidor local con respuestas tipo bookTicker; prices: iterable de (bid, ask), se repite en ciclo
+    def __init__(self, prices=None, delay=0.0, host="127.0.0.1", port=0):
+        self.httpd = _QuietHTTPServer((host, port), _BookTickerHandler)
+        self.httpd.prices = itertools.cycle(prices or [(5.614, 5.615), (5.613, 5.615), (5.615, 5.616)])
+        self.httpd.delay = delay
+        self.httpd.requests = 0
+        self.httpd.connections = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def connections(self):
+        return self.httpd.connections
+
+    def set_delay(self, delay):
+        self.httpd.delay = delay
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
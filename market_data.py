@@ -0,0 +1,74 @@
+# market_data.py
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from feature_cache import file_hash
+
+VOLATILITY_WINDOW = 10  # barras de bid para la volatilidad local del env
+
+
+def rolling_std(values, window):
+    # out[i] = np.std(values[max(0, i - window):i]); 0.0 cuando hay menos de 2 valores
+    # (con 0.0 el env multiplica la recompensa por 1, igual que si no escalara)
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    n = len(values)
+    out = np.zeros(n, dtype=np.float64)
+    # Ventanas incompletas al principio de la serie
+    for i in range(2, min(window, n)):
+        out[i] = np.std(values[:i])
+    if n > window:
+        out[window:] = np.std(sliding_window_view(values, window)[:n - window], axis=1)
+    return out
+
+
+def by_segment(values, segments, fn):
+    # Aplica fn a cada tramo [start, stop) por separado (las ventanas no cruzan archivos)
+    if len(segments) == 1:
+        return fn(values)
+    out = np.zeros(len(values), dtype=np.float64)
+    for start, stop in segments:
+        out[start:stop] = fn(values[start:stop])
+    return out
+
+
+class MarketData:
+    def __init__(self, bid, ask, spread, volatility_window=VOLATILITY_WINDOW, volatility=None,
+                 timestamp=None, pair=None, source_key=None, segments=None):
+        # Sin copias: acepta arrays float64 o las columnas float32 memory-mapped del store
+        self.bid = np.ascontiguousarray(bid)
+        self.ask = np.ascontiguousarray(ask)
+        self.spread = np.ascontiguousarray(spread)
+        self.timestamp = timestamp
+        self.pair = pair
+        self.source_key = source_key
+        # Límites [start, stop) de cada archivo cuando son varios concatenados
+        self.segments = segments if segments is not None else [(0, len(self.bid))]
+        self.volatility_window = volatility_window
+        if volatility is None:
+            volatility = by_segment(self.bid, self.segments, lambda bid: rolling_std(bid, volatility_window))
+        self.volatility = np.ascontiguousarray(volatility)
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        return cls(df['bid'].values, df['ask'].values, df['spread_percentage'].values, **kwargs)
+
+    @classmethod
+    def from_csv(cls, csv_path, **kwargs):
+        df = pd.read_csv(csv_path, usecols=['bid', 'ask', 'spread_percentage'])
+        return cls.from_frame(df, source_key=file_hash(csv_path), **kwargs)
+
+    @classmethod
+    def from_dataset(cls, dataset, volatility_window=VOLATILITY_WINDOW):
+        segments = [(start, stop) for start, stop, _, _ in dataset.segments]
+        volatility = dataset.derived(f"volatility_w{volatility_window}", lambda: by_segment(
+            dataset.bid, segments, lambda bid: rolling_std(bid, volatility_window)))
+        return cls(dataset.bid, dataset.ask, dataset.spread, volatility_window=volatility_window,
+                   volatility=volatility, timestamp=dataset.timestamp, pair=dataset.pair,
+                   source_key=dataset.source_key, segments=segments)
+
+    def to_frame(self):
+        return pd.DataFrame({'bid': self.bid, 'ask': self.ask, 'spread_percentage': self.spread})
+
+    def __len__(self):
+        return len(self.bid)
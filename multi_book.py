@@ -0,0 +1,168 @@
+# multi_book.py
+# Motor de paper trading multi-símbolo / multi-modelo en un solo proceso.
+#
+# Cada "book" es un par (símbolo, modelo) con su propia contabilidad (cash,
+# inventario y un PositionLedger con los fills). En cada tick el motor arma las
+# observaciones de todos los books, las apila por modelo y hace un solo predict
+# por modelo distinto.
+# Los modelos se cargan una vez aunque los usen muchos books (y vía el cache LRU de
+# registry.py, una vez por proceso aunque haya varios motores).
+#
+# Uso (replay de los CSV de data/):
+#   engine = TradingEngine()
+#   engine.add_book("usdt_a", "USDT_BRL", "models/model_equity_1007_8.npz")
+#   engine.add_book("xrp_a", "XRP_MXN", "models/model_equity_1007_8.npz", cash=100.0)
+#   engine.run_replay({"USDT_BRL": MockedBinance(...), "XRP_MXN": MockedBinance(...)})
+# Uso (en vivo, un request por tick para todos los símbolos):
+#   engine.run_live(BookTickerClient(), interval=1.0)
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from history import RingHistory
+from ledger import BUY, FILL_DTYPE, SELL, SIDE_NAMES, PositionLedger
+from live_market import LiveLoop
+from order_book import snapshot_price
+from registry import cached_policy
+
+# Acciones de la política (no confundir con ledger.BUY / ledger.SELL, los lados de un fill)
+ACTION_HOLD, ACTION_BUY, ACTION_SELL = 0, 1, 2
+BOOK_HISTORY_CAPACITY = 1_000  # fills en memoria por book (cientos de books por proceso)
+
+
+class Book:
+    def __init__(self, name, symbol, model_path, cash=5000.0, fee_rate=0.001, order_size=5.0, sell_all_above=20.0,
+                 cost_method="average", history_dir=None):
+        self.name = name
+        self.symbol = symbol
+        self.model_path = model_path
+        self.cash = cash
+        self.inventory = 0.0
+        self.fee_rate = fee_rate
+        self.order_size = order_size
+        self.sell_all_above = sell_all_above
+        spill_path = os.path.join(history_dir, f"{name}_fills.bin") if history_dir else None
+        self.ledger = PositionLedger(cost_method, fills=RingHistory(FILL_DTYPE, BOOK_HISTORY_CAPACITY, spill_path))
+        self.equity = cash
+
+    def observation(self, snapshot):
+        bid = snapshot['bid']
+        ask = snapshot['ask']
+        spread_percentage = snapshot.get('spread_percentage', (ask - bid) / bid * 100)
+        return (bid, ask, spread_percentage, self.inventory, self.cash)
+
+    def ejecutar_compra(self, price, usd, ts=0):
+        cost = usd * price * (1 + self.fee_rate)
+        if self.cash >= cost:
+            self.inventory += usd
+            self.cash -= cost
+            self.ledger.buy(usd, price, fee=usd * price * self.fee_rate, ts=ts)
+            return True
+        return False
+
+    def ejecutar_venta(self, price, usd, ts=0):
+        if self.inventory >= usd:
+            self.inventory -= usd
+            self.cash += usd * price * (1 - self.fee_rate)
+            self.ledger.sell(usd, price, fee=usd * price * self.fee_rate, ts=ts)
+            return True
+        return False
+
+    def apply(self, action, snapshot):
+        # Misma lógica que PaperTradingBot: compra order_size al ask, vende al bid (todo si hay
+        # >= sell_all_above), recorriendo snapshot['book'] si lo trae.
+        # Los fills llevan el timestamp del snapshot (epoch ns; el reloj si no trae)
+        traded = False
+        ts = int(snapshot.get('timestamp') or time.time_ns())
+        if action == ACTION_BUY:
+            traded = self.ejecutar_compra(snapshot_price(snapshot, BUY, self.order_size)[0], self.order_size, ts)
+        elif action == ACTION_SELL:
+            usd = self.inventory if self.inventory >= self.sell_all_above else self.order_size
+            traded = self.ejecutar_venta(snapshot_price(snapshot, SELL, usd)[0], usd, ts)
+        self.equity = self.cash + self.inventory * snapshot['bid']
+        return traded
+
+
+class TradingEngine:
+    def __init__(self, logger=None):
+        self.books = []
+        self.models = {}  # model_path -> política cargada (una vez por modelo)
+        self.groups = defaultdict(list)  # model_path -> books que lo usan
+        self.ticks = 0
+        self.logger = logger or logging.getLogger(__name__)
+
+    def add_book(self, name, symbol, model_path, **kwargs):
+        book = Book(name, symbol, model_path, **kwargs)
+        if model_path not in self.models:
+            self.models[model_path] = cached_policy(model_path)
+        self.books.append(book)
+        self.groups[model_path].append(book)
+        return book
+
+    @property
+    def symbols(self):
+        return sorted({book.symbol for book in self.books})
+
+    def on_tick(self, snapshots):
+        # snapshots: {símbolo: {'bid', 'ask'[, 'spread_percentage']}}; los books sin snapshot no operan
+        self.ticks += 1
+        for model_path, books in self.groups.items():
+            active = [book for book in books if book.symbol in snapshots]
+            if not active:
+                continue
+            obs = np.array([book.observation(snapshots[book.symbol]) for book in active], dtype=np.float32)
+            actions, _ = self.models[model_path].predict(obs, deterministic=True)
+            for book, action in zip(active, np.asarray(actions).reshape(-1)):
+                snapshot = snapshots[book.symbol]
+                if book.apply(int(action), snapshot):
+                    f = book.ledger.fills.last()
+                    self.logger.info(f"{book.name} {SIDE_NAMES[int(f['side'])]} {f['qty']:.2f} {book.symbol} @ {f['price']:.4f} | "
+                                     f"Cash: {book.cash:.2f}, Inv: {book.inventory:.2f}, Eq: {book.equity:.2f}")
+
+    def run_replay(self, sources):
+        # sources: {símbolo: MockedBinance}. Avanza por timestamp, como replay.MergedReplay:
+        # cada tick lleva los snapshots con el menor timestamp pendiente (los empates juntos),
+        # así los books de distintos archivos ven el mismo momento. Termina cuando se agotan todos
+        pending = {}
+        for symbol, exchange in sources.items():
+            snapshot = exchange.get_next_snapshot()
+            if snapshot is not None:
+                pending[symbol] = snapshot
+        while pending:
+            ts = min(snapshot['timestamp'] for snapshot in pending.values())
+            snapshots = {symbol: snapshot for symbol, snapshot in pending.items() if snapshot['timestamp'] == ts}
+            for symbol in snapshots:
+                snapshot = sources[symbol].get_next_snapshot()
+                if snapshot is None:
+                    del pending[symbol]
+                else:
+                    pending[symbol] = snapshot
+            self.on_tick(snapshots)
+        self.flush()
+        return self.summary()
+
+    def run_live(self, client, interval=1.0, max_ticks=None):
+        loop = LiveLoop(client, self.symbols, self.on_tick, interval=interval, logger=self.logger)
+        try:
+            stats = asyncio.run(loop.run(max_ticks))
+        finally:
+            self.flush()
+        self.logger.info(f"Loop finalizado: {stats}")
+        return self.summary()
+
+    def flush(self):
+        # Vuelca a disco los fills pendientes de los books con history_dir
+        for book in self.books:
+            book.ledger.fills.flush()
+
+    def summary(self):
+        return [
+            {"book": b.name, "symbol": b.symbol, "model": b.model_path, "cash": b.cash,
+             "inventory": b.inventory, "equity": b.equity, "num_trades": len(b.ledger.fills),
+             "realized_pnl": b.ledger.realized_pnl}
+            for b in self.books
+        ]
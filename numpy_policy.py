@@ -0,0 +1,126 @@
+# numpy_policy.py
+# Inferencia del actor de un PPO MlpPolicy solo con NumPy (sin torch ni SB3).
+#
+#   python numpy_policy.py export models/model_equity_1007_8.zip [salida.npz]
+#   python numpy_policy.py bench models/model_equity_1007_8.zip [salida.npz]
+#
+# `export` necesita torch/SB3 (una sola vez); NumpyPolicy y load_policy(".npz") no.
+import os
+import sys
+import time
+
+import numpy as np
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0),
+    "identity": lambda x: x,
+}
+
+
+def export_policy(model_path, out_path=None):
+    from stable_baselines3 import PPO
+
+    out_path = out_path or os.path.splitext(model_path)[0] + ".npz"
+    model = PPO.load(model_path, device="cpu")
+    policy = model.policy
+    state = {k: v.detach().cpu().numpy() for k, v in policy.state_dict().items()}
+
+    # Capas Linear del actor en orden: policy_net.0, policy_net.2, ...
+    prefix = "mlp_extractor.policy_net."
+    layer_ids = sorted({int(k[len(prefix):].split(".")[0]) for k in state if k.startswith(prefix)})
+    arrays = {}
+    for n, layer_id in enumerate(layer_ids):
+        arrays[f"w{n}"] = state[f"{prefix}{layer_id}.weight"]
+        arrays[f"b{n}"] = state[f"{prefix}{layer_id}.bias"]
+    arrays["action_w"] = state["action_net.weight"]
+    arrays["action_b"] = state["action_net.bias"]
+    arrays["activation"] = np.array(policy.activation_fn.__name__.lower())
+    arrays["obs_shape"] = np.array(model.observation_space.shape)
+
+    np.savez(out_path, **arrays)
+    return out_path
+
+
+class NumpyPolicy:
+    def __init__(self, path):
+        with np.load(path) as data:
+            n_layers = len([k for k in data.files if k.startswith("w")])
+            self.layers = [(data[f"w{n}"].T.copy(), data[f"b{n}"].copy()) for n in range(n_layers)]
+            self.action_w = data["action_w"].T.copy()
+            self.action_b = data["action_b"].copy()
+            self.activation = ACTIVATIONS[str(data["activation"])]
+            self.obs_shape = tuple(int(d) for d in data["obs_shape"])
+        self.rng = np.random.default_rng()
+
+    def logits(self, obs):
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, int(np.prod(self.obs_shape)))
+        for w, b in self.layers:
+            x = self.activation(x @ w + b)
+        return x @ self.action_w + self.action_b
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        # Misma firma que PPO.predict; acción escalar si obs es una sola observación
+        logits = self.logits(obs)
+        if deterministic:
+            actions = logits.argmax(axis=1)
+        else:
+            probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs /= probs.sum(axis=1, keepdims=True)
+            actions = np.array([self.rng.choice(len(p), p=p) for p in probs])
+        if np.asarray(obs).shape == self.obs_shape:
+            actions = actions[0]
+        return actions, state
+
+
+def load_policy(model_path):
+    # .npz -> NumpyPolicy (sin torch); .zip -> PPO de stable-baselines3
+    if model_path.endswith(".npz"):
+        return NumpyPolicy(model_path)
+    from stable_baselines3 import PPO
+    return PPO.load(model_path, device="cpu")
+
+
+def sample_observations(n, seed=0):
+    # Observaciones realistas: precios de data/ + inventario/cash en los rangos de env y bots
+    import glob
+    from dataset_store import open_dataset
+
+    rng = np.random.default_rng(seed)
+    obs = []
+    paths = sorted(glob.glob("data/*.csv"))
+    for path in paths:
+        ds = open_dataset(path)
+        idx = rng.integers(0, len(ds), size=n // len(paths) + 1)
+        inventory = rng.integers(0, 30, size=len(idx)).astype(np.float32)
+        cash = np.where(rng.random(len(idx)) < 0.5, rng.uniform(0, 1200, len(idx)), rng.uniform(4000, 6000, len(idx)))
+        obs.append(np.stack([ds.bid[idx], ds.ask[idx], ds.spread[idx], inventory, cash], axis=1))
+    return np.concatenate(obs)[:n].astype(np.float32)
+
+
+def bench(model_path, npz_path=None, n=2000):
+    if npz_path is None or not os.path.exists(npz_path):
+        npz_path = export_policy(model_path, npz_path)
+    ppo = load_policy(model_path)
+    fast = load_policy(npz_path)
+    obs = sample_observations(n)
+
+    mismatches = sum(int(ppo.predict(o, deterministic=True)[0]) != int(fast.predict(o)[0]) for o in obs)
+    print(f"Acciones distintas: {mismatches}/{n}")
+
+    for name, policy in [("PPO.predict", ppo), ("NumpyPolicy.predict", fast)]:
+        start = time.perf_counter()
+        for o in obs:
+            policy.predict(o, deterministic=True)
+        per_call = (time.perf_counter() - start) / n
+        print(f"{name:22s} {per_call * 1e6:8.1f} µs/llamada")
+
+
+if __name__ == "__main__":
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == "export":
+        print(export_policy(*args))
+    elif command == "bench":
+        bench(*args)
+    else:
+        raise SystemExit(f"Comando desconocido: {command} (export | bench)")
@@ -0,0 +1,275 @@
+# online_features.py
+# Features de régimen (Hurst, Lyapunov, volatilidad) actualizadas tick a tick.
+#
+# Mismos estimadores que el cálculo por ventana, pero sin recorrer la ventana
+# completa en cada tick:
+#   RollingHurst      compute_Hc(kind='price', simplified=True): R/S por bloques.
+#                     Cada tamaño de bloque lleva max/min con deques monótonas y
+#                     sumas de variaciones deslizantes -> O(#tamaños) por tick.
+#   RollingLyapunov   nolds.lyap_r (Rosenstein) con lag=1 y min_tsep fijo. La
+#                     matriz de distancias de la órbita se actualiza con una
+#                     fila/columna por tick (O(ventana * emb_dim)) en vez de
+#                     recalcularse entera.
+#   RollingVolatility np.std de los últimos `window` precios con sumas deslizantes.
+# Las sumas deslizantes se recalculan exactas cada `window` ticks (sin deriva).
+#
+# OnlineFeatures junta las tres: update(bid) calcula las features de la ventana
+# de precios vistos hasta ahora (la misma ventana [i - w, i) que usa el env en el
+# step i) y values() las devuelve. Hasta llenar la ventana son los valores neutros.
+import math
+from collections import deque
+
+import numpy as np
+
+from feature_cache import FEATURE_WINDOW, NEUTRAL_HURST, NEUTRAL_LYAP
+from market_data import VOLATILITY_WINDOW
+
+HURST_MIN_BLOCK = 10         # min_window de compute_Hc
+LYAP_EMB_DIM = 10            # defaults de nolds.lyap_r
+LYAP_TRAJECTORY_LEN = 20
+LYAP_MIN_TSEP = 5            # fijo: el default de nolds (período medio) no entra en 50 barras
+
+
+def hurst_block_sizes(window, min_block=HURST_MIN_BLOCK):
+    # Los mismos tamaños de bloque que compute_Hc para una serie de largo `window`
+    sizes = [int(10 ** x) for x in np.arange(math.log10(min_block), math.log10(window - 1), 0.25)]
+    return sizes + [window]
+
+
+class RollingVolatility:
+    def __init__(self, window=VOLATILITY_WINDOW):
+        self.window = window
+        self.values = np.zeros(window)
+        self.n = 0
+        self.ref = 0.0   # los valores se guardan relativos a ref (menos cancelación)
+        self.sum = 0.0
+        self.sumsq = 0.0
+
+    def update(self, price):
+        slot = self.n % self.window
+        if self.n == 0:
+            self.ref = price
+        if self.n >= self.window:
+            old = self.values[slot]
+            self.sum -= old
+            self.sumsq -= old * old
+        x = price - self.ref
+        self.values[slot] = x
+        self.sum += x
+        self.sumsq += x * x
+        self.n += 1
+        if self.n % self.window == 0:
+            self._resync()
+
+    def _resync(self):
+        prices = self.values + self.ref
+        self.ref = prices[(self.n - 1) % self.window]
+        self.values = prices - self.ref
+        self.sum = float(self.values.sum())
+        self.sumsq = float((self.values * self.values).sum())
+
+    def value(self):
+        # np.std (ddof=0) de los últimos min(n, window) precios; 0.0 con menos de 2
+        count = min(self.n, self.window)
+        if count < 2:
+            return 0.0
+        var = (self.sumsq - self.sum * self.sum / count) / count
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class RollingHurst:
+    def __init__(self, window=FEATURE_WINDOW, min_block=HURST_MIN_BLOCK):
+        self.window = window
+        self.sizes = hurst_block_sizes(window, min_block)
+        self.prices = np.zeros(window)
+        self.pcts = np.zeros(window)  # pcts[t % window] = precio_t / precio_{t-1} - 1
+        self.n = 0
+        self.max_q = [deque() for _ in self.sizes]
+        self.min_q = [deque() for _ in self.sizes]
+        self.sum = [0.0] * len(self.sizes)
+        self.sumsq = [0.0] * len(self.sizes)
+        # rs[k, t % window] = R/S del bloque de tamaño sizes[k] que termina en t
+        self.rs = np.zeros((len(self.sizes), window))
+        # Fin de cada bloque de compute_Hc relativo al inicio de la ventana, de todos
+        # los tamaños concatenados (fila k de rs) para juntarlos con un solo gather
+        ends = [np.arange(window // w) * w + w - 1 for w in self.sizes]
+        self.block_ends = np.concatenate(ends)
+        self.block_rows = np.concatenate([np.full(len(e), k * window) for k, e in enumerate(ends)])
+        self.block_starts = np.cumsum([0] + [len(e) for e in ends[:-1]])
+        x = np.log10(self.sizes)
+        self.x_centered = x - x.mean()
+        self.x_var = float((self.x_centered ** 2).sum())
+
+    def update(self, price):
+        t = self.n
+        W = self.window
+        p = price / self.prices[(t - 1) % W] - 1.0 if t > 0 else 0.0
+        self.prices[t % W] = price
+        self.pcts[t % W] = p
+
+        for k, w in enumerate(self.sizes):
+            max_q, min_q = self.max_q[k], self.min_q[k]
+            while max_q and max_q[-1][1] <= price:
+                max_q.pop()
+            max_q.append((t, price))
+            if max_q[0][0] <= t - w:
+                max_q.popleft()
+            while min_q and min_q[-1][1] >= price:
+                min_q.pop()
+            min_q.append((t, price))
+            if min_q[0][0] <= t - w:
+                min_q.popleft()
+
+            # Variaciones del bloque [t - w + 1, t]: p_{t-w+2} .. p_t (w - 1 valores)
+            if t > 0:
+                self.sum[k] += p
+                self.sumsq[k] += p * p
+                old = t - w + 1
+                if old >= 1:
+                    q = self.pcts[old % W]
+                    self.sum[k] -= q
+                    self.sumsq[k] -= q * q
+
+            if t >= w - 1:
+                n_p = w - 1
+                var = (self.sumsq[k] - self.sum[k] * self.sum[k] / n_p) / (n_p - 1)
+                R = max_q[0][1] / min_q[0][1] - 1.0
+                # compute_Hc descarta los bloques con R == 0 o S == 0
+                self.rs[k, t % W] = R / math.sqrt(var) if R != 0 and var > 0 else 0.0
+
+        self.n += 1
+        if self.n % W == 0:
+            self._resync()
+
+    def _resync(self):
+        t = self.n - 1
+        for k, w in enumerate(self.sizes):
+            idx = np.arange(max(1, t - w + 2), t + 1) % self.window
+            values = self.pcts[idx]
+            self.sum[k] = float(values.sum())
+            self.sumsq[k] = float((values * values).sum())
+
+    def value(self):
+        # H o None si la ventana no está llena o un tamaño no tiene bloques válidos
+        # (compute_Hc falla en ese caso)
+        if self.n < self.window:
+            return None
+        start = self.n - self.window
+        rs = self.rs.ravel()[self.block_rows + (start + self.block_ends) % self.window]
+        counts = np.add.reduceat((rs != 0).astype(np.int64), self.block_starts)
+        if not counts.all():
+            return None
+        means = np.add.reduceat(rs, self.block_starts) / counts
+        # Pendiente de mínimos cuadrados de log10(R/S) contra log10(tamaño)
+        return float((self.x_centered * np.log10(means)).sum() / self.x_var)
+
+
+class RollingLyapunov:
+    def __init__(self, window=FEATURE_WINDOW, emb_dim=LYAP_EMB_DIM, min_tsep=LYAP_MIN_TSEP,
+                 trajectory_len=LYAP_TRAJECTORY_LEN):
+        self.emb_dim = emb_dim
+        self.trajectory_len = trajectory_len
+        self.m = window - emb_dim + 1         # vectores de la órbita en la ventana
+        self.ntraj = self.m - trajectory_len + 1
+        if self.ntraj < 2 * min_tsep + 2:
+            raise ValueError(f"Ventana de {window} muy corta para emb_dim={emb_dim}, "
+                             f"trajectory_len={trajectory_len} y min_tsep={min_tsep}")
+        self.recent = deque(maxlen=emb_dim)
+        self.orbit = np.zeros((self.m, emb_dim))
+        self.dists = np.zeros((self.m, self.m))  # indexada por slot (ring), no por tiempo
+        self.count = 0
+        self.time_index = np.arange(self.m)
+        i = np.arange(self.ntraj)
+        self.band = np.abs(i[:, None] - i[None, :]) <= min_tsep  # vecinos demasiado cercanos en el tiempo
+        self.ks = np.arange(trajectory_len)
+        self.ks_float = self.ks.astype(np.float64)
+        self.rows = i[None, :] + self.ks[:, None]                 # (trajectory_len, ntraj)
+
+    def update(self, price):
+        self.recent.append(price)
+        if len(self.recent) < self.emb_dim:
+            return
+        slot = self.count % self.m
+        vector = np.array(self.recent)
+        self.orbit[slot] = vector
+        d = np.sqrt(np.sum((self.orbit - vector) ** 2, axis=1))
+        self.dists[slot, :] = d
+        self.dists[:, slot] = d
+        self.count += 1
+
+    def value(self):
+        # Exponente o None si la ventana no está llena o el ajuste no es posible
+        if self.count < self.m:
+            return None
+        order = (self.count + self.time_index) % self.m   # slot de cada vector, del más viejo al más nuevo
+        head = order[:self.ntraj]
+        neighbors = np.where(self.band, np.inf, self.dists[np.ix_(head, head)]).argmin(axis=1)
+
+        # Distancia entre i + k y su vecino + k para k < trajectory_len: (trajectory_len, ntraj)
+        div = self.dists[order[self.rows], order[neighbors[None, :] + self.ks[:, None]]]
+        nonzero = div != 0
+        counts = nonzero.sum(axis=1)
+        logs = np.log(div, out=np.zeros_like(div), where=nonzero)
+        div_traj = np.full(self.trajectory_len, -np.inf)
+        valid = counts > 0
+        div_traj[valid] = logs[valid].sum(axis=1) / counts[valid]
+
+        finite = np.isfinite(div_traj)
+        if not finite.any():
+            return -np.inf  # como nolds: todas las distancias en cero
+        if finite.sum() < 2:
+            return None     # nolds falla en el ajuste (ventana casi plana)
+        # Pendiente de la recta (lo mismo que np.polyfit grado 1, sin su overhead)
+        x = self.ks_float[finite]
+        x = x - x.mean()
+        return float((x * div_traj[finite]).sum() / (x * x).sum())
+
+
+class OnlineFeatures:
+    def __init__(self, feature_window=FEATURE_WINDOW, volatility_window=VOLATILITY_WINDOW):
+        self.hurst = RollingHurst(feature_window)
+        self.lyap = RollingLyapunov(feature_window)
+        self.volatility = RollingVolatility(volatility_window)
+        self.failures = 0         # features no calculables con la ventana llena (como en feature_cache)
+        self.window_failures = 0  # las de la ventana actual (0, 1 o 2)
+        self.features = (NEUTRAL_HURST, NEUTRAL_LYAP)
+
+    def update(self, price):
+        # Las features de la ventana nueva se calculan (y sus fallos se cuentan) una vez
+        # por tick acá; values() solo las lee, así que se puede llamar las veces que sea
+        price = float(price)
+        self.hurst.update(price)
+        self.lyap.update(price)
+        self.volatility.update(price)
+        self.window_failures = 0
+        hurst = self.hurst.value()
+        if hurst is None:
+            if self.hurst.n >= self.hurst.window:
+                self.window_failures += 1
+            hurst = NEUTRAL_HURST
+        lyap = self.lyap.value()
+        if lyap is None:
+            if self.lyap.count >= self.lyap.m:
+                self.window_failures += 1
+            lyap = NEUTRAL_LYAP
+        self.failures += self.window_failures
+        self.features = (hurst, lyap)
+
+    def values(self):
+        # (hurst, lyap, volatilidad) de los precios vistos; neutros hasta llenar la ventana
+        return self.features + (self.volatility.value(),)
+
+
+def online_feature_track(bids, window=FEATURE_WINDOW):
+    # Track (hurst, lyap, fallos) por step como el de feature_cache, en una sola pasada:
+    # la feature del step i usa bids[:i]
+    n = len(bids)
+    hurst = np.empty(n)
+    lyap = np.empty(n)
+    failures = np.zeros(n, dtype=np.int8)
+    engine = OnlineFeatures(window)
+    for i, bid in enumerate(np.asarray(bids, dtype=np.float64).tolist()):
+        hurst[i], lyap[i], _ = engine.values()
+        failures[i] = engine.window_failures
+        engine.update(bid)
+    return hurst, lyap, failures
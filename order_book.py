@@ -0,0 +1,147 @@
+# order_book.py
+# Profundidad del order book (L2) y simulación de fills recorriendo niveles.
+#
+# Un snapshot L2 son arrays de ancho fijo por lado: precio y cantidad de los
+# `depth` mejores niveles (nivel 0 = mejor precio). En el store de datasets son
+# cuatro columnas 2-D (filas, depth) float32: bid_px, bid_qty, ask_px, ask_qty.
+# Los CSV con profundidad traen las columnas bid_px_0..bid_px_{N-1},
+# bid_qty_0.., ask_px_0.., ask_qty_0.. además de bid/ask/spread_percentage.
+# Los niveles que faltan en una fila quedan con cantidad 0 y el precio del nivel anterior.
+#
+# walk_book recorre el book para un tamaño de orden con sumas acumuladas (sin
+# loop por nivel) y funciona igual para un snapshot o para N a la vez. Lo que
+# excede la profundidad visible se llena al precio del peor nivel visible.
+#
+#   book = OrderBook.from_dataset(open_dataset("data/X.csv"))   # None si el CSV es top-of-book
+#   price, visible = book.fill(SELL, row, 20.0)
+#   prices, visible = book.fill(SELL, rows, sizes)               # vectorizado
+#
+# Los CSV de data/ solo tienen el mejor bid/ask: para simular slippage sobre
+# ellos, OrderBook.synthetic arma una escalera de niveles alrededor del top.
+import re
+
+import numpy as np
+
+from ledger import BUY, SELL
+
+BOOK_COLUMNS = ("bid_px", "bid_qty", "ask_px", "ask_qty")
+SYNTHETIC_DEPTH = 10
+
+
+def csv_depth(header):
+    # Cantidad de niveles L2 en las columnas de un CSV (0 = solo top-of-book)
+    levels = [int(m.group(1)) for m in (re.fullmatch(r"bid_px_(\d+)", name) for name in header) if m]
+    depth = 0
+    while depth in levels:
+        depth += 1
+    return depth
+
+
+def book_dtype(depth):
+    # dtype de una fila de la columna en el store: depth float32 seguidos
+    return f"({depth},)<f4"
+
+
+def book_from_frame(chunk, depth):
+    # Columnas bid_px_i, ... de un DataFrame -> arrays (filas, depth); niveles vacíos rellenados
+    book = {}
+    for name in BOOK_COLUMNS:
+        values = chunk[[f"{name}_{level}" for level in range(depth)]].to_numpy(dtype=np.float64)
+        book[name] = values
+    for side in ("bid", "ask"):
+        px, qty = book[f"{side}_px"], book[f"{side}_qty"]
+        missing = ~np.isfinite(px) | ~np.isfinite(qty)
+        qty[missing] = 0.0
+        px[:, 0] = np.where(missing[:, 0], chunk[side].to_numpy(dtype=np.float64), px[:, 0])
+        for level in range(1, depth):
+            px[:, level] = np.where(missing[:, level], px[:, level - 1], px[:, level])
+    return book
+
+
+def walk_book(px, qty, size):
+    # px, qty: (..., depth) del mejor al peor nivel; size: escalar o (...).
+    # -> (precio promedio, cantidad llenada con la profundidad visible)
+    px = np.asarray(px, dtype=np.float64)
+    qty = np.asarray(qty, dtype=np.float64)
+    size = np.asarray(size, dtype=np.float64)
+    ahead = np.cumsum(qty, axis=-1) - qty  # cantidad en los niveles mejores que cada uno
+    take = np.clip(size[..., None] - ahead, 0.0, qty)
+    visible = take.sum(axis=-1)
+    cost = (take * px).sum(axis=-1) + (size - visible) * px[..., -1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        price = np.where(size > 0, cost / size, px[..., 0])
+    return price, visible
+
+
+class OrderBook:
+    def __init__(self, bid_px, bid_qty, ask_px, ask_qty):
+        # Arrays (filas, depth); pueden ser los memmaps del store
+        self.bid_px = bid_px
+        self.bid_qty = bid_qty
+        self.ask_px = ask_px
+        self.ask_qty = ask_qty
+        self.depth = bid_px.shape[1]
+
+    def __len__(self):
+        return len(self.bid_px)
+
+    def side(self, side):
+        # Las compras recorren los asks; las ventas, los bids
+        if side == BUY:
+            return self.ask_px, self.ask_qty
+        if side == SELL:
+            return self.bid_px, self.bid_qty
+        raise ValueError(f"Lado desconocido: {side}")
+
+    def fill(self, side, rows, size):
+        # rows: fila o array de filas; size: escalar o uno por fila
+        px, qty = self.side(side)
+        return walk_book(px[rows], qty[rows], size)
+
+    def price(self, side, row, size):
+        # Precio promedio (float) de una orden de `size` en la fila `row`
+        price, _ = self.fill(side, row, size)
+        return float(price)
+
+    def snapshot(self, row):
+        # (bid_px, bid_qty, ask_px, ask_qty) de una fila, como en los snapshots de replay.py
+        return self.bid_px[row], self.bid_qty[row], self.ask_px[row], self.ask_qty[row]
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        # Columnas L2 del store; None si el dataset es solo top-of-book
+        if not all(name in dataset.meta["columns"] for name in BOOK_COLUMNS):
+            return None
+        return cls(*(dataset.column(name) for name in BOOK_COLUMNS))
+
+    @classmethod
+    def synthetic(cls, bid, ask, depth=SYNTHETIC_DEPTH, level_qty=5.0, tick=None):
+        # Escalera alrededor del top-of-book: `depth` niveles de `level_qty` separados por
+        # `tick` (default: el spread de cada fila). El nivel 0 es el bid/ask del dataset
+        bid = np.asarray(bid, dtype=np.float64)
+        ask = np.asarray(ask, dtype=np.float64)
+        tick = ask - bid if tick is None else np.broadcast_to(np.asarray(tick, dtype=np.float64), bid.shape)
+        steps = np.arange(depth, dtype=np.float64)
+        qty = np.full((len(bid), depth), level_qty, dtype=np.float64)
+        return cls(bid[:, None] - tick[:, None] * steps, qty, ask[:, None] + tick[:, None] * steps, qty)
+
+
+def snapshot_fill(book, side, size):
+    # (precio promedio, cantidad visible) de una orden sobre el book de un snapshot
+    # (tupla de OrderBook.snapshot, como snapshot['book'] de replay.py)
+    bid_px, bid_qty, ask_px, ask_qty = book
+    if side == BUY:
+        price, visible = walk_book(ask_px, ask_qty, size)
+    else:
+        price, visible = walk_book(bid_px, bid_qty, size)
+    return float(price), float(visible)
+
+
+def snapshot_price(snapshot, side, size):
+    # (precio, cantidad visible) de una orden sobre un snapshot de los bots: las compras se
+    # llenan contra los asks y las ventas contra los bids (como el env). Recorre
+    # snapshot['book'] si lo trae; si no, el mejor precio del lado
+    book = snapshot.get('book')
+    if book is None:
+        return float(snapshot['ask'] if side == BUY else snapshot['bid']), float(size)
+    return snapshot_fill(book, side, size)
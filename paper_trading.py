@@ -1,48 +1,96 @@
-import requests
+import asyncio
 import time
+from time import perf_counter_ns
 import numpy as np
-from stable_baselines3 import PPO
+from numpy_policy import load_policy
+import os
+from history import EQUITY_DTYPE, HISTORY_CAPACITY, HISTORY_DIR, RingHistory
+from ledger import BUY, FILL_DTYPE, SELL, PositionLedger
+from online_features import OnlineFeatures
+from order_book import snapshot_price
 from datetime import datetime
 import logging
+from live_market import BINANCE_API, BookTickerClient, LiveLoop
+from tick_recorder import RECORD_DIR, TickRecorder
+from instrumentation import TickProfiler, queue_logging, serve_metrics
+
+SYMBOL = "USDTBRL"
 
 class PaperTradingBot:
-    def __init__(self, model_path):
-        self.model = PPO.load(model_path)
+    def __init__(self, model_path, symbol=SYMBOL, base_url=BINANCE_API, timeout=0.8, cost_method="average",
+                 history_dir=HISTORY_DIR, history_capacity=HISTORY_CAPACITY, features=True,
+                 record_dir=RECORD_DIR, pair=None, summary_interval=60.0, metrics_path=None, metrics_port=None,
+                 async_logging=False):
+        # .npz exportado con numpy_policy.py -> inferencia sin torch; .zip -> PPO
+        self.model = load_policy(model_path)
         self.inventory = 0.0  # en USDT
         self.cash = 5000.0  # saldo inicial en ARS
-        self.trades = []
-        self.equity_history = []
 
         self.fee_rate = 0.001  # Fee de Binance (0.1%)
 
+        # Cliente HTTP con conexiones keep-alive reutilizadas entre ticks
+        self.symbol = symbol
+        self.client = BookTickerClient(base_url, timeout=timeout)
+
         now = datetime.now().strftime("%Y%m%d_%H%M%S")
         logname = f"paper_trading_{now}.log"
 
-        logging.basicConfig(
-            filename=logname,
-            filemode='a',
-            format='%(asctime)s,%(msecs)03d %(name)s %(levelname)s %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S',
-            level=logging.DEBUG
-        )
-
+        # Historial en ring buffers de tamaño fijo; con history_dir se vuelca por lotes a
+        # history/paper_trading_<fecha>_{fills,equity}.bin (leer con history.open_history)
+        def spill_path(name):
+            return os.path.join(history_dir, f"paper_trading_{now}_{name}.bin") if history_dir else None
+
+        # Posición con costo incremental (O(1) por fill): average o fifo
+        self.ledger = PositionLedger(cost_method, fills=RingHistory(FILL_DTYPE, history_capacity, spill_path("fills")))
+        self.equity_history = RingHistory(EQUITY_DTYPE, history_capacity, spill_path("equity"))
+
+        # Hurst/Lyapunov/volatilidad incrementales, con la misma ventana que el env
+        # (solo monitoreo: la política observa bid, ask, spread, inventario y cash)
+        self.features = OnlineFeatures() if features else None
+        self.last_features = None
+
+        # Snapshots grabados al formato de dataset_store (tick_recorder.py), reutilizables para
+        # entrenar: record_dir/<par>-<día>/. pair: nombre del par en el store (default: symbol)
+        self.recorder = TickRecorder(pair or symbol, root=record_dir) if record_dir else None
+
+        # Latencia por etapa de cada tick (instrumentation.TickProfiler): resumen en el log cada
+        # summary_interval s, Prometheus en metrics_path (archivo) y/o metrics_port (HTTP local)
+        self.profiler = TickProfiler()
+        self.summary_interval = summary_interval
+        self.metrics_path = metrics_path
+        self.metrics_server = serve_metrics(self.profiler, metrics_port) if metrics_port else None
+        self.last_summary = time.monotonic()
+        self.live_loop = None
+
+        formatter = logging.Formatter('%(asctime)s,%(msecs)03d %(name)s %(levelname)s %(message)s',
+                                      datefmt='%Y-%m-%d %H:%M:%S')
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.DEBUG)
-        console_handler.setFormatter(logging.Formatter(
-            '%(asctime)s,%(msecs)03d %(name)s %(levelname)s %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'))
+        console_handler.setFormatter(formatter)
 
         self.logger = logging.getLogger(__name__)
-        self.logger.addHandler(console_handler)
+        self.log_listener = None
+        if async_logging:
+            # Archivo y consola en un thread aparte: el tick solo encola el record
+            file_handler = logging.FileHandler(logname, mode='a')
+            file_handler.setFormatter(formatter)
+            self.logger.setLevel(logging.DEBUG)
+            self.log_listener = queue_logging(self.logger, [file_handler, console_handler])
+        else:
+            logging.basicConfig(
+                filename=logname,
+                filemode='a',
+                format='%(asctime)s,%(msecs)03d %(name)s %(levelname)s %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S',
+                level=logging.DEBUG
+            )
+            self.logger.addHandler(console_handler)
         self.logger.info("Iniciando Paper Trading Bot...")
 
     def get_orderbook_snapshot(self):
-        response = requests.get("https://api.binance.com/api/v3/ticker/bookTicker?symbol=USDTBRL")
-        data = response.json()
-        bid = float(data['bidPrice'])
-        ask = float(data['askPrice'])
-        self.logger.info(f"Orderbook | ask : {ask} | bid: {bid}")
-        return {'bid': bid, 'ask': ask}
+        snapshot = self.client.fetch_sync(self.symbol)
+        self.logger.info(f"Orderbook | ask : {snapshot['ask']} | bid: {snapshot['bid']}")
+        return snapshot
 
     def _get_observation(self, snapshot):
         bid = snapshot['bid']
@@ -56,55 +104,144 @@ class PaperTradingBot:
             self.cash
         ], dtype=np.float32)
 
-    def ejecutar_compra(self, bid, usd):
-        ars_needed = usd * bid * (1 + self.fee_rate)
+    def ejecutar_compra(self, price, usd):
+        ars_needed = usd * price * (1 + self.fee_rate)
         if self.cash >= ars_needed:
             self.inventory += usd
             self.cash -= ars_needed
-            equity = self.calcular_equity(bid)
-            self.trades.append(("BUY", usd, bid))
-            self.logger.info(f"🟢 BUY: {usd:.2f} USDT @ {bid:.2f} ARS | Fee Incluido | Cash: {self.cash:.2f}, Inv: {self.inventory:.2f}, Eq: {equity:.2f}")
+            equity = self.calcular_equity(price)
+            self.ledger.buy(usd, price, fee=usd * price * self.fee_rate, ts=time.time_ns())
+            self.logger.info(f"🟢 BUY: {usd:.2f} USDT @ {price:.2f} ARS | Fee Incluido | Cash: {self.cash:.2f}, Inv: {self.inventory:.2f}, Eq: {equity:.2f}")
 
-    def ejecutar_venta(self, ask, usd):
+    def ejecutar_venta(self, price, usd):
         if self.inventory >= usd:
             self.inventory -= usd
-            ars_received = usd * ask * (1 - self.fee_rate)
+            ars_received = usd * price * (1 - self.fee_rate)
             self.cash += ars_received
 
-            buy_trades = [t for t in self.trades if t[0] == "BUY"]
-            if buy_trades:
-                avg_buy_price = sum(t[1] * t[2] for t in buy_trades) / sum(t[1] for t in buy_trades)
-                pnl = (ask - avg_buy_price) * usd - (usd * ask * self.fee_rate + usd * avg_buy_price * self.fee_rate)
-            else:
-                pnl = 0.0
+            # PnL neto: descuenta el fee de venta y el de compra de las unidades vendidas
+            _, pnl = self.ledger.sell(usd, price, fee=usd * price * self.fee_rate, ts=time.time_ns())
 
-            equity = self.calcular_equity(ask)
-            self.trades.append(("SELL", usd, ask, pnl))
-            self.logger.info(f"🔴 SELL: {usd:.2f} USDT @ {ask:.2f} ARS | Fee Incluido | PnL: {pnl:.2f}, Cash: {self.cash:.2f}, Inv: {self.inventory:.2f}, Eq: {equity:.2f}")
+            equity = self.calcular_equity(price)
+            self.logger.info(f"🔴 SELL: {usd:.2f} USDT @ {price:.2f} ARS | Fee Incluido | PnL: {pnl:.2f}, Cash: {self.cash:.2f}, Inv: {self.inventory:.2f}, Eq: {equity:.2f}")
 
     def calcular_equity(self, bid):
         return self.cash + self.inventory * bid
 
-    def run(self):
-        while True:
-            snapshot = self.get_orderbook_snapshot()
-            obs = self._get_observation(snapshot)
-            action, _ = self.model.predict(obs, deterministic=True)
-
-            if action == 1:
-                self.ejecutar_compra(snapshot['bid'], usd=5.0)
-            elif action == 2:
-                if self.inventory >= 20:
-                    self.ejecutar_venta(snapshot['ask'], usd=self.inventory)
-                else:
-                    self.ejecutar_venta(snapshot['ask'], usd=5.0)
-
-            equity = self.calcular_equity(snapshot['bid'])
-            self.equity_history.append(equity)
-            self.logger.debug(f"Equity actualizado: {equity:.2f}")
-
-            time.sleep(1)
+    def update_features(self, bid):
+        # Features de los ticks anteriores (como el step del env) y después suma el bid actual
+        if self.features is None:
+            return None
+        self.last_features = self.features.values()
+        self.features.update(bid)
+        hurst, lyap, volatility = self.last_features
+        self.logger.debug(f"Features | hurst: {hurst:.3f} | lyap: {lyap:.3f} | vol: {volatility:.5f}")
+        return self.last_features
+
+    def flush_history(self):
+        # Vuelca lo pendiente de los ring buffers a disco
+        self.ledger.fills.flush()
+        self.equity_history.flush()
+        if self.recorder is not None:
+            self.recorder.flush()
+
+    def close(self):
+        self.flush_history()
+        if self.recorder is not None:
+            self.recorder.close()
+        self.report_metrics()
+        self.client.close()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
+        if self.log_listener is not None:
+            self.log_listener.stop()  # vacía la cola antes de salir
+            self.log_listener = None
+
+    def _lap(self, stage, start):
+        now = perf_counter_ns()
+        self.profiler.record(stage, now - start)
+        return now
+
+    def report_metrics(self):
+        # Resumen de latencias en el log + archivo Prometheus
+        if self.live_loop is not None:
+            for name, value in self.live_loop.stats.items():
+                if name in self.profiler.counters:
+                    self.profiler.counters[name] = value
+        self.logger.info(self.profiler.summary_line())
+        if self.metrics_path:
+            self.profiler.write_prometheus(self.metrics_path)
+        self.last_summary = time.monotonic()
+
+    def on_snapshot(self, snapshot):
+        start = t = perf_counter_ns()
+        if self.recorder is not None:
+            self.recorder.append(snapshot)
+        t = self._lap("record", t)
+        self.update_features(snapshot['bid'])
+        t = self._lap("features", t)
+        obs = self._get_observation(snapshot)
+        t = self._lap("observation", t)
+        action, _ = self.model.predict(obs, deterministic=True)
+        t = self._lap("predict", t)
+
+        fills = len(self.ledger.fills)
+        # Compras al ask y ventas al bid, como el env y el bot de replay
+        if action == 1:
+            self.ejecutar_compra(snapshot_price(snapshot, BUY, 5.0)[0], usd=5.0)
+        elif action == 2:
+            usd = self.inventory if self.inventory >= 20 else 5.0
+            self.ejecutar_venta(snapshot_price(snapshot, SELL, usd)[0], usd=usd)
+
+        if len(self.ledger.fills) > fills:
+            self.profiler.counters["buys" if action == 1 else "sells"] += 1
+        t = self._lap("orders", t)
+
+        equity = self.calcular_equity(snapshot['bid'])
+        self.equity_history.append(time.time_ns(), equity)
+        self.logger.debug(f"Equity actualizado: {equity:.2f}")
+        self._lap("log", t)
+        self._lap("tick", start)
+        if time.monotonic() - self.last_summary >= self.summary_interval:
+            self.report_metrics()
+
+    def run(self, interval=1.0):
+        # Un tick cada `interval` s contados desde el inicio del anterior; si el tick
+        # (fetch + decisión) tarda más que eso, se cuenta un overrun y el siguiente sale enseguida
+        counters = self.profiler.counters
+        try:
+            while True:
+                start = perf_counter_ns()
+                counters["ticks"] += 1
+                snapshot = self.get_orderbook_snapshot()
+                self._lap("fetch", start)
+                counters["snapshots"] += 1
+                self.on_snapshot(snapshot)
+                elapsed = (perf_counter_ns() - start) / 1e9
+                if elapsed > interval:
+                    counters["overruns"] += 1
+                time.sleep(max(0.0, interval - elapsed))
+        finally:
+            self.close()
+
+    def run_async(self, interval=1.0, max_ticks=None):
+        # Loop asyncio: ticks sin drift, fetch con timeout y decisión en corrutinas separadas
+        def on_snapshot(snapshot):
+            self.logger.info(f"Orderbook | ask : {snapshot['ask']} | bid: {snapshot['bid']}")
+            self.on_snapshot(snapshot)
+
+        loop = LiveLoop(self.client, self.symbol, on_snapshot, interval=interval, logger=self.logger,
+                        profiler=self.profiler)
+        self.live_loop = loop
+        try:
+            stats = asyncio.run(loop.run(max_ticks))
+            self.logger.info(f"Loop finalizado: {stats}")
+        finally:
+            self.close()
+        return stats
 
 # Ejemplo de uso:
 # bot = PaperTradingBot(model_path="models/model_equity_2269.zip")
-# bot.run()
+# bot.run_async()  # o bot.run() (loop síncrono)
@@ -1,41 +1,62 @@
-import requests
 import time
 import numpy as np
-from stable_baselines3 import PPO
+from numpy_policy import load_policy
+import os
+from history import EQUITY_DTYPE, HISTORY_CAPACITY, RingHistory
+from ledger import BUY, FILL_DTYPE, SELL, PositionLedger
+from online_features import OnlineFeatures
+from order_book import snapshot_price
 from datetime import datetime
 import logging
-import pandas as pd
+from replay import CHUNK_ROWS, open_replay
 
 CSV_PATH = "data/BINANCE-USDT_BRL-100_depth-1749231790356.csv"
 
 class MockedBinance:
-    def __init__(self, csv_path):
-        self.df = pd.read_csv(csv_path)
+    def __init__(self, csv_path, start=None, chunk_rows=CHUNK_ROWS, depth=False):
+        # Uno o varios archivos (CSV o store) leídos por tramos en orden cronológico;
+        # con varios, los snapshots se intercalan por timestamp. start: timestamp inicial.
+        # depth=True: los snapshots traen el book L2 y las órdenes del bot lo recorren
+        self.source = open_replay(csv_path, start=start, chunk_rows=chunk_rows, depth=depth)
+        self.ticks = iter(self.source)
         self.index = 0
 
-    def get_next_snapshot(self):
-        if self.index >= len(self.df):
-            return None  # Fin de datos
-
-        row = self.df.iloc[self.index]
-        self.index += 1
+    def seek(self, timestamp):
+        self.source.seek(timestamp)
+        self.ticks = iter(self.source)
 
-        bid = float(row['bid'])
-        ask = float(row['ask'])
-        return {'bid': bid, 'ask': ask, 'spread_percentage': row['spread_percentage']}
+    def get_next_snapshot(self):
+        snapshot = next(self.ticks, None)  # None: fin de datos
+        if snapshot is not None:
+            self.index += 1
+        return snapshot
 
 class PaperTradingBot:
-    def __init__(self, model_path):
-        self.model = PPO.load(model_path)
+    def __init__(self, model_path, cost_method="average",
+                 history_dir=None, history_capacity=HISTORY_CAPACITY, features=False):
+        # .npz exportado con numpy_policy.py -> inferencia sin torch; .zip -> PPO
+        self.model = load_policy(model_path)
         self.inventory = 0.0  # en USDT
         self.cash = 100.0  # saldo inicial en ARS
-        self.trades = []
-        self.equity_history = []
         self.fee_rate = 0.001  # 0.1%
 
         now = datetime.now().strftime("%Y%m%d_%H%M%S")
         logname = f"paper_trading_{now}.log"
 
+        # Historial en ring buffers de tamaño fijo; con history_dir se vuelca por lotes a
+        # history/paper_trading_<fecha>_{fills,equity}.bin (leer con history.open_history)
+        def spill_path(name):
+            return os.path.join(history_dir, f"paper_trading_{now}_{name}.bin") if history_dir else None
+
+        # Posición con costo incremental (O(1) por fill): average o fifo
+        self.ledger = PositionLedger(cost_method, fills=RingHistory(FILL_DTYPE, history_capacity, spill_path("fills")))
+        self.equity_history = RingHistory(EQUITY_DTYPE, history_capacity, spill_path("equity"))
+
+        # Hurst/Lyapunov/volatilidad incrementales, con la misma ventana que el env
+        # (solo monitoreo: la política observa bid, ask, spread, inventario y cash)
+        self.features = OnlineFeatures() if features else None
+        self.last_features = None
+
         logging.basicConfig(
             filename=logname,
             filemode='a',
@@ -66,55 +87,75 @@ class PaperTradingBot:
             self.cash
         ], dtype=np.float32)
 
-    def ejecutar_compra(self, bid, usd):
-        ars_needed = usd * bid * (1 + self.fee_rate)
+    def ejecutar_compra(self, price, usd):
+        ars_needed = usd * price * (1 + self.fee_rate)
         if self.cash >= ars_needed:
             self.inventory += usd
             self.cash -= ars_needed
-            equity = self.calcular_equity(bid)
-            self.trades.append(("BUY", usd, bid))
-            self.logger.info(f"🟢 BUY: {usd:.2f} USDT @ {bid:.2f} ARS | Cash: {self.cash:.2f}, Inv: {self.inventory:.2f}, Eq: {equity:.2f}")
+            equity = self.calcular_equity(price)
+            self.ledger.buy(usd, price, fee=usd * price * self.fee_rate, ts=time.time_ns())
+            self.logger.info(f"🟢 BUY: {usd:.2f} USDT @ {price:.2f} ARS | Cash: {self.cash:.2f}, Inv: {self.inventory:.2f}, Eq: {equity:.2f}")
 
-    def ejecutar_venta(self, ask, usd):
+    def ejecutar_venta(self, price, usd):
         if self.inventory >= usd:
             self.inventory -= usd
-            ars_received = usd * ask * (1 - self.fee_rate)
+            ars_received = usd * price * (1 - self.fee_rate)
             self.cash += ars_received
 
-            buy_trades = [t for t in self.trades if t[0] == "BUY"]
-            if buy_trades:
-                avg_buy_price = sum(t[1] * t[2] for t in buy_trades) / sum(t[1] for t in buy_trades)
-                pnl = (ask - avg_buy_price) * usd
-            else:
-                pnl = 0.0
+            # PnL bruto (sin fees) contra el costo de la posición abierta
+            pnl, _ = self.ledger.sell(usd, price, fee=usd * price * self.fee_rate, ts=time.time_ns())
 
-            equity = self.calcular_equity(ask)
-            self.trades.append(("SELL", usd, ask, pnl))
-            self.logger.info(f"🔴 SELL: {usd:.2f} USDT @ {ask:.2f} ARS | PnL: {pnl:.2f}, Cash: {self.cash:.2f}, Inv: {self.inventory:.2f}, Eq: {equity:.2f}")
+            equity = self.calcular_equity(price)
+            self.logger.info(f"🔴 SELL: {usd:.2f} USDT @ {price:.2f} ARS | PnL: {pnl:.2f}, Cash: {self.cash:.2f}, Inv: {self.inventory:.2f}, Eq: {equity:.2f}")
 
     def calcular_equity(self, bid):
         return self.cash + self.inventory * bid
 
+    def fill_price(self, snapshot, side, usd):
+        # Compras al ask y ventas al bid; con book L2 en el snapshot, precio promedio de la
+        # orden recorriendo los niveles (order_book.snapshot_price)
+        fill, visible = snapshot_price(snapshot, side, usd)
+        if visible < usd:
+            self.logger.debug(f"Book sin profundidad para {usd:.2f}: {usd - visible:.2f} al peor nivel visible")
+        return fill
+
+    def update_features(self, bid):
+        # Features de los ticks anteriores (como el step del env) y después suma el bid actual
+        if self.features is None:
+            return None
+        self.last_features = self.features.values()
+        self.features.update(bid)
+        hurst, lyap, volatility = self.last_features
+        self.logger.debug(f"Features | hurst: {hurst:.3f} | lyap: {lyap:.3f} | vol: {volatility:.5f}")
+        return self.last_features
+
+    def flush_history(self):
+        # Vuelca lo pendiente de los ring buffers a disco
+        self.ledger.fills.flush()
+        self.equity_history.flush()
+
     def run(self, exchange):
         while True:
             snapshot = exchange.get_next_snapshot()
             if snapshot is None:
                 break
 
+            self.update_features(snapshot['bid'])
             obs = self._get_observation(snapshot)
             action, _ = self.model.predict(obs, deterministic=True)
 
             if action == 1:
-                self.ejecutar_compra(snapshot['bid'], usd=5.0)
+                self.ejecutar_compra(self.fill_price(snapshot, BUY, 5.0), usd=5.0)
             elif action == 2:
                 if self.inventory >= 20:
-                    self.ejecutar_venta(snapshot['ask'], usd=self.inventory)
+                    self.ejecutar_venta(self.fill_price(snapshot, SELL, self.inventory), usd=self.inventory)
                 else:
-                    self.ejecutar_venta(snapshot['ask'], usd=5.0)
+                    self.ejecutar_venta(self.fill_price(snapshot, SELL, 5.0), usd=5.0)
 
             equity = self.calcular_equity(snapshot['bid'])
-            self.equity_history.append(equity)
+            self.equity_history.append(time.time_ns(), equity)
             self.logger.debug(f"Equity actualizado: {equity:.2f}")
+        self.flush_history()
 
 # Ejemplo de uso:
 # exchange = MockedBinance(CSV_PATH)
@@ -0,0 +1,289 @@
+# registry.py
+# Registro de modelos entrenados: índice SQLite con config y métricas de cada
+# modelo + cache LRU en proceso de políticas cargadas.
+#
+#   registry = ModelRegistry()                    # models/registry.db
+#   registry.scan()                               # indexa model_*.zip / config_*.json sueltos
+#   registry.top(5, dataset="BITSO-XRP_MXN-1000_depth-1748377579235")
+#   policy = registry.load("model_final_0012")    # id (nombre del .zip) o path; sale del cache si ya se cargó
+#
+# Las consultas no abren los .zip. search.py registra cada modelo que guarda.
+# El id es el nombre del .zip; si ese nombre ya está registrado con otro path (ej.
+# model_equity_1.zip en la raíz y en models/), lleva el directorio adelante.
+#
+# Uso: python registry.py scan [dirs...] | python registry.py top [-k 10] [--dataset X] [--metric equity]
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+
+from numpy_policy import load_policy
+
+REGISTRY_DB = "models/registry.db"
+SCAN_DIRS = ("models", "models_final", ".")
+POLICY_CACHE_SIZE = 8
+# Métricas por las que se puede ordenar (y si más alto es mejor)
+METRICS = {
+    "equity": True,
+    "max_drawdown": True,   # negativo: más cerca de 0 es mejor
+    "profit_factor": True,
+    "num_trades": True,
+    "timesteps": True,
+    "created": True,
+}
+FIELDS = ("id", "model_path", "config_path", "config", "dataset", "pair", "seed", "timesteps",
+          "equity", "max_drawdown", "profit_factor", "num_trades", "parent_id", "created", "extra")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    id TEXT PRIMARY KEY,
+    model_path TEXT NOT NULL UNIQUE,
+    config_path TEXT,
+    config TEXT,
+    dataset TEXT,
+    pair TEXT,
+    seed INTEGER,
+    timesteps INTEGER,
+    equity REAL,
+    max_drawdown REAL,
+    profit_factor REAL,
+    num_trades INTEGER,
+    parent_id TEXT,
+    created REAL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS models_dataset_equity ON models (dataset, equity);
+"""
+
+
+def dataset_name(csv_path):
+    # "data/BITSO-XRP_MXN-1000_depth-1748377579235.csv" -> "BITSO-XRP_MXN-1000_depth-1748377579235";
+    # varios CSVs (env multi-dataset) -> nombres unidos con "+"
+    if csv_path is None:
+        return None
+    if not isinstance(csv_path, (str, os.PathLike)):
+        return "+".join(dataset_name(path) for path in csv_path)
+    return os.path.splitext(os.path.basename(csv_path))[0]
+
+
+def dataset_pair(name):
+    # "BITSO-XRP_MXN-1000_depth-..." -> "XRP_MXN" (formato de los CSV de data/)
+    parts = (name or "").split("-")
+    return parts[1] if len(parts) > 2 else None
+
+
+class PolicyCache:
+    # LRU de políticas cargadas con load_policy, por path absoluto + mtime
+    # (si el archivo se reescribe, se vuelve a cargar)
+    def __init__(self, maxsize=POLICY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.policies = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_path):
+        path = os.path.abspath(model_path)
+        if not os.path.exists(path) and os.path.exists(path + ".zip"):
+            path += ".zip"  # como PPO.load("models/model_equity_1007_8")
+        key = (path, os.stat(path).st_mtime_ns)
+        policy = self.policies.get(key)
+        if policy is not None:
+            self.policies.move_to_end(key)
+            self.hits += 1
+            return policy
+        self.misses += 1
+        policy = load_policy(path)
+        self.policies[key] = policy
+        while len(self.policies) > self.maxsize:
+            self.policies.popitem(last=False)
+        return policy
+
+    def clear(self):
+        self.policies.clear()
+
+    def __len__(self):
+        return len(self.policies)
+
+
+POLICY_CACHE = PolicyCache()
+
+
+def cached_policy(model_path):
+    return POLICY_CACHE.get(model_path)
+
+
+class ModelRegistry:
+    def __init__(self, db_path=REGISTRY_DB, cache=POLICY_CACHE):
+        self.db_path = db_path
+        self.cache = cache
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # timeout + WAL: los workers de search.py registran en paralelo
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def register(self, model_path, config=None, config_path=None, dataset=None, seed=None, timesteps=None,
+                 equity=None, max_drawdown=None, profit_factor=None, num_trades=None, parent_id=None,
+                 model_id=None, **extra):
+        # Alta o actualización (por model_path) de un modelo; devuelve su id.
+        # dataset acepta el path del CSV (o una lista) y guarda su nombre
+        model_path = os.path.relpath(model_path)
+        if config is None and config_path and os.path.exists(config_path):
+            with open(config_path) as f:
+                config = json.load(f)
+        dataset = dataset_name(dataset)
+        model_id = model_id or self.id_for(model_path) or self._new_id(model_path)
+        row = {
+            "id": model_id,
+            "model_path": model_path,
+            "config_path": os.path.relpath(config_path) if config_path else None,
+            "config": json.dumps(config, sort_keys=True) if config is not None else None,
+            "dataset": dataset,
+            "pair": dataset_pair(dataset),
+            "seed": seed,
+            "timesteps": timesteps,
+            "equity": equity,
+            "max_drawdown": max_drawdown,
+            "profit_factor": profit_factor,
+            "num_trades": num_trades,
+            "parent_id": parent_id,
+            "created": time.time(),
+            "extra": json.dumps(extra, sort_keys=True) if extra else None,
+        }
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{name}" for name in row)
+        # Los campos que no se pasan (None) no pisan lo que ya estaba registrado
+        updates = ", ".join(f"{name} = COALESCE(excluded.{name}, {name})"
+                            for name in row if name not in ("model_path", "created"))
+        with self.conn:
+            self.conn.execute(f"INSERT INTO models ({columns}) VALUES ({placeholders}) "
+                              f"ON CONFLICT (model_path) DO UPDATE SET {updates}", row)
+        return model_id
+
+    def update_metrics(self, model_id, **metrics):
+        unknown = set(metrics) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {sorted(unknown)}")
+        sets = ", ".join(f"{name} = :{name}" for name in metrics)
+        with self.conn:
+            self.conn.execute(f"UPDATE models SET {sets} WHERE id = :id", {**metrics, "id": model_id})
+
+    def _new_id(self, model_path):
+        # Id de un modelo nuevo: el nombre del .zip; si ya lo usa otro path (el mismo nombre en
+        # models/ y en la raíz), se le antepone el directorio, y si aun así choca, un número
+        base = os.path.splitext(os.path.basename(model_path))[0]
+        directory = os.path.dirname(model_path).replace(os.sep, "_").strip("._") or "root"
+        candidates = [base, f"{directory}_{base}"]
+        candidates += (f"{directory}_{base}_{n}" for n in range(2, 1000))
+        for model_id in candidates:
+            if not self.conn.execute("SELECT 1 FROM models WHERE id = ?", (model_id,)).fetchone():
+                return model_id
+        raise ValueError(f"No hay id libre para {model_path}")
+
+    def id_for(self, model_path):
+        row = self.conn.execute("SELECT id FROM models WHERE model_path = ?", (model_path,)).fetchone()
+        return row["id"] if row else None
+
+    def get(self, model_id):
+        row = self.conn.execute("SELECT * FROM models WHERE id = ? OR model_path = ?",
+                                (model_id, os.path.relpath(model_id))).fetchone()
+        if row is None:
+            raise KeyError(f"Modelo no registrado: {model_id}")
+        return self._to_dict(row)
+
+    def top(self, k=10, dataset=None, pair=None, metric="equity"):
+        # Top-k por métrica (sin contar los modelos que no la tienen), opcionalmente por dataset o par
+        if metric not in METRICS:
+            raise ValueError(f"Métrica desconocida: {metric} (opciones: {sorted(METRICS)})")
+        where = [f"{metric} IS NOT NULL"]
+        params = []
+        if dataset is not None:
+            where.append("dataset = ?")
+            params.append(dataset_name(dataset))
+        if pair is not None:
+            where.append("pair = ?")
+            params.append(pair)
+        order = "DESC" if METRICS[metric] else "ASC"
+        rows = self.conn.execute(f"SELECT * FROM models WHERE {' AND '.join(where)} "
+                                 f"ORDER BY {metric} {order} LIMIT ?", (*params, k)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def all(self):
+        return [self._to_dict(row) for row in self.conn.execute("SELECT * FROM models ORDER BY created")]
+
+    def remove(self, model_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM models WHERE id = ?", (model_id,))
+
+    def load(self, model_id):
+        # Política del modelo (id registrado o path) vía el cache LRU
+        try:
+            model_path = self.get(model_id)["model_path"]
+        except KeyError:
+            model_path = model_id
+        return self.cache.get(model_path)
+
+    def scan(self, dirs=SCAN_DIRS):
+        # Indexa los model_*.zip que todavía no están registrados, con su config_*.json
+        # (model_equity_X.zip -> config_X.json, model_<id>.zip -> config_<id>.json)
+        added = []
+        for directory in dirs:
+            for model_path in sorted(glob.glob(os.path.join(directory, "model_*.zip"))):
+                model_path = os.path.relpath(model_path)
+                if self.id_for(model_path) is not None:
+                    continue
+                uid = os.path.basename(model_path)[len("model_"):-len(".zip")]
+                candidates = [uid, uid[len("equity_"):]] if uid.startswith("equity_") else [uid]
+                config_path = next((path for path in (os.path.join(directory, f"config_{c}.json") for c in candidates)
+                                    if os.path.exists(path)), None)
+                added.append(self.register(model_path, config_path=config_path))
+        return added
+
+    def _to_dict(self, row):
+        out = dict(row)
+        for name in ("config", "extra"):
+            if out[name] is not None:
+                out[name] = json.loads(out[name])
+        return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registro de modelos")
+    sub = parser.add_subparsers(dest="command", required=True)
+    scan_p = sub.add_parser("scan")
+    scan_p.add_argument("dirs", nargs="*", default=list(SCAN_DIRS))
+    top_p = sub.add_parser("top")
+    top_p.add_argument("-k", type=int, default=10)
+    top_p.add_argument("--dataset")
+    top_p.add_argument("--pair")
+    top_p.add_argument("--metric", default="equity", choices=sorted(METRICS))
+    parser.add_argument("--db", default=REGISTRY_DB)
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.db)
+    if args.command == "scan":
+        added = registry.scan(args.dirs)
+        print(f"📚 {len(added)} modelo(s) nuevos registrados")
+        for model_id in added:
+            print(f"  {model_id}")
+        return 0
+
+    rows = registry.top(args.k, dataset=args.dataset, pair=args.pair, metric=args.metric)
+    for row in rows:
+        print(f"{row['id']:28s} {row[args.metric]:12.4f}  {row['dataset'] or '-'}  {row['model_path']}")
+    if not rows:
+        print(f"Sin modelos con {args.metric} registrado")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# replay.py
+# Replay en streaming de snapshots para backtesting (MockedBinance).
+#
+# ReplaySource lee un dataset (CSV -> store columnar de dataset_store, o un
+# directorio de store) por tramos de `chunk_rows` filas con np.fromfile: la
+# memoria es la de un tramo, no la del archivo. Los snapshots salen en orden
+# cronológico y seek() salta al primer snapshot >= un timestamp.
+# MergedReplay intercala varios archivos por timestamp, tramo a tramo.
+#
+#   for snapshot in open_replay(["data/a.csv", "data/b.csv"], start="2025-05-15T19:00:00Z"):
+#       ...  # {'timestamp', 'pair', 'bid', 'ask', 'spread_percentage'}
+#
+# Con depth=True (datasets con profundidad L2) cada snapshot trae además
+# 'book': (bid_px, bid_qty, ask_px, ask_qty) de la fila (ver order_book.py).
+#
+# Para consumidores vectorizados, chunks() devuelve los tramos como arrays.
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import STORE_DIR, open_dataset
+from order_book import BOOK_COLUMNS
+
+CHUNK_ROWS = 65_536
+REPLAY_COLUMNS = ("timestamp", "bid", "ask", "spread_percentage")
+
+
+def to_ns(timestamp):
+    # int (epoch ns), str ISO 8601 o datetime -> epoch ns
+    if isinstance(timestamp, (int, np.integer)):
+        return int(timestamp)
+    ts = pd.Timestamp(timestamp)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.value
+
+
+def iter_snapshots(chunk, pairs):
+    if "bid_px" not in chunk:
+        return top_snapshots(chunk, pairs)
+    return with_books(top_snapshots(chunk, pairs), chunk)
+
+
+def with_books(snapshots, chunk):
+    for snapshot, book in zip(snapshots, zip(*(chunk[name] for name in BOOK_COLUMNS))):
+        snapshot['book'] = book
+        yield snapshot
+
+
+def top_snapshots(chunk, pairs):
+    # pairs: lista de pares indexada por la columna "source" del tramo (si no hay, un solo par)
+    columns = (chunk["timestamp"].tolist(), chunk["bid"].tolist(), chunk["ask"].tolist(),
+               chunk["spread_percentage"].tolist())
+    if "source" not in chunk:
+        pair = pairs[0]
+        for ts, bid, ask, spread in zip(*columns):
+            yield {'timestamp': ts, 'pair': pair, 'bid': bid, 'ask': ask, 'spread_percentage': spread}
+        return
+    names = [pairs[k] for k in chunk["source"].tolist()]
+    for pair, ts, bid, ask, spread in zip(names, *columns):
+        yield {'timestamp': ts, 'pair': pair, 'bid': bid, 'ask': ask, 'spread_percentage': spread}
+
+
+class ReplaySource:
+    def __init__(self, path, start=None, chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR, depth=False):
+        self.dataset = open_dataset(path, store_dir)
+        self.pair = self.dataset.pair
+        self.columns = REPLAY_COLUMNS
+        if depth:
+            if not all(name in self.dataset.meta["columns"] for name in BOOK_COLUMNS):
+                raise ValueError(f"{path} no tiene profundidad L2 (solo top-of-book)")
+            self.columns = REPLAY_COLUMNS + BOOK_COLUMNS
+        self.chunk_rows = chunk_rows
+        self.position = 0  # próxima fila a leer de disco
+        if start is not None:
+            self.seek(start)
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def seek(self, timestamp):
+        # Búsqueda binaria sobre la columna mapeada: solo toca log(n) páginas
+        self.position = int(np.searchsorted(self.dataset.timestamp, to_ns(timestamp), side="left"))
+        return self.position
+
+    def read(self, start, count):
+        chunk = {}
+        for name in self.columns:
+            dtype = np.dtype(self.dataset.meta["columns"][name])
+            chunk[name] = np.fromfile(os.path.join(self.dataset.path, f"{name}.bin"), dtype=dtype,
+                                      count=count, offset=start * dtype.itemsize)
+        # Mismos valores que float(self.bid[i]) sobre el float32 del store
+        for name in ("bid", "ask", "spread_percentage"):
+            chunk[name] = chunk[name].astype(np.float64)
+        return chunk
+
+    def chunks(self):
+        while self.position < len(self.dataset):
+            count = min(self.chunk_rows, len(self.dataset) - self.position)
+            chunk = self.read(self.position, count)
+            self.position += count
+            yield chunk
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from iter_snapshots(chunk, [self.pair])
+
+
+class MergedReplay:
+    # Varios ReplaySource intercalados por timestamp (empates: en el orden de `sources`)
+    def __init__(self, sources, start=None):
+        self.sources = sources
+        self.pairs = [source.pair for source in sources]
+        if start is not None:
+            self.seek(start)
+
+    def __len__(self):
+        return sum(len(source) for source in self.sources)
+
+    def seek(self, timestamp):
+        for source in self.sources:
+            source.seek(timestamp)
+
+    def chunks(self):
+        iters = [source.chunks() for source in self.sources]
+        pending = [next(it, None) for it in iters]
+        while any(chunk is not None for chunk in pending):
+            # Todo lo que tenga timestamp <= al menor "último timestamp" de los tramos
+            # pendientes ya se puede emitir: las filas que faltan leer son posteriores
+            active = [k for k, chunk in enumerate(pending) if chunk is not None]
+            cutoff = min(pending[k]["timestamp"][-1] for k in active)
+            parts = []
+            for k in active:
+                chunk = pending[k]
+                cut = int(np.searchsorted(chunk["timestamp"], cutoff, side="right"))
+                part = {name: values[:cut] for name, values in chunk.items()}
+                part["source"] = np.full(cut, k, dtype=np.int16)
+                parts.append(part)
+                if cut < len(chunk["timestamp"]):
+                    pending[k] = {name: values[cut:] for name, values in chunk.items()}
+                else:
+                    pending[k] = next(iters[k], None)
+
+            merged = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+            order = np.argsort(merged["timestamp"], kind="stable")
+            yield {name: values[order] for name, values in merged.items()}
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from iter_snapshots(chunk, self.pairs)
+
+
+def open_replay(paths, start=None, chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR, depth=False):
+    # Un path -> ReplaySource; varios -> MergedReplay
+    if isinstance(paths, (str, os.PathLike)):
+        return ReplaySource(paths, start=start, chunk_rows=chunk_rows, store_dir=store_dir, depth=depth)
+    sources = [ReplaySource(path, chunk_rows=chunk_rows, store_dir=store_dir, depth=depth) for path in paths]
+    replay = sources[0] if len(sources) == 1 else MergedReplay(sources)
+    if start is not None:
+        replay.seek(start)
+    return replay
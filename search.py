@@ -0,0 +1,430 @@
+# search.py
+# Búsqueda de reward configs con Optuna. Reemplaza la lógica duplicada de los
+# optimize_*.py: cada búsqueda se describe en un spec JSON (search_specs/) con
+# el espacio de búsqueda, timesteps, pruner y filtros de calidad.
+#
+# - K workers locales (procesos) corren trials contra el mismo estudio en sqlite.
+# - Es reanudable: relanzar el mismo spec sigue el estudio hasta completar n_trials;
+#   los trials de un worker caído se marcan FAIL (heartbeat) y se reintentan.
+# - Los artefactos se guardan con un id único por trial:
+#   <save_dir>/model_<study_name>_<trial>.zip y config_<study_name>_<trial>.json
+#   y se registran con sus métricas en el índice de registry.py ("registry" del spec).
+# - Warm start opcional ("warm_start" del spec): cada trial arranca de los pesos de un
+#   checkpoint padre y se entrena con menos timesteps:
+#     "warm_start": {"parent": "incumbent", "timesteps": 30000, "cold_every": 5}
+#   parent: "incumbent" (mejor modelo guardado del estudio, o el mejor del registro para
+#   el dataset), un id del registro o un path. cold_every: 1 de cada N trials arranca
+#   desde cero, para comparar (print_warm_start_summary).
+# - Objetivo walk-forward opcional ("walk_forward" del spec): en vez de la equity del último
+#   episodio de entrenamiento, el trial vale la equity fuera de muestra de walk_forward.py
+#   (folds cronológicos entrenados en paralelo):
+#     "walk_forward": {"folds": 4, "anchored": true, "workers": 4}
+#
+# Uso: python search.py search_specs/final.json --workers 4 [--n-trials 30] [--walk-forward 4]
+#      python search.py search_specs/final.json --check   (valida el spec sin importar optuna/torch)
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import warnings
+
+from ledger import SELL
+from registry import REGISTRY_DB, ModelRegistry
+
+# optuna, stable-baselines3 (torch) y el env se importan dentro de las funciones que
+# los usan: cargar y validar un spec (--check) no paga esos segundos de arranque
+
+PENALTY = -1.0  # valor para trials que no pasan los filtros de calidad
+
+# Filtros de calidad: nombre -> condición que el trial tiene que cumplir
+FILTERS = {
+    "min_final_cash": lambda stats, v: stats["final_cash"] >= v,
+    "final_inventory_below": lambda stats, v: stats["final_inventory"] < v,
+    "final_equity_above": lambda stats, v: stats["final_equity"] > v,
+    "min_sells": lambda stats, v: stats["num_sells"] >= v,
+}
+
+
+def load_spec(path):
+    with open(path) as f:
+        spec = json.load(f)
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec.setdefault("study_name", name)
+    spec.setdefault("storage", f"sqlite:///{spec['study_name']}_study.db")
+    spec.setdefault("timesteps", 50_000)
+    spec.setdefault("n_trials", 50)
+    spec.setdefault("save_dir", "models")
+    spec.setdefault("registry", REGISTRY_DB)
+    spec.setdefault("pruner", {"type": "median"})
+    spec.setdefault("fixed", {})
+    spec.setdefault("filters", {})
+    for key in spec["filters"]:
+        if key not in FILTERS:
+            raise ValueError(f"Filtro desconocido en {path}: {key}")
+    warm_start = spec.get("warm_start")
+    if warm_start:
+        if "parent" not in warm_start or "timesteps" not in warm_start:
+            raise ValueError(f"warm_start en {path} necesita parent y timesteps")
+        warm_start.setdefault("cold_every", 0)
+    return spec
+
+
+def param_range(space):
+    # {"low", "high"} | {"base", "delta"} | {"base", "pct", "min_delta"} -> (low, high)
+    if "low" in space:
+        return space["low"], space["high"]
+    base = space["base"]
+    delta = space.get("delta")
+    if delta is None:
+        delta = max(abs(base) * space["pct"], space.get("min_delta", 0.0))
+    return base - delta, base + delta
+
+
+def check_spec(spec):
+    # Validación sin entrenar: rangos del espacio de búsqueda y datasets existentes
+    problems = []
+    for name, space in spec.get("search_space", {}).items():
+        try:
+            low, high = param_range(space)
+        except KeyError as e:
+            problems.append(f"{name}: falta {e}")
+            continue
+        if low >= high:
+            problems.append(f"{name}: rango vacío [{low}, {high}]")
+    for key in ("csv_path", "eval_csv_path"):
+        if key in spec and not os.path.exists(spec[key]):
+            problems.append(f"{key}: no existe {spec[key]}")
+    if "csv_path" not in spec:
+        problems.append("falta csv_path")
+    walk = spec.get("walk_forward")
+    if walk and walk.get("folds", 1) < 1:
+        problems.append(f"walk_forward: folds tiene que ser >= 1 ({walk['folds']})")
+    return problems
+
+
+def suggest_param(trial, name, space):
+    return trial.suggest_float(name, *param_range(space))
+
+
+def make_pruner(spec):
+    import optuna
+
+    cfg = spec["pruner"]
+    if not cfg:
+        return optuna.pruners.NopPruner()
+    if cfg["type"] == "median":
+        return optuna.pruners.MedianPruner(
+            n_startup_trials=cfg.get("n_startup_trials", 5),
+            n_warmup_steps=cfg.get("n_warmup_steps", spec["eval_freq"]))
+    if cfg["type"] == "hyperband":
+        return optuna.pruners.HyperbandPruner(
+            min_resource=cfg.get("min_resource", spec["eval_freq"]),
+            max_resource=spec["timesteps"],
+            reduction_factor=cfg.get("reduction_factor", 3))
+    raise ValueError(f"Pruner desconocido: {cfg['type']}")
+
+
+def make_storage(spec):
+    from optuna.storages import RDBStorage, RetryFailedTrialCallback
+
+    # Heartbeat: si un worker muere, su trial pasa a FAIL y se reintenta
+    return RDBStorage(
+        spec["storage"],
+        heartbeat_interval=60,
+        grace_period=180,
+        failed_trial_callback=RetryFailedTrialCallback(max_retry=2),
+        engine_kwargs={"connect_args": {"timeout": 60}},
+    )
+
+
+def create_study(spec, worker=0):
+    import optuna
+
+    seed = spec.get("seed")
+    sampler = optuna.samplers.TPESampler(seed=None if seed is None else seed + worker)
+    return optuna.create_study(
+        direction="maximize",
+        study_name=spec["study_name"],
+        storage=make_storage(spec),
+        load_if_exists=True,
+        sampler=sampler,
+        pruner=make_pruner(spec),
+    )
+
+
+def trial_id(spec, trial):
+    return f"{spec['study_name']}_{trial.number:04d}"
+
+
+def incumbent_model(spec, study):
+    # Mejor modelo guardado del estudio; si todavía no hay, el mejor del registro para el dataset
+    from optuna.trial import TrialState
+
+    saved = [t for t in study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,))
+             if os.path.exists(t.user_attrs.get("model_path", ""))]
+    if saved:
+        return max(saved, key=lambda t: t.value).user_attrs["model_path"]
+    if spec["registry"]:
+        registry = ModelRegistry(spec["registry"])
+        try:
+            best = [row["model_path"] for row in registry.top(5, dataset=spec["csv_path"])
+                    if os.path.exists(row["model_path"])]
+        finally:
+            registry.close()
+        if best:
+            return best[0]
+    return None
+
+
+def warm_start_parent(spec, trial):
+    # Checkpoint del que arranca el trial (None = desde cero)
+    warm_start = spec.get("warm_start")
+    if not warm_start:
+        return None
+    if warm_start["cold_every"] and trial.number % warm_start["cold_every"] == 0:
+        return None
+    parent = warm_start["parent"]
+    if parent == "incumbent":
+        return incumbent_model(spec, trial.study)
+    if not os.path.exists(parent) and spec["registry"]:
+        registry = ModelRegistry(spec["registry"])
+        try:
+            parent = registry.get(parent)["model_path"]
+        finally:
+            registry.close()
+    return parent
+
+
+def save_artifacts(spec, trial, model, reward_config, stats, parent=None):
+    os.makedirs(spec["save_dir"], exist_ok=True)
+    uid = trial_id(spec, trial)
+    model_path = os.path.join(spec["save_dir"], f"model_{uid}.zip")
+    config_path = os.path.join(spec["save_dir"], f"config_{uid}.json")
+    if model is not None:  # None: el modelo ya está guardado en model_path (walk-forward)
+        model.save(model_path)
+    with open(config_path, "w") as f:
+        json.dump(reward_config, f, indent=2)
+    trial.set_user_attr("trial_id", uid)
+    trial.set_user_attr("model_path", model_path)
+    trial.set_user_attr("config_path", config_path)
+
+    # Índice de modelos (registry.py): top-k por equity sin abrir los .zip
+    if spec["registry"]:
+        registry = ModelRegistry(spec["registry"])
+        try:
+            registry.register(model_path, config=reward_config, config_path=config_path, dataset=spec["csv_path"],
+                              seed=spec.get("seed"), timesteps=trial.user_attrs["timesteps"],
+                              equity=stats["final_equity"], max_drawdown=stats["max_drawdown"],
+                              profit_factor=stats["profit_factor"], num_trades=stats["num_trades"],
+                              parent_id=os.path.splitext(os.path.basename(parent))[0] if parent else None,
+                              study=spec["study_name"], trial=trial.number)
+        finally:
+            registry.close()
+
+
+def walk_forward_objective(trial, spec, reward_config):
+    import optuna
+
+    from walk_forward import N_FOLDS, walk_forward
+
+    cfg = spec["walk_forward"]
+    n_folds = cfg.get("folds", N_FOLDS)
+    parent = warm_start_parent(spec, trial)
+    timesteps = spec["timesteps"] if parent is None else spec["warm_start"]["timesteps"]
+    trial.set_user_attr("warm_start_parent", parent)
+    trial.set_user_attr("timesteps", timesteps)  # presupuesto de este trial (el que va al registro)
+
+    # Poda por folds terminados: el step va en timesteps, como en TrialEvalCallback. En el pool
+    # los folds terminan en cualquier orden; se reportan en orden de índice (el fold i espera a
+    # los anteriores) para que cada step promedie los mismos folds en todos los trials
+    finished = {}
+    reported = 0
+
+    def report(fold, done):
+        nonlocal reported
+        finished[fold["fold"]] = fold["mean_equity"]
+        while reported in finished:
+            reported += 1
+            trial.report(float(sum(finished[i] for i in range(reported)) / reported),
+                         step=reported * timesteps // n_folds)
+            if (parent is not None or not spec.get("warm_start")) and trial.should_prune():
+                raise optuna.TrialPruned()
+
+    # Se guarda el modelo del último fold (el que entrenó con más datos); se borra si no pasa
+    os.makedirs(spec["save_dir"], exist_ok=True)
+    model_path = os.path.join(spec["save_dir"], f"model_{trial_id(spec, trial)}.zip")
+    try:
+        result = walk_forward(reward_config, spec["csv_path"], timesteps, n_folds=n_folds,
+                              anchored=cfg.get("anchored", True), seed=spec.get("seed") or 0,
+                              workers=cfg.get("workers"), torch_threads=spec.get("torch_threads", 1),
+                              max_steps=cfg.get("max_steps", 500), parent=parent, save_path=model_path,
+                              on_fold=report)
+    except optuna.TrialPruned:
+        if os.path.exists(model_path):
+            os.remove(model_path)
+        raise
+
+    stats = {
+        "final_cash": result["final_cash"],
+        "final_inventory": result["final_inventory"],
+        "final_equity": result["score"],
+        "num_sells": result["num_sells"],
+        "num_trades": result["num_trades"],
+        "max_drawdown": result["max_drawdown"],
+        "profit_factor": result["profit_factor"],
+    }
+    for key, value in stats.items():
+        trial.set_user_attr(key, value)
+    trial.set_user_attr("walk_forward_folds", [f["mean_equity"] for f in result["folds"]])
+    trial.set_user_attr("walk_forward_std", result["std_folds"])
+    trial.set_user_attr("train_seconds", sum(f["train_seconds"] for f in result["folds"]))
+
+    passed = all(FILTERS[key](stats, value) for key, value in spec["filters"].items())
+    if passed and stats["final_equity"] > spec.get("save_equity_above", -math.inf):
+        save_artifacts(spec, trial, None, reward_config, stats, parent)
+    else:
+        os.remove(model_path)
+    return stats["final_equity"] if passed else PENALTY
+
+
+def objective(trial, spec):
+    import optuna
+    from stable_baselines3 import PPO
+
+    from callbacks import TrialEvalCallback
+    from env_simple import SimplifiedTradingEnv
+    from evaluation import calculate_max_drawdown, calculate_profit_factor
+
+    reward_config = dict(spec["fixed"])
+    for name, space in spec["search_space"].items():
+        reward_config[name] = suggest_param(trial, name, space)
+    if spec.get("walk_forward"):
+        return walk_forward_objective(trial, spec, reward_config)
+
+    env = SimplifiedTradingEnv(spec["csv_path"], reward_config=reward_config)
+    model = PPO("MlpPolicy", env, verbose=0)
+
+    # Warm start: pesos (y estado del optimizador) del padre, presupuesto reducido
+    parent = warm_start_parent(spec, trial)
+    timesteps = spec["timesteps"]
+    if parent is not None:
+        model.set_parameters(parent, exact_match=True)
+        timesteps = spec["warm_start"]["timesteps"]
+    trial.set_user_attr("warm_start_parent", parent)
+    trial.set_user_attr("timesteps", timesteps)  # presupuesto de este trial (el que va al registro)
+
+    # Evaluación intermedia cada eval_freq timesteps: el pruner corta los trials malos
+    eval_env = SimplifiedTradingEnv(spec.get("eval_csv_path", spec["csv_path"]), reward_config=reward_config)
+    # Los trials cold de comparación no se podan contra los warm (que arrancan adelantados)
+    pruning = TrialEvalCallback(trial, eval_env, eval_freq=spec["eval_freq"],
+                                prune=parent is not None or not spec.get("warm_start"))
+    model.learn(total_timesteps=timesteps, callback=pruning)
+    if pruning.is_pruned:
+        raise optuna.TrialPruned()
+
+    env.report()
+    stats = {
+        "final_cash": float(env.cash),
+        "final_inventory": float(env.inventory),
+        "final_equity": float(env.get_final_equity()),
+        "num_sells": env.ledger.fills.count(SELL),
+        "num_trades": len(env.ledger.fills),
+        "max_drawdown": calculate_max_drawdown(env.equity_history),
+        "profit_factor": calculate_profit_factor(env.ledger.fills),
+    }
+    for key, value in stats.items():
+        trial.set_user_attr(key, value)
+
+    # Filtros de calidad
+    if not all(FILTERS[key](stats, value) for key, value in spec["filters"].items()):
+        return PENALTY
+
+    if stats["final_equity"] > spec.get("save_equity_above", -math.inf):
+        save_artifacts(spec, trial, model, reward_config, stats, parent)
+
+    return stats["final_equity"]
+
+
+def run_worker(spec, worker=0):
+    warnings.filterwarnings("ignore", category=UserWarning)
+    import torch
+    from optuna.study import MaxTrialsCallback
+    from optuna.trial import TrialState
+    torch.set_num_threads(spec.get("torch_threads", 1))  # K workers no compiten por los cores
+
+    study = create_study(spec, worker)
+    # El tope de trials es del estudio (no del worker): al reanudar solo corre lo que falta
+    max_trials = MaxTrialsCallback(spec["n_trials"], states=(TrialState.COMPLETE, TrialState.PRUNED))
+    study.optimize(lambda trial: objective(trial, spec), n_trials=spec["n_trials"], callbacks=[max_trials])
+
+
+def run_search(spec, workers=1):
+    from optuna.trial import TrialState
+
+    from callbacks import EVAL_FREQ, print_budget_summary, print_warm_start_summary
+
+    spec.setdefault("eval_freq", EVAL_FREQ)
+    study = create_study(spec)  # crea tablas/estudio antes de lanzar los workers
+    done = len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED)))
+    print(f"🔍 {spec['study_name']}: {done}/{spec['n_trials']} trials hechos, {workers} worker(s)")
+
+    if done < spec["n_trials"]:
+        if workers <= 1:
+            run_worker(spec)
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            procs = [ctx.Process(target=run_worker, args=(spec, i)) for i in range(workers)]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+
+    study = create_study(spec)
+    if spec.get("results_csv"):
+        study.trials_dataframe().to_csv(spec["results_csv"], index=False)
+
+    print(f"\n🏁 Búsqueda {spec['study_name']} completa.")
+    completed = study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,))
+    if completed:
+        print("Mejor configuración:")
+        print(study.best_params)
+    print_budget_summary(study, spec["timesteps"])
+    print_warm_start_summary(study)
+    return study
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Búsqueda de reward configs con Optuna")
+    parser.add_argument("spec", help="spec JSON (ver search_specs/)")
+    parser.add_argument("--workers", type=int, default=1, help="procesos en paralelo")
+    parser.add_argument("--n-trials", type=int, help="pisa n_trials del spec")
+    parser.add_argument("--seed", type=int, help="seed del sampler (worker i usa seed + i)")
+    parser.add_argument("--walk-forward", type=int, metavar="FOLDS",
+                        help="objetivo walk-forward con FOLDS folds (pisa el \"walk_forward\" del spec)")
+    parser.add_argument("--check", action="store_true", help="solo valida el spec, sin entrenar")
+    args = parser.parse_args(argv)
+
+    spec = load_spec(args.spec)
+    if args.n_trials is not None:
+        spec["n_trials"] = args.n_trials
+    if args.seed is not None:
+        spec["seed"] = args.seed
+    if args.walk_forward:
+        spec["walk_forward"] = {**(spec.get("walk_forward") or {}), "folds": args.walk_forward}
+    if args.check:
+        problems = check_spec(spec)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if not problems:
+            walk = f", walk-forward {spec['walk_forward'].get('folds', 4)} folds" if spec.get("walk_forward") else ""
+            print(f"✅ {spec['study_name']}: {len(spec.get('search_space', {}))} parámetros, "
+                  f"{spec['n_trials']} trials x {spec['timesteps']} timesteps{walk}, storage {spec['storage']}")
+        return 1 if problems else 0
+    run_search(spec, workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
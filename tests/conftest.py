@@ -0,0 +1,45 @@
+# Fixtures compartidas: CSVs sintéticos con el formato de data/*.csv y un directorio
+# de trabajo temporal (cache/datasets y cache/features son relativos al cwd, así los
+# tests no tocan el cache del repo)
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DATA_DIR = os.path.join(ROOT, "data")
+
+
+def write_csv(path, rows, pair="USD_BRL", seed=0, start_price=5.0, depth=0, level_qty=100.0,
+              start="2025-05-15T19:00:00.000000"):
+    # Snapshots con un random walk, en orden cronológico. depth > 0: columnas L2 con el
+    # nivel 0 en el bid/ask y `level_qty` por nivel, separados por 0.001
+    rng = np.random.RandomState(seed)
+    bid = start_price + np.cumsum(rng.normal(0, 0.001, rows))
+    ask = bid + 0.005
+    base = np.datetime64(start)
+    book = [f"{side}_{kind}_{level}" for side in ("bid", "ask") for kind in ("px", "qty") for level in range(depth)]
+    with open(path, "w") as f:
+        f.write(",".join(["id", "pair", "bid", "ask", "spread_percentage", "timestamp"] + book) + "\n")
+        for i in range(rows):
+            ts = np.datetime_as_string(base + np.timedelta64(i * 500, "ms"), unit="us")
+            levels = [f"{bid[i] - level * 0.001:.6f}" for level in range(depth)] + [f"{level_qty}"] * depth
+            levels += [f"{ask[i] + level * 0.001:.6f}" for level in range(depth)] + [f"{level_qty}"] * depth
+            f.write(",".join([f"{i},{pair},{bid[i]:.6f},{ask[i]:.6f},{(ask[i] - bid[i]) / ask[i] * 100:.6f},{ts}Z"]
+                             + levels) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def make_csv(workdir):
+    def make(rows, name="synthetic.csv", **kwargs):
+        return write_csv(workdir / name, rows, **kwargs)
+    return make
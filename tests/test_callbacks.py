@@ -0,0 +1,32 @@
+import csv
+
+import pytest
+
+from batched_env import BatchedTradingVecEnv
+from callbacks import ProfilingCallback
+from env_simple import SimplifiedTradingEnv
+
+
+def learn_profiled(vec_env, csv_path):
+    from stable_baselines3 import PPO
+
+    model = PPO("MlpPolicy", vec_env, n_steps=32, batch_size=32, n_epochs=1, seed=0, verbose=0)
+    model.learn(total_timesteps=128, callback=ProfilingCallback(csv_path=csv_path))
+    with open(csv_path) as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_profiling_callback(make_csv, workdir, batched):
+    from stable_baselines3.common.vec_env import DummyVecEnv
+
+    path = make_csv(600)
+    if batched:
+        vec_env = BatchedTradingVecEnv(path, n_envs=2, max_steps=100)
+    else:
+        vec_env = DummyVecEnv([lambda: SimplifiedTradingEnv(path, max_steps=100)] * 2)
+    rows = learn_profiled(vec_env, str(workdir / "profile.csv"))
+    # Dos rollouts de 32 steps x 2 envs, cada fila cuenta solo su rollout; el env
+    # vectorizado no se perfila por fase
+    assert [int(row["timesteps"]) for row in rows] == [64, 128]
+    assert [int(row["steps"]) for row in rows] == ([0, 0] if batched else [64, 64])
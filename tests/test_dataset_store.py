@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import COLUMNS, concat_datasets, open_dataset, open_datasets
+from tick_recorder import TickRecorder
+
+
+def record(root, rows, pair="USDT_BRL", start_ns=1_749_200_000 * 10**9, flush_rows=10):
+    # Store live de un día con `rows` snapshots (queda abierto, "live": true)
+    recorder = TickRecorder(pair, root=str(root), flush_rows=flush_rows)
+    for i in range(rows):
+        recorder.append({"timestamp": start_ns + i * 10**9, "bid": 5.0 + i * 0.001, "ask": 5.01 + i * 0.001})
+    recorder.flush()
+    return recorder
+
+
+def test_ingest_round_trip(make_csv, workdir):
+    path = make_csv(300)
+    ds = open_dataset(path, store_dir=str(workdir / "store"))
+    frame = pd.read_csv(path)
+    assert len(ds) == 300
+    assert ds.pair == "USD_BRL"
+    np.testing.assert_array_equal(ds.bid, frame["bid"].to_numpy(np.float32))
+    np.testing.assert_array_equal(ds.ask, frame["ask"].to_numpy(np.float32))
+    assert (np.diff(ds.timestamp) > 0).all()
+    assert ds.timestamp[0] == pd.Timestamp(frame["timestamp"][0]).value
+    # Reabrir no vuelve a ingerir
+    assert open_dataset(path, store_dir=str(workdir / "store")).source_key == ds.source_key
+
+
+def test_concat_round_trip(make_csv, workdir):
+    store = str(workdir / "store")
+    a, b = make_csv(120, name="a.csv"), make_csv(80, name="b.csv", pair="USDT_BRL", seed=1)
+    ds = concat_datasets([a, b], store_dir=store)
+    first, second = open_dataset(a, store), open_dataset(b, store)
+    assert len(ds) == 200
+    assert [(start, stop, pair) for start, stop, pair, _ in ds.segments] == [(0, 120, "USD_BRL"),
+                                                                             (120, 200, "USDT_BRL")]
+    assert ds.pair == "USDT_BRL,USD_BRL"
+    for name in COLUMNS:
+        np.testing.assert_array_equal(ds.column(name), np.concatenate([first.column(name), second.column(name)]))
+    # Mismos miembros: el mismo store
+    assert open_datasets([a, b], store_dir=store).path == ds.path
+    assert open_datasets([a], store_dir=store).path == first.path
+
+
+def test_concat_copies_only_committed_rows_of_live_store(make_csv, workdir):
+    store = str(workdir / "store")
+    recorder = record(workdir / "rec", 25)
+    # Un lote a medio escribir: bid va una fila adelantada
+    with open(os.path.join(recorder.path, "bid.bin"), "ab") as f:
+        f.write(np.float32(9.9).tobytes())
+    live = open_dataset(recorder.path, store)
+    assert len(live) == 25
+    csv = make_csv(50)
+    ds = concat_datasets([recorder.path, csv], store_dir=store)
+    assert len(ds) == 75
+    for name, dtype in ds.meta["columns"].items():
+        assert os.path.getsize(os.path.join(ds.path, f"{name}.bin")) == 75 * np.dtype(dtype).itemsize
+    np.testing.assert_array_equal(ds.bid[:25], live.bid)
+    np.testing.assert_array_equal(ds.bid[25:], open_dataset(csv, store).bid)
+
+
+def test_superseded_live_caches_are_removed(make_csv, workdir):
+    store = str(workdir / "store")
+    csv = make_csv(50)
+    recorder = record(workdir / "rec", 20)
+    old = concat_datasets([recorder.path, csv], store_dir=store)
+    old_ds = open_dataset(recorder.path, store)
+    old_ds.derived("volatility_w10", lambda: np.zeros(len(old_ds)))
+    old_bid = np.array(old.bid)
+
+    # El día sigue creciendo: otra clave, y las versiones viejas se borran
+    for i in range(10):
+        recorder.append({"timestamp": recorder.last_ts + 10**9, "bid": 6.0, "ask": 6.01})
+    recorder.flush()
+    new = concat_datasets([recorder.path, csv], store_dir=store)
+    new_ds = open_dataset(recorder.path, store)
+    new_ds.derived("volatility_w10", lambda: np.zeros(len(new_ds)))
+    assert new.path != old.path and len(new) == 80
+    assert not os.path.exists(old.path)
+    assert os.listdir(os.path.join(recorder.path, "derived")) == ["volatility_w10_n30.npy"]
+    # Lo que ya estaba mapeado se sigue leyendo
+    np.testing.assert_array_equal(old.bid, old_bid)
+    recorder.close()
+
+
+
+def test_live_reader_keeps_rows_from_open(workdir):
+    store = str(workdir / "store")
+    recorder = record(workdir / "rec", 20)
+    reader = open_dataset(recorder.path, store)
+    # Otro lote, y un flush a medias (media fila en timestamp)
+    for i in range(10):
+        recorder.append({"timestamp": recorder.last_ts + 10**9, "bid": 6.0, "ask": 6.01})
+    recorder.flush()
+    with open(os.path.join(recorder.path, "timestamp.bin"), "ab") as f:
+        f.write(b"\0" * 4)
+    assert len(reader) == len(reader.bid) == 20
+    assert len(open_dataset(recorder.path, store)) == 30
@@ -0,0 +1,15 @@
+import pandas as pd
+
+from evaluation import summarize
+
+
+def test_summarize_profit_factor_ignores_runs_without_losses():
+    runs = pd.DataFrame({
+        "config": ["a"] * 3 + ["b"] * 2,
+        "final_equity": [1000.0, 1010.0, 990.0, 1000.0, 1000.0],
+        "max_drawdown": [-0.01, -0.02, -0.03, 0.0, 0.0],
+        "profit_factor": [1.5, float("inf"), 0.5, float("inf"), float("inf")],
+    })
+    summary = summarize(runs).set_index("config")
+    assert summary.loc["a", "median_profit_factor"] == 1.5
+    assert summary.loc["b", "median_profit_factor"] == float("inf")
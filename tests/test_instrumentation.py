@@ -0,0 +1,33 @@
+import numpy as np
+
+from instrumentation import HIST_BUCKETS, StepProfiler, bucket_bounds, bucket_index
+
+
+def test_buckets_cover_durations_in_order():
+    previous = -1
+    for ns in [*range(5000), 2 ** 20 + 5, 2 ** 38, 2 ** 39 - 1]:
+        index = bucket_index(ns)
+        lower, upper = bucket_bounds(index)
+        assert index >= previous and lower <= ns < upper
+        previous = index
+    assert bucket_index(2 ** 45) == HIST_BUCKETS - 1
+
+
+def test_quantiles_within_a_bucket_width():
+    # Duraciones entre 3 y 5 us: con buckets en potencias de 2 el p50 daba 4096 o 8192 ns
+    durations = np.random.default_rng(0).uniform(3_000, 5_000, 10_000).astype(int)
+    profiler = StepProfiler()
+    for ns in durations:
+        profiler.record("features", int(ns))
+    for q in (0.5, 0.99):
+        exact = np.quantile(durations, q)
+        assert abs(profiler.quantile_ns("features", q) - exact) / exact < 1 / 8
+
+
+def test_prometheus_buckets_at_powers_of_two():
+    profiler = StepProfiler()
+    profiler.record("reward", 3_000)
+    text = profiler.to_prometheus()
+    lines = [line for line in text.splitlines() if 'phase="reward"' in line and "_bucket" in line]
+    assert len(lines) == 41
+    assert 'le="2.048e-06"} 0' in text and 'le="4.096e-06"} 1' in text
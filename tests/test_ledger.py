@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from history import RingHistory, open_history
+from ledger import BUY, FILL_DTYPE, SELL, FillLog, PositionLedger
+
+
+def test_average_cost():
+    ledger = PositionLedger("average")
+    ledger.buy(2, 10.0, fee=0.2, ts=1)
+    ledger.buy(2, 12.0, fee=0.4, ts=2)
+    assert ledger.avg_price == 11.0
+    gross, net = ledger.sell(1, 13.0, fee=0.1, ts=3)
+    assert gross == pytest.approx(2.0)
+    assert net == pytest.approx(2.0 - 0.1 - 0.15)   # un cuarto de los fees de compra
+    assert ledger.quantity == 3
+    assert ledger.avg_price == pytest.approx(11.0)
+    assert ledger.open_fees == pytest.approx(0.45)
+
+
+def test_fifo_closes_oldest_lots_first():
+    ledger = PositionLedger("fifo")
+    ledger.buy(2, 10.0, fee=0.2)
+    ledger.buy(2, 12.0, fee=0.4)
+    gross, net = ledger.sell(3, 13.0)
+    assert gross == pytest.approx(3 * 13.0 - (2 * 10.0 + 12.0))
+    assert net == pytest.approx(gross - 0.2 - 0.2)
+    assert ledger.quantity == 1
+    assert ledger.avg_price == pytest.approx(12.0)
+    # Cerrar la posición deja todo en cero (sin residuos)
+    ledger.sell(1, 11.0)
+    assert (ledger.quantity, ledger.cost_basis, ledger.open_fees, len(ledger.lots)) == (0.0, 0.0, 0.0, 0)
+    assert ledger.realized_pnl == pytest.approx(net + (11.0 - 12.0 - 0.2))
+
+
+def test_methods_agree_on_closed_positions():
+    rng = np.random.default_rng(0)
+    ledgers = [PositionLedger("average"), PositionLedger("fifo")]
+    for _ in range(20):
+        qty, price = rng.uniform(1, 3), rng.uniform(9, 11)
+        for ledger in ledgers:
+            ledger.buy(qty, price, fee=qty * price * 0.001)
+    for ledger in ledgers:
+        ledger.sell(ledger.quantity, 10.5, fee=0.01)
+    assert ledgers[0].realized_pnl == pytest.approx(ledgers[1].realized_pnl)
+    assert ledgers[0].total_fees == pytest.approx(ledgers[1].total_fees)
+
+
+def test_oversell_and_unknown_method():
+    ledger = PositionLedger()
+    ledger.buy(1, 10.0)
+    with pytest.raises(ValueError):
+        ledger.sell(2, 10.0)
+    with pytest.raises(ValueError):
+        PositionLedger("lifo")
+
+
+def test_fill_log_grows_and_counts():
+    ledger = PositionLedger(fills=FillLog(capacity=2))
+    for i in range(5):
+        ledger.buy(1, 10.0 + i, ts=i)
+    ledger.sell(3, 20.0, ts=5)
+    fills = ledger.fills.view()
+    assert fills.dtype == FILL_DTYPE
+    assert fills["ts"].tolist() == list(range(6))
+    assert ledger.fills.count(BUY) == 5 and ledger.fills.count(SELL) == 1
+    assert ledger.fills.last()["pnl"] == pytest.approx(3 * 20.0 - 3 * 12.0)
+    ledger.reset()
+    assert len(ledger.fills) == 0 and ledger.quantity == 0
+
+
+def test_ring_history_fills_spill_to_disk(tmp_path):
+    path = str(tmp_path / "fills.bin")
+    ledger = PositionLedger(fills=RingHistory(FILL_DTYPE, capacity=4, spill_path=path))
+    for i in range(10):
+        ledger.buy(1, 10.0, ts=i)
+    # En memoria solo las últimas 4; en disco todas
+    assert ledger.fills.view()["ts"].tolist() == [6, 7, 8, 9]
+    assert len(ledger.fills) == 10
+    ledger.fills.close()
+    assert open_history(path)["ts"].tolist() == list(range(10))
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from dataset_store import open_dataset
+import paper_trading
+from live_market import BookTickerClient, FakeBookTickerServer, LiveLoop
+from tick_recorder import TickRecorder
+
+PRICES = [(5.614, 5.615), (5.613, 5.615), (5.615, 5.616), (5.612, 5.614)]
+
+
+def run_loop(on_snapshot, max_ticks, interval):
+    with FakeBookTickerServer(PRICES) as server:
+        client = BookTickerClient(server.url, timeout=2.0)
+        try:
+            stats = asyncio.run(LiveLoop(client, "USDTBRL", on_snapshot, interval=interval).run(max_ticks))
+        finally:
+            client.close()
+        return stats, server.requests
+
+
+def decide(bid, ask):
+    return 1 if ask - bid < 0.0015 else 0
+
+
+def test_live_loop_decisions_match_recorded_rows(workdir):
+    recorder = TickRecorder("USDT_BRL", root=str(workdir / "rec"), flush_rows=100)
+    decisions = []
+    threads = set()
+
+    def on_snapshot(snapshot):
+        threads.add(threading.current_thread().name)
+        recorder.append(snapshot)
+        decisions.append((snapshot['bid'], snapshot['ask'], decide(snapshot['bid'], snapshot['ask'])))
+
+    stats, requests = run_loop(on_snapshot, max_ticks=8, interval=0.05)
+    path = recorder.path
+    recorder.close()
+
+    assert requests == stats["snapshots"] == 8
+    assert stats["decisions"] == len(decisions) == 8 - stats["stale"]
+    # Las decisiones corren fuera del event loop
+    assert threads and all(name.startswith("decider") for name in threads)
+
+    ds = open_dataset(path)
+    bids, asks, actions = (np.array(column) for column in zip(*decisions))
+    np.testing.assert_array_equal(ds.bid, bids.astype(np.float32))
+    np.testing.assert_array_equal(ds.ask, asks.astype(np.float32))
+    assert actions.tolist() == [decide(bid, ask) for bid, ask in zip(bids, asks)]
+    # Con todos los ticks decididos, los precios siguen el ciclo del servidor
+    if not stats["stale"]:
+        assert list(zip(bids, asks)) == PRICES * 2
+
+
+def test_slow_decision_does_not_block_fetches():
+    decided = []
+
+    def on_snapshot(snapshot):
+        time.sleep(0.3)
+        decided.append(snapshot)
+
+    stats, requests = run_loop(on_snapshot, max_ticks=6, interval=0.05)
+    # Los fetches siguen mientras se decide: los snapshots viejos se descartan
+    assert requests == stats["snapshots"] == 6
+    assert stats["stale"] > 0
+    assert stats["decisions"] == len(decided) == 6 - stats["stale"]
+
+
+def test_bot_close_closes_the_client(monkeypatch, workdir):
+    monkeypatch.setattr(paper_trading, "load_policy", lambda path: None)
+    bot = paper_trading.PaperTradingBot("scripted", history_dir=None, features=False, record_dir=None)
+    closed = []
+    close = bot.client.close
+    monkeypatch.setattr(bot.client, "close", lambda: (closed.append(True), close()))
+    bot.close()
+    assert closed == [True]
@@ -0,0 +1,73 @@
+import numpy as np
+
+import multi_book
+from dataset_store import open_dataset
+from ledger import BUY, SELL
+from multi_book import ACTION_BUY, ACTION_HOLD, ACTION_SELL, TradingEngine
+from paper_trading_mocked import MockedBinance
+
+
+class ScriptedPolicy:
+    # La misma acción para todos los books de cada tick: compra, compra, vende, nada
+    def __init__(self):
+        self.ticks = 0
+
+    def predict(self, obs, deterministic=True):
+        action = [ACTION_BUY, ACTION_BUY, ACTION_SELL, ACTION_HOLD][self.ticks % 4]
+        self.ticks += 1
+        return np.full(len(obs), action), None
+
+
+def test_replay_fills_carry_snapshot_timestamps(make_csv, monkeypatch):
+    monkeypatch.setattr(multi_book, "cached_policy", lambda path: ScriptedPolicy())
+    paths = {"USD_BRL": make_csv(12, name="a.csv"), "USDT_BRL": make_csv(12, name="b.csv", pair="USDT_BRL", seed=1)}
+    engine = TradingEngine()
+    for symbol in paths:
+        engine.add_book(symbol.lower(), symbol, "scripted", cash=1000.0)
+    summary = engine.run_replay({symbol: MockedBinance(path) for symbol, path in paths.items()})
+
+    for book, row in zip(engine.books, summary):
+        ds = open_dataset(paths[book.symbol])
+        fills = book.ledger.fills.view()
+        # Ciclos de compra, compra, vende: 5 por orden hasta juntar 20, que se venden todos
+        assert fills["side"].tolist() == [BUY, BUY, SELL] * 3
+        assert fills["qty"].tolist() == [5.0] * 8 + [20.0]
+        ticks = np.array([0, 1, 2, 4, 5, 6, 8, 9, 10])
+        np.testing.assert_array_equal(fills["ts"], ds.timestamp[ticks])
+        # Compras al ask, ventas al bid
+        np.testing.assert_array_equal(fills["price"][fills["side"] == BUY].astype(np.float32),
+                                      ds.ask[ticks[[0, 1, 3, 4, 6, 7]]])
+        np.testing.assert_array_equal(fills["price"][fills["side"] == SELL].astype(np.float32),
+                                      ds.bid[ticks[[2, 5, 8]]])
+        assert row["num_trades"] == 9
+        assert book.inventory == 0.0
+
+
+def test_replay_advances_sources_by_timestamp(make_csv, monkeypatch):
+    monkeypatch.setattr(multi_book, "cached_policy", lambda path: ScriptedPolicy())
+    # b arranca 250 ms después que a y tiene snapshots cada 500 ms: se intercalan
+    paths = {"USD_BRL": make_csv(10, name="a.csv"),
+             "USDT_BRL": make_csv(6, name="b.csv", pair="USDT_BRL", start="2025-05-15T19:00:00.250000")}
+    engine = TradingEngine()
+    for symbol in paths:
+        engine.add_book(symbol.lower(), symbol, "scripted", cash=1000.0)
+    ticks = []
+    on_tick = engine.on_tick
+    monkeypatch.setattr(engine, "on_tick", lambda snapshots: (ticks.append(snapshots), on_tick(snapshots)))
+    engine.run_replay({symbol: MockedBinance(path) for symbol, path in paths.items()})
+
+    assert len(ticks) == engine.ticks == 16
+    stamps = [snapshot['timestamp'] for snapshots in ticks for snapshot in snapshots.values()]
+    assert stamps == sorted(stamps)
+    assert [list(snapshots) for snapshots in ticks[:4]] == [["USD_BRL"], ["USDT_BRL"], ["USD_BRL"], ["USDT_BRL"]]
+    assert all(list(snapshots) == ["USD_BRL"] for snapshots in ticks[12:])
+
+
+def test_replay_groups_equal_timestamps(make_csv, monkeypatch):
+    monkeypatch.setattr(multi_book, "cached_policy", lambda path: ScriptedPolicy())
+    paths = {"USD_BRL": make_csv(5, name="a.csv"), "USDT_BRL": make_csv(3, name="b.csv", pair="USDT_BRL")}
+    engine = TradingEngine()
+    for symbol in paths:
+        engine.add_book(symbol.lower(), symbol, "scripted")
+    engine.run_replay({symbol: MockedBinance(path) for symbol, path in paths.items()})
+    assert engine.ticks == 5
@@ -0,0 +1,94 @@
+import glob
+import os
+import warnings
+
+import nolds
+import numpy as np
+import pandas as pd
+import pytest
+from hurst import compute_Hc
+
+from conftest import DATA_DIR
+from feature_cache import FEATURE_MIN_WINDOW, NEUTRAL_HURST, NEUTRAL_LYAP, hurst_lyap_with_failures
+from online_features import (LYAP_EMB_DIM, LYAP_MIN_TSEP, LYAP_TRAJECTORY_LEN, OnlineFeatures, RollingHurst,
+                             RollingLyapunov, online_feature_track)
+
+CSV_PATHS = sorted(glob.glob(os.path.join(DATA_DIR, "*.csv")))
+TICKS = 300
+
+
+def bids(path, rows=TICKS):
+    # Los CSVs vienen del más nuevo al más viejo
+    return pd.read_csv(path, usecols=["bid"])["bid"].to_numpy()[::-1][:rows].astype(np.float64)
+
+
+def library_hurst(window):
+    try:
+        return compute_Hc(window, kind="price", simplified=True)[0]
+    except Exception:
+        return None
+
+
+def library_lyap(window):
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return nolds.lyap_r(window, emb_dim=LYAP_EMB_DIM, lag=1, min_tsep=LYAP_MIN_TSEP,
+                                trajectory_len=LYAP_TRAJECTORY_LEN, fit="poly")
+    except Exception:
+        return None
+
+
+def assert_same(online, expected):
+    if expected is None or not np.isfinite(expected):
+        assert online == expected
+    else:
+        assert online == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize("path", CSV_PATHS, ids=os.path.basename)
+def test_rolling_hurst_matches_compute_hc(path):
+    # compute_Hc necesita 100 puntos
+    prices = bids(path)
+    engine = RollingHurst(window=100)
+    for t, price in enumerate(prices):
+        engine.update(price)
+        if t + 1 >= 100:
+            assert_same(engine.value(), library_hurst(prices[t + 1 - 100:t + 1]))
+
+
+@pytest.mark.parametrize("path", CSV_PATHS, ids=os.path.basename)
+def test_rolling_lyapunov_matches_nolds(path):
+    prices = bids(path)
+    engine = RollingLyapunov(window=50)
+    for t, price in enumerate(prices):
+        engine.update(price)
+        if t + 1 >= 50:
+            assert_same(engine.value(), library_lyap(prices[t + 1 - 50:t + 1]))
+
+
+def test_short_window_is_neutral():
+    prices = bids(CSV_PATHS[0], FEATURE_MIN_WINDOW - 1)
+    engine = OnlineFeatures()
+    for price in prices:
+        engine.update(price)
+        hurst, lyap, _ = engine.values()
+        assert (hurst, lyap, engine.failures) == (NEUTRAL_HURST, NEUTRAL_LYAP, 0)
+    # Lo mismo que el cálculo por ventana con menos de FEATURE_MIN_WINDOW precios
+    assert hurst_lyap_with_failures(prices) == (NEUTRAL_HURST, NEUTRAL_LYAP, 0)
+
+
+def test_failures_counted_once_per_tick():
+    # Ventana plana: Hurst falla (R == 0 en todos los bloques) en cada tick con la
+    # ventana llena; Lyapunov da -inf como nolds (todas las distancias en cero)
+    engine = OnlineFeatures(feature_window=50)
+    for _ in range(55):
+        engine.update(5.0)
+    assert engine.window_failures == 1
+    for _ in range(3):
+        assert engine.values()[:2] == (NEUTRAL_HURST, -np.inf)
+    assert engine.failures == 6
+
+    _, _, failures = online_feature_track(np.full(55, 5.0), window=50)
+    # El step i usa bids[:i]: desde el step 50 la ventana está llena
+    assert failures.tolist() == [0] * 50 + [1] * 5
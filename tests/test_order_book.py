@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+import multi_book
+import paper_trading
+import paper_trading_mocked
+from dataset_store import open_dataset
+from ledger import BUY, SELL
+from order_book import OrderBook, snapshot_fill, walk_book
+from multi_book import TradingEngine
+from paper_trading_mocked import MockedBinance, PaperTradingBot
+
+PX = [10.0, 11.0, 12.0]
+QTY = [1.0, 2.0, 3.0]
+
+
+@pytest.mark.parametrize("size, price, visible", [
+    (0.5, 10.0, 0.5),                          # dentro del nivel 0
+    (1.0, 10.0, 1.0),
+    (2.0, (10.0 + 11.0) / 2, 2.0),
+    (6.0, (10.0 + 2 * 11.0 + 3 * 12.0) / 6, 6.0),
+    (8.0, (10.0 + 2 * 11.0 + 5 * 12.0) / 8, 6.0),  # lo que excede va al peor nivel visible
+    (0.0, 10.0, 0.0),
+])
+def test_walk_book(size, price, visible):
+    got_price, got_visible = walk_book(PX, QTY, size)
+    assert got_price == pytest.approx(price)
+    assert got_visible == visible
+
+
+def test_walk_book_vectorized_matches_single():
+    rng = np.random.default_rng(0)
+    px = np.sort(rng.uniform(1, 2, (50, 4)), axis=1)
+    qty = rng.uniform(0, 3, (50, 4))
+    sizes = rng.uniform(0, 12, 50)
+    prices, visible = walk_book(px, qty, sizes)
+    for i in range(50):
+        price, seen = walk_book(px[i], qty[i], sizes[i])
+        assert prices[i] == pytest.approx(price)
+        assert visible[i] == pytest.approx(seen)
+
+
+def test_order_book_sides_and_synthetic():
+    book = OrderBook.synthetic([5.0, 6.0], [5.1, 6.2], depth=3, level_qty=1.0)
+    np.testing.assert_allclose(book.ask_px[1], [6.2, 6.4, 6.6])
+    np.testing.assert_allclose(book.bid_px[1], [6.0, 5.8, 5.6])
+    assert book.price(BUY, 0, 1.0) == pytest.approx(5.1)
+    assert book.price(SELL, 0, 2.0) == pytest.approx(4.95)
+    assert snapshot_fill(book.snapshot(1), BUY, 2.0) == pytest.approx((6.3, 2.0))
+    with pytest.raises(ValueError):
+        book.side(0)
+
+
+def test_book_from_csv(make_csv, workdir):
+    ds = open_dataset(make_csv(20, depth=3), store_dir=str(workdir / "store"))
+    book = OrderBook.from_dataset(ds)
+    assert book.depth == 3
+    np.testing.assert_array_equal(book.bid_px[:, 0], ds.bid)
+    np.testing.assert_array_equal(book.ask_px[:, 0], ds.ask)
+    assert OrderBook.from_dataset(open_dataset(make_csv(20, name="top.csv"), str(workdir / "store"))) is None
+
+
+class ScriptedPolicy:
+    # Compra 4 veces, vende todo, y repite
+    def __init__(self):
+        self.ticks = 0
+
+    def predict(self, obs, deterministic=True):
+        action = [1, 1, 1, 1, 2, 0][self.ticks % 6]
+        self.ticks += 1
+        # multi_book predice con un lote de observaciones
+        return (np.full(len(obs), action) if np.ndim(obs) == 2 else action), None
+
+
+def test_mocked_fill_same_at_level_0_with_and_without_book(make_csv, monkeypatch):
+    # Órdenes de 5 unidades (o el inventario, < 20) contra 100 por nivel: todo en el nivel 0
+    monkeypatch.setattr(paper_trading_mocked, "load_policy", lambda path: ScriptedPolicy())
+    path = make_csv(60, depth=3)
+    fills = []
+    for depth in (False, True):
+        bot = PaperTradingBot("scripted")
+        bot.run(MockedBinance(path, depth=depth))
+        fills.append(bot.ledger.fills.view())
+    top, book = fills
+    assert len(top) == len(book) > 0
+    np.testing.assert_array_equal(top["side"], book["side"])
+    np.testing.assert_allclose(top["price"], book["price"])
+
+    ds = open_dataset(path)
+    buys, sells = top[top["side"] == BUY], top[top["side"] == SELL]
+    assert len(buys) and len(sells)
+    # Compras al ask, ventas al bid
+    assert set(buys["price"].astype(np.float32)) <= set(ds.ask)
+    assert set(sells["price"].astype(np.float32)) <= set(ds.bid)
+
+
+def test_bots_fill_the_same_replay_alike(make_csv, monkeypatch, workdir):
+    # 3 por nivel: las órdenes de 5 (y la venta de 20) recorren varios niveles
+    for module in (paper_trading_mocked, paper_trading):
+        monkeypatch.setattr(module, "load_policy", lambda path: ScriptedPolicy())
+    monkeypatch.setattr(multi_book, "cached_policy", lambda path: ScriptedPolicy())
+    path = make_csv(60, depth=8, level_qty=3.0)
+
+    mocked = PaperTradingBot("scripted")
+    mocked.cash = 1000.0
+    mocked.run(MockedBinance(path, depth=True))
+
+    live = paper_trading.PaperTradingBot("scripted", history_dir=None, features=False, record_dir=None)
+    live.cash = 1000.0
+    exchange = MockedBinance(path, depth=True)
+    for snapshot in iter(exchange.get_next_snapshot, None):
+        live.on_snapshot(snapshot)
+    live.close()
+
+    engine = TradingEngine()
+    book = engine.add_book("book", "USD_BRL", "scripted", cash=1000.0)
+    engine.run_replay({"USD_BRL": MockedBinance(path, depth=True)})
+
+    expected = mocked.ledger.fills.view()
+    assert len(expected) > 0 and (expected["side"] == SELL).any()
+    for fills in (live.ledger.fills.view(), book.ledger.fills.view()):
+        np.testing.assert_array_equal(fills["side"], expected["side"])
+        np.testing.assert_array_equal(fills["qty"], expected["qty"])
+        np.testing.assert_allclose(fills["price"], expected["price"])
+    # Las órdenes recorrieron el book: los precios no son solo el top
+    ds = open_dataset(path)
+    assert not set(expected["price"][expected["side"] == BUY].astype(np.float32)) <= set(ds.ask)
@@ -0,0 +1,44 @@
+import json
+import os
+
+import pytest
+
+from registry import ModelRegistry
+
+
+def touch_model(directory, name, config=None):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"model_{name}.zip"), "wb"):
+        pass
+    if config is not None:
+        uid = name[len("equity_"):] if name.startswith("equity_") else name
+        with open(os.path.join(directory, f"config_{uid}.json"), "w") as f:
+            json.dump(config, f)
+
+
+@pytest.fixture
+def registry(workdir):
+    registry = ModelRegistry(str(workdir / "models" / "registry.db"))
+    yield registry
+    registry.close()
+
+
+def test_scan_same_filename_in_two_dirs(registry, workdir):
+    touch_model(".", "equity_1", {"a": 1})
+    touch_model("models", "equity_1", {"a": 2})
+    touch_model("models_final", "equity_1")
+    added = registry.scan()
+    assert sorted(added) == ["model_equity_1", "models_final_model_equity_1", "root_model_equity_1"]
+    assert len(set(added)) == 3
+    by_path = {row["model_path"]: row for row in registry.all()}
+    assert by_path[os.path.join("models", "model_equity_1.zip")]["config"] == {"a": 2}
+    assert by_path["model_equity_1.zip"]["config"] == {"a": 1}
+    # Volver a escanear no duplica ni cambia ids
+    assert registry.scan() == []
+    assert registry.register("model_equity_1.zip", equity=1.0) == by_path["model_equity_1.zip"]["id"]
+
+
+def test_register_keeps_explicit_ids(registry, workdir):
+    touch_model("models", "a")
+    assert registry.register("models/model_a.zip", model_id="custom") == "custom"
+    assert registry.get("custom")["model_path"] == os.path.join("models", "model_a.zip")
@@ -0,0 +1,55 @@
+import optuna
+import pytest
+
+from env_simple import SimplifiedTradingEnv
+from registry import ModelRegistry
+import walk_forward
+from search import objective, walk_forward_objective
+
+
+def test_warm_start_trial_registers_its_own_budget(make_csv, workdir):
+    from stable_baselines3 import PPO
+
+    csv_path = make_csv(1500)
+    parent = str(workdir / "parent.zip")
+    PPO("MlpPolicy", SimplifiedTradingEnv(csv_path, max_steps=100), seed=0).save(parent)
+    spec = {
+        "study_name": "warm", "csv_path": csv_path, "timesteps": 50_000, "search_space": {}, "fixed": {},
+        "filters": {}, "save_dir": str(workdir / "models"), "registry": str(workdir / "registry.db"),
+        "warm_start": {"parent": parent, "timesteps": 64, "cold_every": 0},
+        "walk_forward": {"folds": 2, "workers": 1, "max_steps": 100},
+    }
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    trial = optuna.create_study(direction="maximize").ask()
+    objective(trial, spec)
+
+    assert trial.user_attrs["timesteps"] == 64
+    registry = ModelRegistry(spec["registry"])
+    try:
+        [model] = registry.all()
+    finally:
+        registry.close()
+    assert model["timesteps"] == 64
+    assert model["parent_id"] == "parent"
+
+
+def test_walk_forward_reports_folds_in_index_order(workdir, monkeypatch):
+    # El pool termina los folds 2, 0, 1: los reportes salen recién cuando hay prefijo completo
+    class Done(Exception):
+        pass
+
+    def fake_walk_forward(reward_config, csv_path, timesteps, n_folds, on_fold, **kwargs):
+        done = []
+        for i in (2, 0, 1):
+            done.append({"fold": i, "mean_equity": 1000.0 + i})
+            on_fold(done[-1], done)
+        raise Done
+
+    monkeypatch.setattr(walk_forward, "walk_forward", fake_walk_forward)
+    spec = {"study_name": "order", "csv_path": "unused.csv", "timesteps": 300, "save_dir": str(workdir / "models"), "walk_forward": {"folds": 3}}
+    trial = optuna.create_study(direction="maximize").ask()
+    reports = []
+    monkeypatch.setattr(trial, "report", lambda value, step: reports.append((step, value)))
+    with pytest.raises(Done):
+        walk_forward_objective(trial, spec, {})
+    assert reports == [(100, 1000.0), (200, 1000.5), (300, 1001.0)]
@@ -0,0 +1,91 @@
+import pytest
+
+from env_simple import SimplifiedTradingEnv
+from walk_forward import fold_test_starts, make_folds, summarize_folds, walk_forward
+
+
+@pytest.mark.parametrize("span", [None, (0.5, 0.75)])
+def test_starts_fit_span_multiple_of_max_steps(make_csv, span):
+    # 1200 filas: el archivo entero y el tramo 600-900 son múltiplos exactos de max_steps
+    env = SimplifiedTradingEnv(make_csv(1200), max_steps=100, precompute_features=False, span=span)
+    lo, hi = env.episode_bounds[0]
+    starts = fold_test_starts(env)
+    assert starts == list(range(lo, hi - 100, 100))
+    for start in starts:
+        env.reset(options={"start": start})
+        done = False
+        while not done:
+            _, _, done, _, _ = env.step(0)
+    # La última observación leería la fila 1200, fuera del archivo
+    with pytest.raises(ValueError):
+        env.reset(options={"start": len(env.bid) - 100})
+
+
+def test_make_folds_anchored_and_rolling():
+    anchored = make_folds(3, anchored=True)
+    rolling = make_folds(3, anchored=False)
+    assert [test for _, test in anchored] == [test for _, test in rolling] == [(0.25, 0.5), (0.5, 0.75), (0.75, 1.0)]
+    assert [train for train, _ in anchored] == [(0.0, 0.25), (0.0, 0.5), (0.0, 0.75)]
+    assert [train for train, _ in rolling] == [(0.0, 0.25), (0.25, 0.5), (0.5, 0.75)]
+    # El train siempre termina donde empieza el test
+    for train, test in anchored + rolling:
+        assert train[1] == test[0]
+
+
+def test_starts_cover_each_file_without_overlap(make_csv):
+    paths = [make_csv(1000, name="a.csv"), make_csv(730, name="b.csv", seed=1)]
+    env = SimplifiedTradingEnv(paths, max_steps=100, precompute_features=False, span=(0.2, 1.0))
+    starts = fold_test_starts(env)
+    for lo, hi in env.episode_bounds:
+        mine = [s for s in starts if lo <= s < hi]
+        assert mine[0] == lo
+        assert all(b - a == 100 for a, b in zip(mine, mine[1:]))
+        # Episodios completos dentro del archivo, y no queda lugar para otro
+        assert mine[-1] + 100 < hi <= mine[-1] + 200
+    # a: 800 filas en el tramo, el último episodio leería la fila 1000; b: 584 filas
+    assert len(starts) == 7 + 5
+
+
+def fold(i, mean_equity, gross_profit=0.0, gross_loss=0.0):
+    return {"fold": i, "mean_equity": mean_equity, "final_cash": 900.0 + i, "final_inventory": float(i),
+            "max_drawdown": -0.1 * (i + 1), "gross_profit": gross_profit, "gross_loss": gross_loss,
+            "num_trades": 2, "num_sells": 1, "episodes": 3}
+
+
+def test_summarize_folds():
+    result = summarize_folds([fold(1, 1010.0, 3.0, 1.0), fold(0, 990.0, 1.0, 1.0)])
+    assert [f["fold"] for f in result["folds"]] == [0, 1]
+    assert result["score"] == 1000.0
+    assert result["std_folds"] == 10.0
+    assert result["worst_fold"] == 990.0
+    assert result["final_cash"] == 900.5
+    assert result["max_drawdown"] == pytest.approx(-0.2)
+    assert result["profit_factor"] == 2.0
+    assert (result["num_trades"], result["num_sells"], result["episodes"]) == (4, 2, 6)
+
+    assert summarize_folds([fold(0, 1000.0, 1.0)])["profit_factor"] == float("inf")
+    assert summarize_folds([fold(0, 1000.0)])["profit_factor"] == 0.0
+
+
+def test_walk_forward_smoke(make_csv, workdir):
+    seen = []
+    result = walk_forward({}, make_csv(1500), timesteps=64, n_folds=2, workers=1, max_steps=100,
+                          save_path=str(workdir / "last_fold"), on_fold=lambda f, done: seen.append(len(done)))
+    assert seen == [1, 2]
+    assert [f["fold"] for f in result["folds"]] == [0, 1]
+    # Tramos de test de 500 filas: 4 episodios completos de 100 cada uno
+    assert [f["episodes"] for f in result["folds"]] == [4, 4]
+    assert result["score"] > 0
+    assert (workdir / "last_fold.zip").exists()
+
+
+def test_walk_forward_pool_stops_on_error(make_csv, workdir):
+    # Un on_fold que corta (ej. trial podado) sale del pool sin esperar al resto de los folds
+    class Pruned(Exception):
+        pass
+
+    def prune(fold, done):
+        raise Pruned
+
+    with pytest.raises(Pruned):
+        walk_forward({}, make_csv(2000), timesteps=64, n_folds=3, workers=2, max_steps=100, on_fold=prune)
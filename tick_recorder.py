@@ -0,0 +1,193 @@
+# tick_recorder.py
+# Grabación de snapshots en vivo directo al formato de entrenamiento.
+#
+# TickRecorder agrega cada snapshot (timestamp, par, bid, ask, spread) a un
+# store columnar como los de dataset_store.py, uno por par y día UTC:
+#   recordings/<PAR>-<AAAAMMDD>/
+#       meta.json                 "live": true mientras se escribe el día
+#       timestamp.bin, id.bin, bid.bin, ask.bin, spread_percentage.bin
+# Las filas se escriben por lotes (cada flush_rows filas o flush_interval
+# segundos) en archivos append-only, con fsync cada fsync_interval segundos.
+# Al cambiar de día se cierra el store anterior ("live": false) y se abre otro.
+# Si el proceso se corta, al reabrir el día se descarta la fila incompleta y se sigue.
+#
+# SimplifiedTradingEnv y MockedBinance abren el directorio tal cual (sin pasar
+# por CSV), incluso mientras se escribe: ven las filas completas al abrirlo.
+#   env = SimplifiedTradingEnv(recorded_days("recordings", "USDT_BRL"))
+#   exchange = MockedBinance("recordings/USDT_BRL-20250606")
+#
+# Un solo proceso escribe cada par. Uso (solo graba, sin operar):
+#   python tick_recorder.py USDTBRL --pair USDT_BRL [--interval 1.0] [--root recordings]
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from dataset_store import COLUMNS, META_FILE, STORE_VERSION, committed_rows, read_meta
+
+RECORD_DIR = "recordings"
+FLUSH_ROWS = 60
+FLUSH_INTERVAL = 5.0   # segundos: a 1 tick/s, los datos aparecen en disco con este atraso como mucho
+FSYNC_INTERVAL = 30.0
+
+
+def day_path(root, pair, ts):
+    day = datetime.fromtimestamp(ts / 1e9, tz=timezone.utc).strftime("%Y%m%d")
+    return os.path.join(root, f"{pair}-{day}")
+
+
+def recorded_days(root=RECORD_DIR, pair="*"):
+    # Stores grabados de un par (o de todos), en orden cronológico
+    paths = glob.glob(os.path.join(root, f"{pair}-[0-9]*"))
+    return sorted(path for path in paths if os.path.exists(os.path.join(path, META_FILE)))
+
+
+def write_meta(path, meta):
+    tmp = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(path, META_FILE))
+
+
+class TickRecorder:
+    def __init__(self, pair, root=RECORD_DIR, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL,
+                 fsync_interval=FSYNC_INTERVAL):
+        self.pair = pair
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.batch = {name: np.zeros(flush_rows, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.pending = 0
+        self.path = None
+        self.files = {}
+        self.rows = 0           # filas del día ya escritas
+        self.last_ts = 0
+        self.last_flush = self.last_fsync = time.monotonic()
+        self.stats = {"ticks": 0, "flushes": 0, "fsyncs": 0, "days": 0}
+
+    def append(self, snapshot):
+        # snapshot: {'bid', 'ask'} + opcionales 'timestamp' (epoch ns) y 'spread_percentage'
+        ts = snapshot.get('timestamp') or time.time_ns()
+        ts = max(int(ts), self.last_ts)  # el store va en orden cronológico aunque el reloj salte atrás
+        path = day_path(self.root, self.pair, ts)
+        if path != self.path:
+            self._open_day(path)
+        bid, ask = snapshot['bid'], snapshot['ask']
+        spread = snapshot.get('spread_percentage')
+        if spread is None:
+            spread = (ask - bid) / bid * 100
+        k = self.pending
+        self.batch["timestamp"][k] = ts
+        self.batch["id"][k] = self.rows + k
+        self.batch["bid"][k] = bid
+        self.batch["ask"][k] = ask
+        self.batch["spread_percentage"][k] = spread
+        self.pending += 1
+        self.last_ts = ts
+        self.stats["ticks"] += 1
+        if self.pending == self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        now = time.monotonic()
+        if self.pending:
+            # Las columnas se escriben de a una: mientras tanto alguna va adelantada (o con
+            # una fila a medias). Los lectores solo usan las filas completas en todas las
+            # columnas (dataset_store.committed_rows), así que no hace falta escribir aparte
+            for name, f in self.files.items():
+                f.write(self.batch[name][:self.pending].tobytes())
+                f.flush()
+            self.rows += self.pending
+            self.pending = 0
+            self.stats["flushes"] += 1
+        self.last_flush = now
+        if now - self.last_fsync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        for f in self.files.values():
+            os.fsync(f.fileno())
+        self.last_fsync = time.monotonic()
+        self.stats["fsyncs"] += 1
+
+    def _meta(self, live):
+        name = os.path.basename(self.path)
+        return {
+            "version": STORE_VERSION,
+            "pair": self.pair,
+            "rows": self.rows,
+            "columns": COLUMNS,
+            "source": name,
+            # Cerrado, la clave incluye las filas: si el día se reabre y crece, cambia
+            "source_hash": f"live:{name}" if live else f"live:{name}:{self.rows}",
+            "live": live,
+        }
+
+    def _open_day(self, path):
+        self.close()
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        meta = read_meta(path)
+        if meta is not None and meta.get("pair") != self.pair:
+            raise ValueError(f"{path} tiene otro par ({meta.get('pair')})")
+        # Día ya empezado (reinicio): se sigue desde la última fila completa
+        self.rows = committed_rows(path, COLUMNS) if meta is not None else 0
+        self.files = {}
+        for name, dtype in COLUMNS.items():
+            f = open(os.path.join(path, f"{name}.bin"), "ab")
+            f.truncate(self.rows * np.dtype(dtype).itemsize)
+            self.files[name] = f
+        write_meta(path, self._meta(live=True))
+        self.stats["days"] += 1
+
+    def close(self):
+        # Cierra el día actual: lo pendiente a disco, fsync y meta con live=false
+        if self.path is None:
+            return
+        self.flush()
+        self.sync()
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+        write_meta(self.path, self._meta(live=False))
+        self.path = None
+
+
+def main(argv=None):
+    from live_market import BINANCE_API, BookTickerClient, LiveLoop
+
+    parser = argparse.ArgumentParser(description="Graba snapshots de bookTicker al formato de dataset_store")
+    parser.add_argument("symbol")
+    parser.add_argument("--pair", help="nombre del par en el store (default: el símbolo)")
+    parser.add_argument("--root", default=RECORD_DIR)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--max-ticks", type=int)
+    parser.add_argument("--base-url", default=BINANCE_API)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    logger = logging.getLogger("tick_recorder")
+    recorder = TickRecorder(args.pair or args.symbol, root=args.root)
+    client = BookTickerClient(args.base_url)
+    loop = LiveLoop(client, args.symbol, recorder.append, interval=args.interval, logger=logger)
+    try:
+        stats = asyncio.run(loop.run(args.max_ticks))
+    except KeyboardInterrupt:
+        stats = loop.stats
+    finally:
+        recorder.close()
+        client.close()
+    logger.info(f"Grabación finalizada: {stats} | {recorder.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
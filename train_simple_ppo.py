@@ -1,17 +1,27 @@
-from stable_baselines3 import PPO
-from stable_baselines3.common.env_checker import check_env
 from env_simple import SimplifiedTradingEnv
 
 # Ruta al CSV de snapshots
-csv_path = "data/BITSO-XRP_MXN-1000_depth-1748377579235.csv"
+CSV_PATH = "data/BITSO-XRP_MXN-1000_depth-1748377579235.csv"
+TIMESTEPS = 150000
+MODEL_PATH = "ppo_trading_simplificado"
 
-env = SimplifiedTradingEnv(csv_path)
-check_env(env)
 
-# Crear y entrenar el modelo
-model = PPO("MlpPolicy", env, verbose=1)
-model.learn(total_timesteps=150000)
+def train(csv_path=CSV_PATH, timesteps=TIMESTEPS, model_path=MODEL_PATH, verbose=1):
+    # stable-baselines3 (y torch) se cargan recién al entrenar
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.env_checker import check_env
 
-# Guardar modelo entrenado
-model.save("ppo_trading_simplificado")
+    env = SimplifiedTradingEnv(csv_path)
+    check_env(env)
 
+    # Crear y entrenar el modelo
+    model = PPO("MlpPolicy", env, verbose=verbose)
+    model.learn(total_timesteps=timesteps)
+
+    # Guardar modelo entrenado
+    model.save(model_path)
+    return model
+
+
+if __name__ == "__main__":
+    train()
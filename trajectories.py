@@ -0,0 +1,314 @@
+# trajectories.py
+# Trayectorias grabadas del env y re-puntuación contrafactual de reward configs.
+#
+# Las recompensas (reward_trade, reward_idle, reward_hold_*, ...) solo cambian el
+# escalar que recibe PPO, no el mercado ni la contabilidad. Con record_path el env
+# guarda cada step (observación, acción, hurst/lyap, volatilidad y los términos de
+# la recompensa por separado) en un archivo binario append-only (history.RingHistory):
+#   <path>               registros TRAJECTORY_DTYPE
+#   <path>.json          dtype de los registros
+#   <path>.config.json   reward_config y fee_rate con los que se grabó
+#
+# Por step, la recompensa del env es
+#   (sum_k w_k * termino_k - 0.06 * inventario ** reward_inventory + base) * escala + ruido + bonus final
+# donde w_k son los pesos del reward_config, base son los términos fijos (bonus de
+# Hurst al vender, +2.5 por equity > 1000, delta de equity), escala = 1 + 2 * volatilidad.
+# score_configs suma eso por episodio para miles de configs a la vez (productos de
+# matrices chicas), sin re-simular.
+#
+# Las acciones quedan fijas: es el retorno que esas mismas acciones hubieran tenido
+# con otra config, no lo que aprendería PPO con ella. Sirve para descartar configs
+# antes de entrenar, no para reemplazar el entrenamiento.
+#
+# Uso:
+#   python trajectories.py record data/X.csv trajectories/x.bin [--model models/model_equity_1007_8.zip] [--episodes 200]
+#   python trajectories.py check trajectories/x.bin
+#   python trajectories.py score trajectories/x.bin --spec search_specs/final.json --n 5000 [--top 10]
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from env_simple import DEFAULT_REWARD_CONFIG, SimplifiedTradingEnv
+from history import RingHistory, open_history
+from ledger import SELL
+
+TRAJECTORY_DIR = "trajectories"
+TRAJECTORY_CAPACITY = 4096
+DEFAULT_FEE_RATE = 0.001  # el del env cuando el reward_config no trae fee_rate
+
+TRAJECTORY_DTYPE = np.dtype([
+    ("episode", "<i4"),
+    ("step", "<i4"),            # step dentro del episodio
+    ("row", "<i8"),             # fila del dataset
+    ("action", "i1"),
+    ("obs", "<f4", (5,)),       # observación con la que se eligió la acción
+    ("hurst", "<f8"),
+    ("lyap", "<f8"),
+    ("volatility", "<f8"),
+    # Términos de la recompensa (antes de escalar)
+    ("trade", "i1"),            # compró -> reward_trade
+    ("buy_inventory", "<i4"),   # inventario después de comprar -> reward_inventory
+    ("profit", "<f8"),          # precio de venta * inventario vendido -> reward_profit
+    ("loss", "<f8"),            # |precio de venta - costo promedio| -> reward_loss
+    ("idle", "i1"),             # -> reward_idle
+    ("hold_hurst_pos", "i1"),   # idle con hurst > 0.55
+    ("hold_hurst_neg", "i1"),   # idle con hurst < 0.45
+    ("hold_lyap_pos", "i1"),    # idle con lyap > 0.5
+    ("hold_lyap_neg", "i1"),    # idle con lyap < 0.2
+    ("reduce", "<f8"),          # 0.1 * unidades vendidas -> reward_reduce_trade
+    ("base", "<f8"),            # términos que no dependen de la config
+    ("scale", "<f8"),           # 1 + 2 * volatilidad
+    # Sin escalar
+    ("noise", "<f8"),
+    ("terminal", "<f8"),        # +5 al final del episodio con equity > 1000
+    ("reward", "<f8"),          # recompensa que devolvió el env (para check)
+    ("done", "i1"),
+])
+
+# Peso de la config -> columna del término que multiplica
+LINEAR_TERMS = {
+    "reward_trade": "trade",
+    "reward_profit": "profit",
+    "reward_loss": "loss",
+    "reward_idle": "idle",
+    "reward_hold_hurst_positive": "hold_hurst_pos",
+    "reward_hold_hurst_negative": "hold_hurst_neg",
+    "reward_hold_lyap_positive": "hold_lyap_pos",
+    "reward_hold_lyap_negative": "hold_lyap_neg",
+    "reward_reduce_trade": "reduce",
+}
+
+
+class TrajectoryRecorder:
+    def __init__(self, path, reward_config, capacity=TRAJECTORY_CAPACITY):
+        self.path = path
+        self.config = {"reward_config": reward_config,
+                       "fee_rate": reward_config.get("fee_rate", DEFAULT_FEE_RATE)}
+        config_path = path + ".config.json"
+        if os.path.exists(path) and os.path.exists(config_path):
+            if trajectory_config(path) != json.loads(json.dumps(self.config)):
+                raise ValueError(f"{path} se grabó con otro reward_config; usá otro archivo")
+        self.history = RingHistory(TRAJECTORY_DTYPE, capacity, spill_path=path)
+        with open(config_path, "w") as f:
+            json.dump(self.config, f)
+        # Al continuar un archivo, los episodios siguen numerándose
+        existing = open_history(path)
+        self.episode = int(existing["episode"][-1]) if len(existing) else -1
+
+    def new_episode(self):
+        self.episode += 1
+
+    def record(self, env, row, action, hurst, lyap, before, reward, done):
+        # Descompone la recompensa del step igual que SimplifiedTradingEnv.step;
+        # before = (inventario, inventory_value, cash, equity) al empezar el step
+        inventory, inventory_value, cash, last_equity = before
+        bid = float(env.bid[row])
+        trade = idle = 0
+        buy_inventory = 0
+        profit = loss = reduce = base = 0.0
+        if action == 1 and env.inventory > inventory:
+            trade = 1
+            buy_inventory = env.inventory
+        elif action == 2 and inventory > 0:
+            price = bid if env.book is None else env.book.price(SELL, row, inventory)
+            diff = price - inventory_value / (inventory + 1e-8)
+            if diff > 0:
+                profit = price * inventory
+                if hurst < 0.45:
+                    base += 1.0
+            else:
+                loss = abs(diff)
+            if env.last_equity > 1000:
+                base += 2.5
+        elif action == 0:
+            idle = 1
+        if env.inventory < inventory:
+            reduce = 0.1 * (inventory - env.inventory)
+        base += (env.last_equity - last_equity) * 0.1
+        volatility = float(env.volatility[row])
+        step = row - env.start_step
+        terminal = 5.0 if step + 1 >= env.max_steps and env.last_equity > 1000 else 0.0
+        obs = np.array([env.bid[row], env.ask[row], env.spread[row], inventory, cash], dtype=np.float32)
+        self.history.append(
+            self.episode, step, row, action, obs, hurst, lyap, volatility,
+            trade, buy_inventory, profit, loss, idle,
+            idle and hurst > 0.55, idle and hurst < 0.45, idle and lyap > 0.5, idle and lyap < 0.2,
+            reduce, base, 1 + (volatility * 2), env.noise[step], terminal, reward, done)
+
+    def close(self):
+        self.history.close()
+
+
+def trajectory_config(path):
+    with open(path + ".config.json") as f:
+        return json.load(f)
+
+
+def load_trajectories(paths):
+    # Registros de uno o varios archivos (episodios renumerados para que no choquen) + fee_rate
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    parts = []
+    fee_rates = set()
+    offset = 0
+    for path in paths:
+        records = np.array(open_history(path))
+        fee_rates.add(trajectory_config(path)["fee_rate"])
+        if len(records):
+            records["episode"] += offset - records["episode"].min()
+            offset = int(records["episode"].max()) + 1
+        parts.append(records)
+    if len(fee_rates) > 1:
+        raise ValueError(f"Trayectorias grabadas con distintos fee_rate: {sorted(fee_rates)}")
+    return np.concatenate(parts), fee_rates.pop()
+
+
+def full_config(config, fee_rate):
+    # Completa con los defaults (como el env) y rechaza lo que no se puede re-puntuar
+    config = {**DEFAULT_REWARD_CONFIG, **config}
+    unknown = set(config) - set(DEFAULT_REWARD_CONFIG) - {"fee_rate"}
+    if unknown:
+        raise ValueError(f"Claves desconocidas en reward_config: {sorted(unknown)}")
+    if config.get("fee_rate", DEFAULT_FEE_RATE) != fee_rate:
+        # fee_rate cambia cash y equity, no solo la recompensa: hay que re-simular
+        raise ValueError(f"fee_rate {config['fee_rate']} distinto del grabado ({fee_rate}); re-simular")
+    return config
+
+
+def score_configs(records, configs, fee_rate=DEFAULT_FEE_RATE, gamma=1.0):
+    # Retorno de cada episodio grabado bajo cada config: matriz (episodios, configs).
+    # gamma < 1 descuenta como PPO (gamma ** step dentro del episodio)
+    configs = [full_config(config, fee_rate) for config in configs]
+    weights = np.array([[config[name] for name in LINEAR_TERMS] for config in configs], dtype=np.float64)
+    exponents = np.array([config["reward_inventory"] for config in configs], dtype=np.float64)
+
+    episodes, episode = np.unique(records["episode"], return_inverse=True)
+    n = len(episodes)
+    discount = gamma ** records["step"].astype(np.float64)
+    scaled = records["scale"] * discount
+
+    terms = np.stack([np.bincount(episode, weights=scaled * records[column], minlength=n)
+                      for column in LINEAR_TERMS.values()], axis=1)
+    fixed = (np.bincount(episode, weights=scaled * records["base"], minlength=n)
+             + np.bincount(episode, weights=discount * (records["noise"] + records["terminal"]), minlength=n))
+
+    # -0.06 * inventario ** reward_inventory: se agrupa por nivel de inventario (pocos valores)
+    buys = records["trade"] == 1
+    levels, level = np.unique(records["buy_inventory"][buys], return_inverse=True)
+    by_level = np.zeros((n, len(levels)))
+    np.add.at(by_level, (episode[buys], level), scaled[buys])
+    inventory = -0.06 * by_level @ (levels.astype(np.float64)[:, None] ** exponents[None, :])
+
+    return terms @ weights.T + inventory + fixed[:, None]
+
+
+def check_trajectories(path):
+    # Máximo error absoluto por step al reconstruir la recompensa con la config grabada
+    records = np.array(open_history(path))
+    config = full_config(trajectory_config(path)["reward_config"], trajectory_config(path)["fee_rate"])
+    pre = sum(config[name] * records[column] for name, column in LINEAR_TERMS.items())
+    pre = pre - 0.06 * records["buy_inventory"].astype(np.float64) ** config["reward_inventory"] * records["trade"]
+    rebuilt = (pre + records["base"]) * records["scale"] + records["noise"] + records["terminal"]
+    return float(np.abs(rebuilt - records["reward"]).max()) if len(records) else 0.0
+
+
+def rank_configs(records, configs, fee_rate=DEFAULT_FEE_RATE, gamma=1.0):
+    # Una fila por config con su retorno medio por episodio, de mejor a peor
+    returns = score_configs(records, configs, fee_rate=fee_rate, gamma=gamma)
+    df = pd.DataFrame(configs)
+    df["mean_return"] = returns.mean(axis=0)
+    df["std_return"] = returns.std(axis=0)
+    df["min_return"] = returns.min(axis=0)
+    return df.sort_values("mean_return", ascending=False)
+
+
+def sample_configs(spec, n, seed=0):
+    # n configs uniformes dentro del search_space de un spec de search.py (+ sus "fixed")
+    from search import param_range
+
+    rng = np.random.default_rng(seed)
+    columns = {name: rng.uniform(*param_range(space), size=n) for name, space in spec["search_space"].items()}
+    return [{**spec.get("fixed", {}), **{name: float(values[i]) for name, values in columns.items()}}
+            for i in range(n)]
+
+
+def record_rollouts(csv_path, path, episodes=100, model_path=None, reward_config=None, seed=0,
+                    deterministic=False, **env_kwargs):
+    # Graba `episodes` episodios con la política de model_path (o acciones al azar)
+    env = SimplifiedTradingEnv(csv_path, reward_config=reward_config, record_path=path, **env_kwargs)
+    policy = None
+    if model_path is not None:
+        from registry import cached_policy
+        policy = cached_policy(model_path)
+    env.action_space.seed(seed)
+    try:
+        for episode in range(episodes):
+            obs, _ = env.reset(seed=seed if episode == 0 else None)
+            done = False
+            while not done:
+                if policy is None:
+                    action = env.action_space.sample()
+                else:
+                    action, _ = policy.predict(obs, deterministic=deterministic)
+                obs, _, done, _, _ = env.step(int(action))
+    finally:
+        env.close()
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trayectorias grabadas y re-puntuación de reward configs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record_p = sub.add_parser("record")
+    record_p.add_argument("csv_path")
+    record_p.add_argument("path")
+    record_p.add_argument("--model")
+    record_p.add_argument("--config", help="reward_config JSON con el que se graba")
+    record_p.add_argument("--episodes", type=int, default=100)
+    record_p.add_argument("--seed", type=int, default=0)
+    check_p = sub.add_parser("check")
+    check_p.add_argument("paths", nargs="+")
+    score_p = sub.add_parser("score")
+    score_p.add_argument("paths", nargs="+")
+    score_p.add_argument("--spec", required=True, help="spec de search.py con el search_space")
+    score_p.add_argument("--n", type=int, default=5000)
+    score_p.add_argument("--seed", type=int, default=0)
+    score_p.add_argument("--gamma", type=float, default=1.0)
+    score_p.add_argument("--top", type=int, default=10)
+    score_p.add_argument("--out", help="CSV con todas las configs puntuadas")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        reward_config = None
+        if args.config:
+            with open(args.config) as f:
+                reward_config = json.load(f)
+        record_rollouts(args.csv_path, args.path, episodes=args.episodes, model_path=args.model,
+                        reward_config=reward_config, seed=args.seed)
+        print(f"🎞️ {len(open_history(args.path))} steps en {args.path}")
+        return 0
+
+    if args.command == "check":
+        for path in args.paths:
+            print(f"{path}: error máximo por step {check_trajectories(path):.3e}")
+        return 0
+
+    from search import load_spec
+
+    spec = load_spec(args.spec)
+    records, fee_rate = load_trajectories(args.paths)
+    configs = sample_configs(spec, args.n, seed=args.seed)
+    df = rank_configs(records, configs, fee_rate=fee_rate, gamma=args.gamma)
+    print(f"🎯 {len(configs)} configs sobre {len(np.unique(records['episode']))} episodios grabados")
+    print(df.head(args.top).to_string(index=False))
+    if args.out:
+        df.to_csv(args.out, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
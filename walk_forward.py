@@ -0,0 +1,221 @@
+# walk_forward.py
+# Validación walk-forward de reward configs. Cada archivo se parte en orden
+# cronológico en n_folds + 1 tramos iguales: el fold i entrena en los tramos
+# [0, i] (anchored) o solo en el i, y evalúa fuera de muestra en el tramo i + 1.
+# La evaluación recorre el tramo de test entero con episodios consecutivos de
+# max_steps (política determinista), así que el score no depende del episodio
+# aleatorio en el que terminó el entrenamiento.
+#
+# Los folds corren en paralelo en un pool de procesos (spawn, N threads de torch
+# por worker, como evaluation.py). Antes de lanzarlos se arma una vez el store
+# memory-mapped y el cache de features: los workers solo abren esos archivos y
+# comparten las páginas vía el page cache, sin copiar los datos por proceso.
+#
+#   result = walk_forward(config, "data/X.csv", timesteps=50_000, n_folds=4, workers=4)
+#   result["score"]   # equity media fuera de muestra (promedio de los folds)
+#   result["folds"]   # métricas de cada fold
+#
+# search.py lo usa como objetivo con "walk_forward" en el spec:
+#   "walk_forward": {"folds": 4, "anchored": true, "workers": 4}
+#
+# Uso: python walk_forward.py models/config_1006_8.json data/X.csv [--folds 4] [--timesteps 50000]
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from evaluation import _init_worker, calculate_max_drawdown
+from ledger import SELL
+
+N_FOLDS = 4
+
+
+def make_folds(n_folds=N_FOLDS, anchored=True):
+    # [(tramo de train, tramo de test)] en fracciones del largo de cada archivo
+    edges = np.linspace(0.0, 1.0, n_folds + 2)
+    return [((0.0 if anchored else float(edges[i]), float(edges[i + 1])), (float(edges[i + 1]), float(edges[i + 2])))
+            for i in range(n_folds)]
+
+
+def fold_test_starts(env):
+    # Inicios de episodios consecutivos que cubren el tramo de cada archivo. La última
+    # observación lee la fila start + max_steps, así que esa fila tiene que estar en el
+    # archivo (los mismos inicios que sortea sample_start)
+    starts = []
+    for lo, hi in env.episode_bounds:
+        starts.extend(range(int(lo), int(hi) - env.max_steps, env.max_steps))
+    return starts
+
+
+def evaluate_span(model, env):
+    # Recorre el tramo del env con la política determinista; métricas por episodio
+    equities, cash, inventory, drawdowns, pnl = [], [], [], [], []
+    num_trades = num_sells = 0
+    for start in fold_test_starts(env):
+        obs, _ = env.reset(options={"start": start})
+        done = False
+        while not done:
+            action, _ = model.predict(obs, deterministic=True)
+            obs, _, done, _, _ = env.step(action)
+        equities.append(env.last_equity)
+        cash.append(env.cash)
+        inventory.append(env.inventory)
+        drawdowns.append(calculate_max_drawdown(env.equity_history))
+        fills = env.ledger.fills.view()
+        pnl.append(fills["pnl"][fills["side"] == SELL])
+        num_trades += len(fills)
+        num_sells += env.ledger.fills.count(SELL)
+    pnl = np.concatenate(pnl) if pnl else np.zeros(0)
+    return {
+        "episodes": len(equities),
+        "mean_equity": float(np.mean(equities)),
+        "std_equity": float(np.std(equities)),
+        "final_cash": float(np.mean(cash)),
+        "final_inventory": float(np.mean(inventory)),
+        "max_drawdown": float(min(drawdowns)),
+        "gross_profit": float(pnl[pnl > 0].sum()),
+        "gross_loss": float(-pnl[pnl < 0].sum()),
+        "num_trades": num_trades,
+        "num_sells": num_sells,
+    }
+
+
+def run_fold(job):
+    from stable_baselines3 import PPO
+    from env_simple import SimplifiedTradingEnv
+
+    env = SimplifiedTradingEnv(job["csv_path"], reward_config=job["reward_config"], max_steps=job["max_steps"],
+                               span=job["train_span"])
+    model = PPO("MlpPolicy", env, verbose=0, seed=job["seed"])
+    if job.get("parent"):
+        model.set_parameters(job["parent"], exact_match=True)
+    start = time.perf_counter()
+    model.learn(total_timesteps=job["timesteps"])
+    train_seconds = time.perf_counter() - start
+    if job.get("save_path"):
+        model.save(job["save_path"])
+
+    test_env = SimplifiedTradingEnv(job["csv_path"], reward_config=job["reward_config"],
+                                    max_steps=job["max_steps"], span=job["test_span"])
+    return {
+        "fold": job["fold"],
+        "train_span": job["train_span"],
+        "test_span": job["test_span"],
+        "train_seconds": train_seconds,
+        **evaluate_span(model, test_env),
+    }
+
+
+def summarize_folds(folds):
+    # Score = promedio de la equity media de cada fold (todos los tramos pesan igual)
+    folds = sorted(folds, key=lambda f: f["fold"])
+    equities = [f["mean_equity"] for f in folds]
+    gross_profit = sum(f["gross_profit"] for f in folds)
+    gross_loss = sum(f["gross_loss"] for f in folds)
+    if gross_loss == 0:
+        profit_factor = float("inf") if gross_profit > 0 else 0.0
+    else:
+        profit_factor = gross_profit / gross_loss
+    return {
+        "score": float(np.mean(equities)),
+        "std_folds": float(np.std(equities)),
+        "worst_fold": float(min(equities)),
+        "final_cash": float(np.mean([f["final_cash"] for f in folds])),
+        "final_inventory": float(np.mean([f["final_inventory"] for f in folds])),
+        "max_drawdown": float(min(f["max_drawdown"] for f in folds)),
+        "profit_factor": profit_factor,
+        "num_trades": sum(f["num_trades"] for f in folds),
+        "num_sells": sum(f["num_sells"] for f in folds),
+        "episodes": sum(f["episodes"] for f in folds),
+        "folds": folds,
+    }
+
+
+def walk_forward(reward_config, csv_path, timesteps, n_folds=N_FOLDS, anchored=True, seed=0, workers=None,
+                 torch_threads=1, max_steps=500, parent=None, save_path=None, on_fold=None):
+    # csv_path: uno o varios archivos (cada uno se parte por separado).
+    # save_path: guarda el modelo del último fold (el que entrenó con más datos).
+    # on_fold(fold, completados): se llama a medida que terminan los folds (ej. para podar un trial)
+    from env_simple import SimplifiedTradingEnv
+
+    folds = make_folds(n_folds, anchored)
+    # Store, volatilidad y features una sola vez acá; los workers los abren con mmap.
+    # También valida que cada tramo tenga lugar para al menos un episodio
+    for train_span, test_span in folds:
+        SimplifiedTradingEnv(csv_path, max_steps=max_steps, span=train_span)
+        SimplifiedTradingEnv(csv_path, max_steps=max_steps, span=test_span)
+
+    jobs = [
+        {"fold": i, "csv_path": csv_path, "reward_config": reward_config, "timesteps": timesteps, "seed": seed,
+         "max_steps": max_steps, "train_span": train_span, "test_span": test_span, "parent": parent,
+         "save_path": save_path if i == n_folds - 1 else None}
+        for i, (train_span, test_span) in enumerate(folds)
+    ]
+    workers = workers or max(1, min(n_folds, (os.cpu_count() or 1) // torch_threads))
+    results = []
+    if workers <= 1:
+        for job in jobs:
+            results.append(run_fold(job))
+            if on_fold:
+                on_fold(results[-1], results)
+        return summarize_folds(results)
+
+    # multiprocessing.Pool y no ProcessPoolExecutor: ante un trial podado o un error,
+    # terminate() mata los folds que están entrenando y descarta los que no arrancaron
+    ctx = multiprocessing.get_context("spawn")
+    pool = ctx.Pool(workers, initializer=_init_worker, initargs=(torch_threads,))
+    try:
+        for result in pool.imap_unordered(run_fold, jobs):
+            results.append(result)
+            if on_fold:
+                on_fold(results[-1], results)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return summarize_folds(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validación walk-forward de una reward config")
+    parser.add_argument("config", help="reward_config JSON")
+    parser.add_argument("csv_paths", nargs="+")
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--rolling", action="store_true", help="train solo en el tramo anterior al test")
+    parser.add_argument("--timesteps", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--torch-threads", type=int, default=1)
+    parser.add_argument("--max-steps", type=int, default=500)
+    parser.add_argument("--out", help="JSON con el resultado")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        reward_config = json.load(f)
+    csv_path = args.csv_paths[0] if len(args.csv_paths) == 1 else args.csv_paths
+
+    def progress(fold, done):
+        lo, hi = fold["test_span"]
+        print(f"[{len(done)}/{args.folds}] fold {fold['fold']} test {lo:.2f}-{hi:.2f} "
+              f"equity={fold['mean_equity']:.2f} ({fold['episodes']} episodios)")
+
+    result = walk_forward(reward_config, csv_path, args.timesteps, n_folds=args.folds, anchored=not args.rolling,
+                          seed=args.seed, workers=args.workers, torch_threads=args.torch_threads,
+                          max_steps=args.max_steps, on_fold=progress)
+    print(f"🎯 score fuera de muestra: {result['score']:.2f} (desvío entre folds {result['std_folds']:.2f}, "
+          f"peor fold {result['worst_fold']:.2f}, drawdown {result['max_drawdown']:.3f})")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())